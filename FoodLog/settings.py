@@ -39,6 +39,10 @@ INSTALLED_APPS = [
     'logs.apps.LogsConfig',
     'profiles.apps.ProfilesConfig',
     'settings.apps.SettingsConfig',
+    'jobs.apps.JobsConfig',
+    'uploads.apps.UploadsConfig',
+    'benchmarks.apps.BenchmarksConfig',
+    'observability.apps.ObservabilityConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,6 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the time and queries of every other middleware are counted too
+    'observability.middleware.MetricsMiddleware',
+    'observability.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +62,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so profiles show the view rather than the middleware around it
+    'observability.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'FoodLog.urls'
@@ -152,3 +161,102 @@ LOGOUT_REDIRECT_URL = 'access:login'
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Number of logs shown per page of the home feed, and the most a client may ask for
+LOG_FEED_PAGE_SIZE = 25
+LOG_FEED_MAX_PAGE_SIZE = 100
+
+# Number of comments shown per page of a log's comment thread
+LOG_COMMENT_PAGE_SIZE = 50
+
+# Ingredient nutrition lookups are cached in-process and in the database
+INGREDIENT_CACHE_MEMORY_SIZE = 1024
+INGREDIENT_CACHE_MAX_ENTRIES = 50000
+INGREDIENT_CACHE_TTL = 60 * 60 * 24 * 30
+# Seconds between counts of the cache table (inserts are counted in between), and
+# the number of in-process hits written to the table's hit counts at a time
+INGREDIENT_CACHE_COUNT_INTERVAL = 5 * 60
+INGREDIENT_CACHE_HIT_FLUSH_SIZE = 100
+
+# Background jobs run on this many threads in the web process (0 to only
+# run them with `manage.py run_jobs`), retrying with exponential backoff
+JOBS_WORKER_THREADS = 2
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 30
+JOBS_STALE_AFTER = 60 * 10
+
+# Edamam food database parser, queried concurrently per ingredient.
+# Timeout is (connect, read) seconds per request.
+INGREDIENT_API_URL = 'https://api.edamam.com/api/food-database/v2/parser'
+INGREDIENT_API_TIMEOUT = (3.05, 10)
+INGREDIENT_API_MAX_CONCURRENCY = 8
+
+# Local nutrient table (`manage.py import_nutrients`) consulted before the API.
+# Names at least this similar to an ingredient count as a match.
+LOCAL_NUTRIENTS_MATCH_CUTOFF = 0.85
+LOCAL_NUTRIENTS_RELOAD_INTERVAL = 60 * 5
+
+# Default and longest date ranges served by the calorie history endpoint, in days
+CALORIE_HISTORY_DEFAULT_DAYS = 30
+CALORIE_HISTORY_MAX_DAYS = 366 * 2
+
+# Users listed per page of the user directory
+PROFILE_DIRECTORY_PAGE_SIZE = 50
+# Logs listed per page of a user's profile
+PROFILE_LOG_PAGE_SIZE = 50
+
+# Username autocomplete suggestions returned by default, and the most a client may ask for
+USERNAME_AUTOCOMPLETE_LIMIT = 10
+USERNAME_AUTOCOMPLETE_MAX_LIMIT = 50
+# Seconds before the in-memory username index is re-read, to pick up changes
+# made by other processes
+USERNAME_INDEX_RELOAD_INTERVAL = 60
+
+# Rows deleted per transaction when a deleted account's data is removed
+ACCOUNT_DELETION_BATCH_SIZE = 200
+
+# Seconds a user's privacy setting is cached in each process, and the number
+# of users cached at most
+PRIVACY_CACHE_TTL = 60
+PRIVACY_CACHE_MAX_ENTRIES = 10000
+
+# Uploaded images get a JPEG and a WebP copy fitted within each of these
+# sizes (in pixels), for templates to show instead of the full upload
+IMAGE_DERIVATIVE_SIZES = {
+    'thumb': 100,
+    'small': 400,
+    'large': 1200,
+}
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Uploads are staged under this media directory until a background job has
+# stripped their metadata and fitted them within IMAGE_MAX_DIMENSION pixels
+IMAGE_STAGING_DIR = 'staging'
+IMAGE_MAX_DIMENSION = 2048
+IMAGE_UPLOAD_QUALITY = 85
+
+# Uploads are stored under this media directory by the hash of their content
+CONTENT_STORAGE_DIR = 'content'
+
+# Seconds a media file must be unmodified before gc_media may remove it, so
+# files of uploads whose rows aren't saved yet are left alone
+MEDIA_GC_MIN_AGE = 24 * 60 * 60
+
+# Fraction of requests whose queries, SQL time and template time are recorded,
+# sent as a Server-Timing header and logged to 'observability.requests'
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = 0.1
+# Requests running one statement at least this many times are logged as warnings
+REQUEST_INSTRUMENTATION_REPEAT_THRESHOLD = 10
+
+# The /metrics endpoint answers requests bearing this token, or without one
+# set, requests from these addresses while DEBUG is on
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Fraction of requests run under cProfile, besides requests bearing a token from
+# `manage.py request_profiles --token` (valid for PROFILING_TOKEN_MAX_AGE seconds)
+PROFILING_SAMPLE_RATE = 0
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+# Profiles are stored here, keeping the newest of each URL name
+PROFILING_DIR = BASE_DIR / 'request_profiles'
+PROFILING_MAX_PER_VIEW = 200
@@ -18,12 +18,16 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from observability.views import metrics
+from uploads.views import serve_media
+
 urlpatterns = [
     path('', include('access.urls')),
     path('logs/', include('logs.urls')),
     path('profiles/', include('profiles.urls')),
     path('settings/', include('settings.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
@@ -48,5 +48,6 @@ class LoginForm(forms.Form):
                 raise ValidationError(bad_credential_mess)
 
             stored_user = CustomUser.objects.get(email=email)
-            if not check_password(password, stored_user.password):
+            # Deactivated accounts are waiting to be deleted
+            if not stored_user.is_active or not check_password(password, stored_user.password):
                 raise ValidationError(bad_credential_mess)
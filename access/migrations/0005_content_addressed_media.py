@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:27
+
+from django.db import migrations, models
+import uploads.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('access', '0004_alter_customuser_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=models.ImageField(default='/default/default-avatar.jpg', storage=uploads.storage.get_media_storage, upload_to='avatars'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:40
+
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import migrations, models
+
+
+def record_existing_derivatives(apps, schema_editor):
+    # Rows whose derivatives are already on disk; new ones are recorded as they're generated
+    CustomUser = apps.get_model('access', 'CustomUser')
+    storage = CustomUser._meta.get_field('profile_picture').storage
+    sizes = list(settings.IMAGE_DERIVATIVE_SIZES)
+    for pk, name in CustomUser.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)\
+            .values_list('pk', 'profile_picture').iterator():
+        try:
+            exists = bool(sizes) and storage.exists(f'{os.path.splitext(name)[0]}.{sizes[0]}.jpg')
+        except SuspiciousFileOperation:
+            # Not a stored upload, e.g. the default avatar
+            continue
+        if exists:
+            CustomUser.objects.filter(pk=pk).update(profile_picture_derivatives=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('access', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_picture_derivatives',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(record_existing_derivatives, migrations.RunPython.noop),
+    ]
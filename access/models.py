@@ -2,13 +2,24 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from uploads.storage import get_media_storage
+
 default_avatar = "/default/default-avatar.jpg"
 
 
 # Create your models here.
 class CustomUser(AbstractUser):
-    profile_picture = models.ImageField(upload_to='avatars', default=default_avatar)
+    profile_picture = models.ImageField(upload_to='avatars', default=default_avatar,
+                                        storage=get_media_storage)
+    # Name of the picture whose derivatives were generated, see uploads.derivatives
+    profile_picture_derivatives = models.CharField(max_length=255, blank=True, editable=False)
     date_joined = models.DateTimeField(default=timezone.now)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Users log in and are checked for duplicates by email
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} joined on {self.date_joined}"
@@ -149,6 +149,17 @@ class LoginFormViewsTests(TestCase):
 
         self.assertRedirects(response, reverse('logs:index'))
 
+    def test_deactivated_account_rejected(self):
+        """
+        Accounts deactivated while awaiting deletion shouldn't be able to log in
+        """
+        CustomUser.objects.filter(email=valid_email).update(is_active=False)
+        form = create_login_form(email=valid_email, password=valid_pass)
+        response = self.client.post(reverse('access:login'), form.data)
+
+        self.assertContains(response, invalid_cred_mess, status_code=400)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
 
 class LoginSessionTests(TestCase):
     def setUp(self):
@@ -55,7 +55,8 @@ def login(request):
             user_set = CustomUser.objects.filter(email=email)
             if user_set.exists():
                 user = user_set.get(email=email)
-                if check_password(password, user.password):
+                # Deactivated accounts are waiting to be deleted
+                if user.is_active and check_password(password, user.password):
                     # Set session cookie to identify User in requests
                     django_login(request, user)
                     return HttpResponseRedirect(reverse('logs:index'))
@@ -0,0 +1,218 @@
+"""
+Benchmarks of the project's views.
+
+Each Scenario drives one view through the Django test client against data
+generated by benchmarks.seeding. `run` measures every scenario's latency
+percentiles and query count over a number of iterations, plus the peak
+memory allocated while serving one more request, and returns results that
+`write_results` stores as JSON for diffing with `compare` across commits.
+
+The nutrition API is stubbed and jobs are run inline (untimed) after the
+request that queued them, so results don't depend on the network.
+"""
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from unittest import mock
+
+import django
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from access.models import CustomUser
+from jobs import queue
+from logs.models import Log
+from .seeding import SeedConfig
+
+
+@dataclass
+class BenchmarkContext:
+    seed_config: SeedConfig
+    # A user to log in as, and the busiest public user and log for detail pages
+    user: CustomUser
+    busiest_user_id: int
+    busiest_log_id: int
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Makes the request, given a client, the context and the iteration number
+    request: Callable
+    login: bool = False
+
+
+def _stubbed_fetch(self, ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 200, 'PROCNT': 10,
+                                                         'FAT': 8, 'CHOCDF': 25, 'FIBTG': 3}}}]
+
+
+def _signup_form(iteration: int) -> dict:
+    name = f'bench-{time.monotonic_ns()}-{iteration}'
+    return {'username': name, 'email': f'{name}@example.com', 'password': 'benchmark-password'}
+
+
+SCENARIOS = [
+    Scenario('logs:index', lambda client, context, i: client.get(reverse('logs:index'))),
+    Scenario('logs:index search', lambda client, context, i: client.post(
+        reverse('logs:index'), {'query': 'rice'})),
+    Scenario('logs:detail', lambda client, context, i: client.get(
+        reverse('logs:detail', args=[context.busiest_log_id]))),
+    Scenario('logs:create-log', lambda client, context, i: client.post(reverse('logs:create-log'), {
+        'name': f'Benchmark meal {i}', 'desc': 'benchmark', 'ingredients': 'rice, chicken breast'}),
+        login=True),
+    Scenario('profiles:index', lambda client, context, i: client.get(reverse('profiles:index'))),
+    Scenario('profiles:user', lambda client, context, i: client.get(
+        reverse('profiles:user', args=[context.busiest_user_id])), login=True),
+    Scenario('access:login', lambda client, context, i: client.post(reverse('access:login'), {
+        'email': context.user.email, 'password': context.seed_config.password})),
+    Scenario('access:signup', lambda client, context, i: client.post(reverse('access:signup'),
+                                                                     _signup_form(i))),
+]
+
+
+def build_context(seed_config: SeedConfig) -> BenchmarkContext:
+    # Private users' profiles skip listing their logs, which is the part worth timing
+    busiest_user_id = Log.objects.filter(is_public=True).exclude(creator__privacy__show_logs=False)\
+        .values('creator').annotate(count=Count('id'))\
+        .order_by('-count', 'creator').values_list('creator', flat=True).first()
+    busiest_log_id = Log.objects.filter(is_public=True).order_by('-comment_count', 'id')\
+        .values_list('id', flat=True).first()
+    user = CustomUser.objects.filter(username__startswith=f'{seed_config.username_prefix}-')\
+        .order_by('id').first()
+    if user is None or busiest_user_id is None or busiest_log_id is None:
+        raise ValueError('Seed some users and public logs before benchmarking')
+    return BenchmarkContext(seed_config, user, busiest_user_id, busiest_log_id)
+
+
+def run(context: BenchmarkContext, iterations: int = 50, warmup: int = 5,
+        scenarios: Optional[Iterable[str]] = None, progress: Callable = None) -> Dict[str, dict]:
+    selected = [s for s in SCENARIOS if scenarios is None or s.name in scenarios]
+    results = {}
+    with override_settings(JOBS_WORKER_THREADS=0), \
+            mock.patch('logs.ingredient_client.IngredientClient.fetch', _stubbed_fetch):
+        for scenario in selected:
+            if progress:
+                progress(f'Running {scenario.name}')
+            results[scenario.name] = run_scenario(scenario, context, iterations, warmup)
+    return results
+
+
+def run_scenario(scenario: Scenario, context: BenchmarkContext, iterations: int, warmup: int) -> dict:
+    client = Client()
+    if scenario.login:
+        client.force_login(context.user)
+
+    for i in range(warmup):
+        scenario.request(client, context, i)
+        _finish(scenario, client)
+
+    timings, query_counts, statuses = [], [], set()
+    for i in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = scenario.request(client, context, i)
+            timings.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(queries))
+        statuses.add(response.status_code)
+        _finish(scenario, client)
+
+    # Memory is measured separately, as tracing slows down every allocation
+    tracemalloc.start()
+    try:
+        scenario.request(client, context, warmup + iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    _finish(scenario, client)
+
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'status_codes': sorted(statuses),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p90_ms': round(percentile(timings, 90), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries_median': percentile(sorted(query_counts), 50),
+        'queries_max': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def _finish(scenario: Scenario, client: Client):
+    if scenario.name in ('access:login', 'access:signup'):
+        # Logging in would redirect the next attempt
+        client.logout()
+    # Work queued by the request (e.g. calorie lookups) isn't part of its latency
+    queue.run_pending()
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def write_results(path: str, results: Dict[str, dict], seed_config: SeedConfig, iterations: int) -> dict:
+    document = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'seed': vars(seed_config),
+        },
+        'scenarios': results,
+    }
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+        file.write('\n')
+    return document
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """
+    Lines describing how each scenario's latency and queries changed
+    between two results documents.
+    """
+    lines = []
+    for name, result in new['scenarios'].items():
+        before = old['scenarios'].get(name)
+        if before is None:
+            lines.append(f'{name}: new scenario')
+            continue
+        lines.append(f"{name}: p50 {_change(before['p50_ms'], result['p50_ms'])}, "
+                     f"p90 {_change(before['p90_ms'], result['p90_ms'])}, "
+                     f"queries {before['queries_median']} -> {result['queries_median']}, "
+                     f"peak memory {_change(before['peak_memory_kb'], result['peak_memory_kb'], 'KB')}")
+    return lines
+
+
+def _change(before: float, after: float, unit: str = 'ms') -> str:
+    percent = f' ({(after - before) / before:+.0%})' if before else ''
+    return f'{before}{unit} -> {after}{unit}{percent}'
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks import harness
+from benchmarks.seeding import SeedConfig, seed
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database and benchmark every view against it, '
+            'writing latency percentiles, query counts and peak memory to a JSON file.')
+
+    def add_arguments(self, parser):
+        defaults = SeedConfig()
+        parser.add_argument('--users', type=int, default=defaults.users)
+        parser.add_argument('--logs', type=int, default=defaults.logs)
+        parser.add_argument('--comments', type=int, default=defaults.comments)
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in harness.SCENARIOS],
+                            help='Only run this scenario (may be repeated)')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--compare', metavar='PATH',
+                            help='Earlier results to compare these against')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+
+        config = SeedConfig(users=options['users'], logs=options['logs'],
+                            comments=options['comments'], seed=options['seed'])
+
+        # Never touch the real database, the scenarios create rows
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            seed(config, progress=self.stdout.write)
+            context = harness.build_context(config)
+            results = harness.run(context, iterations=options['iterations'], warmup=options['warmup'],
+                                  scenarios=options['scenarios'], progress=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        document = harness.write_results(options['output'], results, config, options['iterations'])
+        for name, result in results.items():
+            self.stdout.write(f"{name}: p50 {result['p50_ms']}ms, p90 {result['p90_ms']}ms, "
+                              f"p99 {result['p99_ms']}ms, {result['queries_median']} queries, "
+                              f"{result['peak_memory_kb']}KB peak")
+        if previous is not None:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Compared with {options['compare']}"))
+            for line in harness.compare(previous, document):
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seeding import SeedConfig, seed, seeded_users
+
+
+class Command(BaseCommand):
+    help = ('Bulk insert synthetic users, privacy settings, foods, logs and comments for load testing. '
+            'The same options always generate the same data.')
+
+    def add_arguments(self, parser):
+        defaults = SeedConfig()
+        parser.add_argument('--users', type=int, default=defaults.users)
+        parser.add_argument('--logs', type=int, default=defaults.logs)
+        parser.add_argument('--comments', type=int, default=defaults.comments)
+        parser.add_argument('--log-skew', type=float, default=defaults.log_skew,
+                            help='Pareto shape of logs per user, lower is more skewed')
+        parser.add_argument('--comment-skew', type=float, default=defaults.comment_skew,
+                            help='Pareto shape of comments per log, lower is more skewed')
+        parser.add_argument('--private-fraction', type=float, default=defaults.private_fraction,
+                            help='Fraction of users whose logs are private')
+        parser.add_argument('--days', type=int, default=defaults.days,
+                            help='Spread logs over this many days before now')
+        parser.add_argument('--password', default=defaults.password,
+                            help='Password of every seeded user')
+        parser.add_argument('--prefix', default=defaults.username_prefix,
+                            help='Usernames are <prefix>-<n>')
+        parser.add_argument('--seed', type=int, default=defaults.seed)
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size)
+
+    def handle(self, *args, **options):
+        config = SeedConfig(users=options['users'], logs=options['logs'], comments=options['comments'],
+                            log_skew=options['log_skew'], comment_skew=options['comment_skew'],
+                            private_fraction=options['private_fraction'], days=options['days'],
+                            password=options['password'], username_prefix=options['prefix'],
+                            seed=options['seed'], batch_size=options['batch_size'])
+        if min(config.log_skew, config.comment_skew) <= 0:
+            raise CommandError('Skews must be positive.')
+        if seeded_users(config).exists():
+            raise CommandError(f'Users prefixed {config.username_prefix!r} already exist, '
+                               'pass a different --prefix.')
+
+        result = seed(config, progress=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {result.users} users, {result.logs} logs and {result.comments} comments.'))
@@ -0,0 +1,177 @@
+"""
+Synthetic data for load testing.
+
+`seed` bulk inserts users (sharing one precomputed password hash), their
+privacy settings, foods, logs and comments. Logs per user and comments per
+log follow power laws, so a few users and logs are far busier than the
+rest, as in production. Everything is drawn from a random.Random seeded
+with `SeedConfig.seed`, so a config always generates the same data.
+
+bulk_create skips signals, so the tables maintained by receivers (user
+stats, calorie rollups and the search index) are rebuilt afterwards, for
+the seeded users and logs only.
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import accumulate
+from typing import Callable, List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from access.models import CustomUser
+from logs import search
+from logs.models import Comment, Food, Log
+from profiles.rollups import rebuild_rollups
+from profiles.stats import rebuild_user_stats
+from profiles.username_index import username_index
+from settings import visibility
+from settings.models import Privacy
+
+FOODS = [
+    ('Oatmeal', 'oats, milk, banana, honey'),
+    ('Chicken salad', 'chicken breast, lettuce, tomato, olive oil'),
+    ('Spaghetti bolognese', 'spaghetti, ground beef, tomato sauce, onion'),
+    ('Burrito', 'tortilla, rice, black beans, cheese, salsa'),
+    ('Salmon and rice', 'salmon, rice, broccoli, soy sauce'),
+    ('Pancakes', 'flour, egg, milk, butter, maple syrup'),
+    ('Greek yogurt', 'greek yogurt, blueberries, granola'),
+    ('Veggie stir fry', 'tofu, bell pepper, carrot, noodles, soy sauce'),
+    ('Cheeseburger', 'bun, ground beef, cheese, lettuce, ketchup'),
+    ('Lentil soup', 'lentils, carrot, celery, onion, vegetable broth'),
+]
+
+MEALS = ['breakfast', 'lunch', 'dinner', 'a snack']
+
+COMMENTS = ['Looks delicious!', 'How long did this take?', 'Recipe please',
+            'Great macros', 'I make this every week', 'Yum']
+
+
+@dataclass
+class SeedConfig:
+    users: int = 1000
+    logs: int = 20000
+    comments: int = 50000
+    # Pareto shape of the logs per user and comments per log, lower is more skewed
+    log_skew: float = 1.2
+    comment_skew: float = 1.1
+    private_fraction: float = 0.1
+    days: int = 365
+    password: str = 'password'
+    username_prefix: str = 'seed'
+    seed: int = 0
+    batch_size: int = 5000
+
+
+@dataclass
+class SeedResult:
+    users: int
+    logs: int
+    comments: int
+
+
+def seed(config: SeedConfig, progress: Optional[Callable[[str], None]] = None) -> SeedResult:
+    rng = random.Random(config.seed)
+    progress = progress or (lambda message: None)
+    now = timezone.now()
+
+    progress(f'Creating {config.users} users')
+    users, private = _create_users(config, rng, now)
+
+    progress(f'Creating {config.logs} logs')
+    logs = _create_logs(config, rng, now, users, private)
+
+    progress(f'Creating {config.comments} comments')
+    _create_comments(config, rng, now, users, logs)
+
+    progress('Rebuilding stats, rollups and the search index')
+    _rebuild_derived(config, users, logs)
+    return SeedResult(len(users), len(logs), config.comments if logs else 0)
+
+
+def seeded_users(config: SeedConfig):
+    return CustomUser.objects.filter(username__startswith=f'{config.username_prefix}-')
+
+
+def _create_users(config: SeedConfig, rng: random.Random, now) -> tuple:
+    # Hashing once instead of per user is most of what makes this fast
+    password = make_password(config.password)
+    users = []
+    for start in range(0, config.users, config.batch_size):
+        batch = [CustomUser(username=f'{config.username_prefix}-{i}',
+                            email=f'{config.username_prefix}-{i}@example.com', password=password,
+                            date_joined=now - timedelta(days=config.days, seconds=rng.randrange(86400)))
+                 for i in range(start, min(start + config.batch_size, config.users))]
+        with transaction.atomic():
+            users.extend(user.pk for user in CustomUser.objects.bulk_create(batch))
+
+    private = {user_id for user_id in users if rng.random() < config.private_fraction}
+    for start in range(0, len(users), config.batch_size):
+        Privacy.objects.bulk_create([Privacy(user_id=user_id, show_logs=user_id not in private)
+                                     for user_id in users[start:start + config.batch_size]])
+    return users, private
+
+
+def _create_logs(config: SeedConfig, rng: random.Random, now, users: List[int], private: set) -> List[int]:
+    if not users:
+        return []
+    creators = _cumulative_weights(rng, len(users), config.log_skew)
+    span = config.days * 86400
+    logs = []
+    for start in range(0, config.logs, config.batch_size):
+        count = min(config.batch_size, config.logs - start)
+        creator_ids = rng.choices(users, cum_weights=creators, k=count)
+        foods = []
+        for creator_id in creator_ids:
+            name, ingredients = rng.choice(FOODS)
+            foods.append(Food(creator_id=creator_id, name=name, desc=f'{name} for {rng.choice(MEALS)}',
+                              ingredients=ingredients, calories=rng.randint(150, 1200)))
+        with transaction.atomic():
+            foods = Food.objects.bulk_create(foods)
+            batch = Log.objects.bulk_create(
+                [Log(creator_id=food.creator_id, food=food, is_public=food.creator_id not in private,
+                     pub_date=now - timedelta(seconds=rng.randrange(span)))
+                 for food in foods])
+        logs.extend((log.pk, log.pub_date) for log in batch)
+    return logs
+
+
+def _create_comments(config: SeedConfig, rng: random.Random, now, users: List[int], logs: list):
+    if not logs or not users:
+        return
+    targets = _cumulative_weights(rng, len(logs), config.comment_skew)
+    for start in range(0, config.comments, config.batch_size):
+        count = min(config.batch_size, config.comments - start)
+        comments = []
+        for log_id, pub_date in rng.choices(logs, cum_weights=targets, k=count):
+            # Comments come after the log, but never in the future
+            delay = rng.randrange(max(1, int((now - pub_date).total_seconds())))
+            comments.append(Comment(creator_id=rng.choice(users), log_id=log_id,
+                                    comment=rng.choice(COMMENTS), pub_date=pub_date + timedelta(seconds=delay)))
+        Comment.objects.bulk_create(comments)
+
+
+def _rebuild_derived(config: SeedConfig, users: List[int], logs: list):
+    # Seeded comments are only by seeded users on seeded logs, so nothing
+    # derived for anyone else changes
+    counts = Comment.objects.filter(log=OuterRef('pk')).order_by().values('log')\
+        .annotate(count=Count('pk')).values('count')
+    log_ids = [log_id for log_id, _ in logs]
+    for start in range(0, len(log_ids), config.batch_size):
+        batch = log_ids[start:start + config.batch_size]
+        Log.objects.filter(pk__in=batch).update(comment_count=Coalesce(Subquery(counts), 0))
+        search.index_logs(batch)
+    for start in range(0, len(users), config.batch_size):
+        batch = users[start:start + config.batch_size]
+        rebuild_user_stats(batch)
+        rebuild_rollups(batch)
+    username_index.invalidate()
+    visibility.privacy_cache.clear()
+
+
+def _cumulative_weights(rng: random.Random, count: int, shape: float) -> List[float]:
+    return list(accumulate(rng.paretovariate(shape) for _ in range(count)))
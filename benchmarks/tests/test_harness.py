@@ -0,0 +1,67 @@
+from django.test import TestCase
+
+from benchmarks import harness, seeding
+from logs.ingredient_cache import ingredient_cache
+from logs.models import Food, Log
+from settings.models import Privacy
+
+CONFIG = seeding.SeedConfig(users=20, logs=200, comments=300, seed=3)
+
+
+class BenchmarkHarnessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(CONFIG)
+
+    def setUp(self):
+        # Calories cached by earlier tests would skip the stubbed API
+        ingredient_cache.clear()
+
+    def test_every_scenario_measured(self):
+        """
+        Every view should be driven successfully and report its latency,
+        queries and memory
+        """
+        results = harness.run(harness.build_context(CONFIG), iterations=2, warmup=1)
+        self.assertEqual(set(results), {scenario.name for scenario in harness.SCENARIOS})
+        for name, result in results.items():
+            with self.subTest(name):
+                self.assertTrue(all(code in (200, 302) for code in result['status_codes']), result)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries_median'], 0)
+                self.assertGreater(result['peak_memory_kb'], 0)
+
+    def test_created_logs_get_stubbed_calories(self):
+        """
+        Logs created while benchmarking should have calories from the stubbed API
+        """
+        harness.run(harness.build_context(CONFIG), iterations=1, warmup=0, scenarios=['logs:create-log'])
+        food = Food.objects.get(name='Benchmark meal 0')
+        self.assertFalse(food.calories_pending)
+        self.assertEqual(food.calories, 400)
+
+    def test_busiest_user_public(self):
+        """
+        The profile benchmarked should be one whose logs are listed
+        """
+        context = harness.build_context(CONFIG)
+        self.assertTrue(Privacy.objects.get(user=context.busiest_user_id).show_logs)
+        self.assertTrue(Log.objects.filter(creator=context.busiest_user_id, is_public=True).exists())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(harness.percentile(values, 50), 50)
+        self.assertEqual(harness.percentile(values, 99), 99)
+        self.assertEqual(harness.percentile([7], 90), 7)
+        self.assertEqual(harness.percentile([], 50), 0)
+
+    def test_compare(self):
+        old = {'scenarios': {'logs:index': {'p50_ms': 10, 'p90_ms': 20, 'queries_median': 3,
+                                            'peak_memory_kb': 100}}}
+        new = {'scenarios': {'logs:index': {'p50_ms': 5, 'p90_ms': 20, 'queries_median': 2,
+                                            'peak_memory_kb': 100},
+                             'logs:detail': {}}}
+        lines = harness.compare(old, new)
+        self.assertIn('p50 10ms -> 5ms (-50%)', lines[0])
+        self.assertIn('queries 3 -> 2', lines[0])
+        self.assertEqual(lines[1], 'logs:detail: new scenario')
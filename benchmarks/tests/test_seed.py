@@ -0,0 +1,82 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from access.models import CustomUser
+from benchmarks import seeding
+from logs.models import Comment, Log
+from profiles.models import UserStats
+from settings.models import Privacy
+
+CONFIG = seeding.SeedConfig(users=50, logs=600, comments=900, seed=7, batch_size=250)
+
+
+class SeedTests(TestCase):
+    def snapshot(self):
+        logs = list(Log.objects.order_by('pk').values_list(
+            'creator__username', 'food__name', 'food__calories', 'is_public'))
+        comments = list(Comment.objects.order_by('pk').values_list('creator__username', 'log__food__name', 'comment'))
+        return logs, comments
+
+    def test_creates_requested_rows(self):
+        seeding.seed(CONFIG)
+        self.assertEqual(CustomUser.objects.count(), 50)
+        self.assertEqual(Privacy.objects.count(), 50)
+        self.assertEqual(Log.objects.count(), 600)
+        self.assertEqual(Comment.objects.count(), 900)
+
+    def test_deterministic(self):
+        """
+        The same config should generate the same data
+        """
+        seeding.seed(CONFIG)
+        first = self.snapshot()
+        CustomUser.objects.all().delete()
+        seeding.seed(CONFIG)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_logs_per_user_skewed(self):
+        """
+        The busiest users should have many times the logs of a typical user
+        """
+        seeding.seed(CONFIG)
+        counts = sorted(UserStats.objects.values_list('log_count', flat=True))
+        self.assertGreater(counts[-1], 4 * counts[len(counts) // 2])
+
+    def test_shared_password_hash(self):
+        seeding.seed(CONFIG)
+        user = CustomUser.objects.get(username='seed-3')
+        self.assertTrue(user.check_password(CONFIG.password))
+        self.assertEqual(CustomUser.objects.values('password').distinct().count(), 1)
+
+    def test_derived_data_matches(self):
+        """
+        Rows normally maintained by receivers should be rebuilt after seeding
+        """
+        seeding.seed(CONFIG)
+        log = Log.objects.order_by('-comment_count').first()
+        self.assertEqual(log.comment_count, Comment.objects.filter(log=log).count())
+        self.assertFalse(Log.objects.filter(creator__privacy__show_logs=False, is_public=True).exists())
+        stats = UserStats.objects.get(user=log.creator)
+        self.assertEqual(stats.log_count, Log.objects.filter(creator=log.creator).count())
+
+    def test_command_refuses_existing_prefix(self):
+        out = StringIO()
+        call_command('seed', '--users', '5', '--logs', '10', '--comments', '10', stdout=out)
+        self.assertIn('Seeded 5 users, 10 logs and 10 comments', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('seed', '--users', '5', stdout=out)
+
+    def test_rebuild_limited_to_seeded_rows(self):
+        """
+        Rebuilding derived rows after seeding shouldn't touch other users' rows
+        """
+        seeding.seed(seeding.SeedConfig(users=5, logs=20, comments=20, username_prefix='existing'))
+        existing = CustomUser.objects.get(username='existing-0')
+        UserStats.objects.filter(user=existing).update(log_count=12345)
+        with mock.patch('logs.search.rebuild_index') as rebuild_index:
+            seeding.seed(CONFIG)
+        rebuild_index.assert_not_called()
+        self.assertEqual(UserStats.objects.get(user=existing).log_count, 12345)
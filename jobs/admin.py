@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+# Register your models here.
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'updated')
+    list_filter = ('status', 'name')
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs, polling the queue until interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no runnable jobs are left')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        requeued = queue.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs.')
+
+        while True:
+            count = queue.run_pending()
+            if count:
+                self.stdout.write(f'Ran {count} jobs.')
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
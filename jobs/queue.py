@@ -0,0 +1,237 @@
+"""
+Database backed job queue.
+
+Handlers are registered under a name with `register`, and `enqueue` stores
+a Job row for them. Jobs are run by a small in-process thread pool woken
+when the enqueuing transaction commits (JOBS_WORKER_THREADS threads, 0 to
+disable), and/or by `manage.py run_jobs` in a separate process. Failed jobs
+are retried with exponential backoff until JOBS_MAX_ATTEMPTS is reached, and
+jobs left running by a process that died are requeued after JOBS_STALE_AFTER.
+
+Handlers that can run longer than JOBS_STALE_AFTER call `heartbeat` as they
+progress, so they aren't mistaken for dead. A run's results are only recorded
+while its claim holds, i.e. the job wasn't requeued and claimed again.
+"""
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from observability.metrics import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry.gauge('jobs_pending', 'Jobs waiting to be run.',
+               function=lambda: {(): Job.objects.filter(status=Job.PENDING).count()})
+
+_handlers: Dict[str, Callable] = {}
+_failure_handlers: Dict[str, Callable] = {}
+_running = threading.local()
+
+
+class ClaimLost(Exception):
+    """
+    Raised by `heartbeat` when the running job was requeued and may be run
+    by another worker.
+    """
+
+
+def register(name: str, on_failure: Optional[Callable] = None):
+    """
+    Decorator registering `func` as the handler of jobs called `name`.
+    Jobs call it with their payload as keyword arguments. `on_failure`
+    is called with the same arguments once the job has run out of attempts.
+    """
+    def decorator(func):
+        _handlers[name] = func
+        if on_failure is not None:
+            _failure_handlers[name] = on_failure
+        return func
+    return decorator
+
+
+def enqueue(name: str, **payload) -> Job:
+    if name not in _handlers:
+        raise KeyError(f'No job handler registered for {name!r}')
+
+    job = Job.objects.create(name=name, payload=payload)
+    transaction.on_commit(worker_pool.wake)
+    return job
+
+
+def claim_next() -> Optional[Job]:
+    """
+    Mark the oldest runnable job as running and return it. The conditional
+    update makes sure only one worker can claim a given job.
+    """
+    while True:
+        now = timezone.now()
+        job = Job.objects.filter(status=Job.PENDING, run_after__lte=now)\
+            .order_by('run_after', 'id').first()
+        if job is None:
+            return None
+
+        claimed = Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1, updated=now)
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job: Job):
+    outer, _running.job = getattr(_running, 'job', None), job
+    try:
+        _handlers[job.name](**job.payload)
+    except ClaimLost:
+        logger.warning('Job %s (%s) was requeued while running attempt %s', job.pk, job.name, job.attempts)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        _record_failure(job, traceback.format_exc())
+    else:
+        if not _claimed(job).update(status=Job.DONE, last_error='', updated=timezone.now()):
+            logger.warning('Job %s (%s) was requeued before attempt %s finished', job.pk, job.name, job.attempts)
+    finally:
+        _running.job = outer
+
+
+def heartbeat():
+    """
+    Mark the job running in this thread as alive, so it isn't requeued as
+    stale. Raises ClaimLost if it already was. Does nothing outside jobs.
+    """
+    job = getattr(_running, 'job', None)
+    if job is not None and not _claimed(job).update(updated=timezone.now()):
+        raise ClaimLost(job.pk)
+
+
+def run_pending(limit: Optional[int] = None) -> int:
+    """
+    Run runnable jobs in this thread until none are left (or `limit` have run).
+    Returns the number of jobs run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def requeue_stale() -> int:
+    """
+    Return jobs left running by a worker that died back to the queue.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return Job.objects.filter(status=Job.RUNNING, updated__lt=stale_before)\
+        .update(status=Job.PENDING, updated=timezone.now())
+
+
+def _claimed(job: Job):
+    # The job as long as this run's claim holds, the attempt count
+    # distinguishing it from later claims
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts)
+
+
+def _record_failure(job: Job, error: str):
+    now = timezone.now()
+    if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+        if _claimed(job).update(status=Job.FAILED, last_error=error, updated=now):
+            on_failure = _failure_handlers.get(job.name)
+            if on_failure is not None:
+                on_failure(**job.payload)
+        return
+
+    delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+    if _claimed(job).update(status=Job.PENDING, last_error=error, updated=now,
+                            run_after=now + timedelta(seconds=delay)):
+        worker_pool.wake_later(delay)
+
+
+class WorkerPool:
+    """
+    Threads that drain the queue inside the web process. At most
+    JOBS_WORKER_THREADS drains run at once; a wake-up arriving while they
+    are all busy makes one of them check the queue again before exiting.
+
+    Once woken, the pool also wakes itself every JOBS_STALE_AFTER seconds,
+    and drains requeue stale jobs at most once per half that interval, so
+    jobs claimed by a crashed web process don't stay running forever.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._active = 0
+        self._recheck = False
+        self._sweeper = None
+        self._requeued_at = None
+
+    def wake(self):
+        size = settings.JOBS_WORKER_THREADS
+        if size <= 0:
+            return
+
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep, name='jobs-sweeper', daemon=True)
+                self._sweeper.start()
+            if self._active >= size:
+                self._recheck = True
+                return
+            self._active += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='jobs')
+            executor = self._executor
+        executor.submit(self._drain)
+
+    def wake_later(self, delay: float):
+        if settings.JOBS_WORKER_THREADS <= 0:
+            return
+        timer = threading.Timer(delay, self.wake)
+        timer.daemon = True
+        timer.start()
+
+    def _sweep(self):
+        while True:
+            time.sleep(settings.JOBS_STALE_AFTER)
+            self.wake()
+
+    def _requeue_stale_if_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._requeued_at is not None and now - self._requeued_at < settings.JOBS_STALE_AFTER / 2:
+                return
+            self._requeued_at = now
+        requeued = requeue_stale()
+        if requeued:
+            logger.warning('Requeued %s stale jobs', requeued)
+
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    self._requeue_stale_if_due()
+                    run_pending()
+                except Exception:
+                    logger.exception('Job worker failed while draining the queue')
+                with self._lock:
+                    if not self._recheck:
+                        self._active -= 1
+                        return
+                    self._recheck = False
+        finally:
+            # Worker threads own their connections, don't leak them
+            connections.close_all()
+
+
+worker_pool = WorkerPool()
@@ -0,0 +1,214 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+
+calls = []
+failures = []
+
+
+def record_call(value):
+    calls.append(value)
+
+
+def fail_always(value):
+    raise RuntimeError(f'cannot process {value}')
+
+
+def outlive_stale_window(value, stall_at=None):
+    # Runs three steps of 40 seconds, longer than JOBS_STALE_AFTER in total,
+    # beating the heartbeat after each. A stalled step lets another worker
+    # requeue and claim the job
+    for step in range(3):
+        if step == stall_at:
+            Job.objects.filter(name='tests.slow').update(updated=F('updated') - timedelta(minutes=5))
+            queue.requeue_stale()
+            queue.claim_next()
+        else:
+            Job.objects.filter(name='tests.slow').update(updated=F('updated') - timedelta(seconds=40))
+            calls.append(queue.requeue_stale())
+        queue.heartbeat()
+        calls.append(step)
+
+
+queue.register('tests.record')(record_call)
+queue.register('tests.fail', on_failure=lambda value: failures.append(value))(fail_always)
+queue.register('tests.slow', on_failure=lambda value, stall_at=None: failures.append(value))(
+    outlive_stale_window)
+
+
+@override_settings(JOBS_WORKER_THREADS=0, JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_DELAY=10)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        failures.clear()
+
+    def test_enqueue_unknown_job_raises(self):
+        """
+        Enqueuing a job nobody can run should fail loudly
+        """
+        with self.assertRaises(KeyError):
+            queue.enqueue('tests.unknown')
+
+    def test_pending_jobs_run_in_order(self):
+        """
+        Jobs should run oldest first with their payload as arguments
+        """
+        for value in range(3):
+            queue.enqueue('tests.record', value=value)
+
+        self.assertEqual(queue.run_pending(), 3)
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 3)
+
+    def test_job_claimed_once(self):
+        """
+        A claimed job should not be handed out again
+        """
+        job = queue.enqueue('tests.record', value=1)
+        self.assertEqual(queue.claim_next(), job)
+        self.assertIsNone(queue.claim_next())
+
+    def test_failed_job_retried_with_backoff(self):
+        """
+        A failing job should be rescheduled further in the future after each attempt
+        """
+        job = queue.enqueue('tests.fail', value='x')
+        queue.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('cannot process x', job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+
+        # Not runnable until its backoff has passed
+        self.assertEqual(queue.run_pending(), 0)
+
+    def test_job_fails_after_max_attempts(self):
+        """
+        A job that keeps failing should stop being retried and call its failure handler
+        """
+        job = queue.enqueue('tests.fail', value='x')
+        for _ in range(3):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            queue.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(failures, ['x'])
+
+    @override_settings(JOBS_STALE_AFTER=60)
+    def test_requeue_stale_jobs(self):
+        """
+        Jobs left running by a dead worker should go back to the queue
+        """
+        job = queue.enqueue('tests.record', value=1)
+        queue.claim_next()
+        Job.objects.filter(pk=job.pk).update(updated=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(queue.requeue_stale(), 1)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOBS_STALE_AFTER=60)
+    def test_heartbeat_keeps_long_jobs_running(self):
+        """
+        A job beating its heartbeat should never be requeued, however long it runs
+        """
+        job = queue.enqueue('tests.slow', value=1)
+        self.assertEqual(queue.run_pending(), 1)
+
+        # Nothing was requeued before each heartbeat, and every step ran once
+        self.assertEqual(calls, [0, 0, 0, 1, 0, 2])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    @override_settings(JOBS_STALE_AFTER=60, JOBS_MAX_ATTEMPTS=1)
+    def test_requeued_run_stops_and_leaves_new_claim(self):
+        """
+        A run whose job was requeued and claimed again should stop at its
+        next heartbeat without recording a result over the new claim
+        """
+        job = queue.enqueue('tests.slow', value=1, stall_at=1)
+        self.assertEqual(queue.run_pending(), 1)
+
+        self.assertEqual(calls, [0, 0])
+        self.assertEqual(failures, [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 2))
+
+    def test_requeued_run_result_discarded(self):
+        """
+        A run finishing after its job was claimed again shouldn't mark it done
+        """
+        job = queue.enqueue('tests.record', value=1)
+        claimed = queue.claim_next()
+        Job.objects.filter(pk=job.pk).update(status=Job.PENDING)
+        queue.claim_next()
+
+        queue.run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 2))
+
+
+class WorkerPoolTests(TestCase):
+    @override_settings(JOBS_WORKER_THREADS=1)
+    def test_wake_during_drain_rechecks_queue(self):
+        """
+        A wake-up arriving while every worker is busy must not be lost
+        """
+        pool = queue.WorkerPool()
+        started = threading.Event()
+        release = threading.Event()
+        drains = []
+
+        def fake_run_pending():
+            drains.append(1)
+            if len(drains) == 1:
+                started.set()
+                release.wait(5)
+
+        with mock.patch('jobs.queue.run_pending', side_effect=fake_run_pending), \
+                mock.patch('jobs.queue.requeue_stale', return_value=0), \
+                mock.patch('jobs.queue.connections'):
+            pool.wake()
+            started.wait(5)
+            pool.wake()
+            release.set()
+            pool._executor.shutdown(wait=True)
+
+        self.assertEqual(len(drains), 2)
+        self.assertEqual(pool._active, 0)
+
+    @override_settings(JOBS_WORKER_THREADS=1, JOBS_STALE_AFTER=600)
+    def test_drains_requeue_stale_jobs(self):
+        """
+        The in-process pool should requeue jobs a crashed process left
+        running, but not query for them on every drain
+        """
+        pool = queue.WorkerPool()
+        with mock.patch('jobs.queue.run_pending'), \
+                mock.patch('jobs.queue.requeue_stale', return_value=1) as requeue_mock, \
+                mock.patch('jobs.queue.connections'):
+            pool.wake()
+            pool._executor.shutdown(wait=True)
+            pool._executor = None
+            pool.wake()
+            pool._executor.shutdown(wait=True)
+
+        self.assertEqual(requeue_mock.call_count, 1)
+        self.assertTrue(pool._sweeper.daemon)
+
+    @override_settings(JOBS_WORKER_THREADS=0)
+    def test_disabled_pool_does_not_start_threads(self):
+        pool = queue.WorkerPool()
+        pool.wake()
+        self.assertIsNone(pool._executor)
@@ -1,7 +1,19 @@
 from django.contrib import admin
-from .models import Food, Log, Comment
+from .models import Food, Log, Comment, IngredientCacheEntry, LocalNutrient
 
 # Register your models here.
 admin.site.register(Food)
 admin.site.register(Log)
 admin.site.register(Comment)
+
+
+@admin.register(IngredientCacheEntry)
+class IngredientCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'hit_count', 'fetched_at', 'last_used')
+    search_fields = ('key',)
+
+
+@admin.register(LocalNutrient)
+class LocalNutrientAdmin(admin.ModelAdmin):
+    list_display = ('name', 'calories', 'protein', 'fat', 'carbs', 'fiber')
+    search_fields = ('name',)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LogsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'logs'
+
+    def ready(self):
+        # Register background job handlers and search index receivers
+        from . import signals, tasks  # noqa: F401
@@ -18,4 +18,4 @@ class FoodForm(ModelForm):
         }
 
 class LogSearchForm(forms.Form):
-    query = forms.CharField(label='Search logs by food name or creator', required=False)
+    query = forms.CharField(label='Search logs by food, ingredients or creator', required=False)
@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from observability.metrics import registry
+from .models import IngredientCacheEntry
+
+
+def normalize_ingredient(ingredient: str) -> str:
+    """
+    Cache key for an ingredient: case and surrounding/repeated
+    whitespace don't change what the nutrition API returns.
+    """
+    return ' '.join(ingredient.lower().split())
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded in-process cache with a per-entry time to live.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float, max_size: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class IngredientCache:
+    """
+    Two tier cache of parsed ingredient lookups: an in-process LRU in front
+    of the IngredientCacheEntry table. Entries expire after
+    INGREDIENT_CACHE_TTL seconds and the table is trimmed back to
+    INGREDIENT_CACHE_MAX_ENTRIES least recently used rows.
+
+    The row count is only queried every INGREDIENT_CACHE_COUNT_INTERVAL
+    seconds and estimated from this process' inserts in between, so writes
+    only evict once the table has grown past the limit. Memory tier hits
+    are written to their rows' hit_count and last_used in batches of
+    INGREDIENT_CACHE_HIT_FLUSH_SIZE, so the database keeps hot keys.
+    """
+    def __init__(self):
+        self.memory = LRUCache()
+        self._stats_lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+        self._count_lock = threading.Lock()
+        self._row_count = None
+        self._counted_at = 0
+        self._hits_lock = threading.Lock()
+        self._pending_hits = Counter()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[dict]]:
+        found = {}
+        missing = []
+        for key in set(keys):
+            value = self.memory.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._record('memory_hits', len(found))
+        self._record_memory_hits(found)
+
+        if missing:
+            fresh_after = timezone.now() - timedelta(seconds=settings.INGREDIENT_CACHE_TTL)
+            rows = IngredientCacheEntry.objects.filter(key__in=missing, fetched_at__gt=fresh_after)
+            db_found = {row.key: row for row in rows}
+            if db_found:
+                IngredientCacheEntry.objects.filter(pk__in=[row.pk for row in db_found.values()])\
+                    .update(hit_count=F('hit_count') + 1, last_used=timezone.now())
+            for key, row in db_found.items():
+                found[key] = row.parsed
+                self._remember(key, row.parsed, row.fetched_at)
+            self._record('db_hits', len(db_found))
+            self._record('misses', len(missing) - len(db_found))
+
+        return found
+
+    def set(self, key: str, parsed: List[dict]):
+        now = timezone.now()
+        _, created = IngredientCacheEntry.objects.update_or_create(
+            key=key, defaults={'parsed': parsed, 'fetched_at': now, 'last_used': now})
+        self._remember(key, parsed, now)
+        # Refetching an expired key updates its row, so only inserts grow the table
+        if created and self._estimate_rows(inserted=1) > settings.INGREDIENT_CACHE_MAX_ENTRIES:
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired rows, then the least recently used rows beyond the size limit.
+        """
+        self.flush_hits()
+        expired_before = timezone.now() - timedelta(seconds=settings.INGREDIENT_CACHE_TTL)
+        IngredientCacheEntry.objects.filter(fetched_at__lte=expired_before).delete()
+
+        count = IngredientCacheEntry.objects.count()
+        overflow = count - settings.INGREDIENT_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale_ids = IngredientCacheEntry.objects.order_by('last_used')\
+                .values_list('pk', flat=True)[:overflow]
+            count -= IngredientCacheEntry.objects.filter(pk__in=list(stale_ids)).delete()[0]
+        with self._count_lock:
+            self._row_count = count
+            self._counted_at = time.monotonic()
+
+    def flush_hits(self):
+        """
+        Write the memory tier hits recorded so far to their rows.
+        """
+        with self._hits_lock:
+            pending, self._pending_hits = self._pending_hits, Counter()
+        by_count = {}
+        for key, hits in pending.items():
+            by_count.setdefault(hits, []).append(key)
+        now = timezone.now()
+        for hits, keys in by_count.items():
+            IngredientCacheEntry.objects.filter(key__in=keys)\
+                .update(hit_count=F('hit_count') + hits, last_used=now)
+
+    def clear(self):
+        self.memory.clear()
+        with self._hits_lock:
+            self._pending_hits.clear()
+        IngredientCacheEntry.objects.all().delete()
+        with self._count_lock:
+            self._row_count = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def _estimate_rows(self, inserted: int) -> int:
+        with self._count_lock:
+            stale = time.monotonic() - self._counted_at > settings.INGREDIENT_CACHE_COUNT_INTERVAL
+            if self._row_count is not None and not stale:
+                self._row_count += inserted
+                return self._row_count
+        # Other processes insert too, so recount now and then
+        count = IngredientCacheEntry.objects.count()
+        with self._count_lock:
+            self._row_count = count
+            self._counted_at = time.monotonic()
+        return count
+
+    def _record_memory_hits(self, keys):
+        if not keys:
+            return
+        with self._hits_lock:
+            self._pending_hits.update(list(keys))
+            full = sum(self._pending_hits.values()) >= settings.INGREDIENT_CACHE_HIT_FLUSH_SIZE
+        if full:
+            self.flush_hits()
+
+    def _remember(self, key, parsed, fetched_at):
+        remaining = settings.INGREDIENT_CACHE_TTL - (timezone.now() - fetched_at).total_seconds()
+        if remaining > 0:
+            self.memory.set(key, parsed, remaining, settings.INGREDIENT_CACHE_MEMORY_SIZE)
+
+    def _record(self, name, count):
+        if count:
+            with self._stats_lock:
+                self._stats[name] += count
+
+
+ingredient_cache = IngredientCache()
+
+registry.counter('ingredient_cache_lookups_total', 'Ingredient cache lookups by result.', ['result'],
+                 function=lambda: {(name, ): count for name, count in ingredient_cache.stats().items()})
+registry.gauge('ingredient_cache_memory_entries', 'Entries in the in-process ingredient cache.',
+               function=lambda: {(): len(ingredient_cache.memory)})
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from observability.metrics import registry
+
+API_DURATION = registry.histogram('nutrient_api_request_duration_seconds',
+                                  'Latency of nutrition API lookups by outcome.', ['outcome'])
+
+
+class IngredientLookupError(Exception):
+    """
+    Raised when some ingredients of a batch couldn't be looked up.
+    `results` holds the ones that were, `errors` the exception per failed ingredient.
+    """
+    def __init__(self, results: Dict[str, List[dict]], errors: Dict[str, Exception]):
+        self.results = results
+        self.errors = errors
+        super().__init__(f'Failed to look up {", ".join(errors)}: {next(iter(errors.values()))}')
+
+
+class IngredientClient:
+    """
+    Client for the Edamam food database parser. It keeps a pooled keep-alive
+    session and looks ingredients up concurrently, at most
+    INGREDIENT_API_MAX_CONCURRENCY at a time, each request bounded by
+    INGREDIENT_API_TIMEOUT.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._executor = None
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                pool_size = settings.INGREDIENT_API_MAX_CONCURRENCY
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.INGREDIENT_API_MAX_CONCURRENCY,
+                    thread_name_prefix='ingredients')
+            return self._executor
+
+    def fetch(self, ingredient: str) -> List[dict]:
+        params = {
+            'app_id': os.getenv('APP_ID'),
+            'app_key': os.getenv('APP_KEY'),
+            'ingr': ingredient,
+            'nutrition-type': 'cooking',
+        }
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.session.get(settings.INGREDIENT_API_URL, params=params,
+                                        timeout=settings.INGREDIENT_API_TIMEOUT)
+            response.raise_for_status()
+            parsed = response.json().get('parsed', [])
+            outcome = 'ok'
+            return parsed
+        finally:
+            API_DURATION.observe(time.perf_counter() - start, outcome)
+
+    def fetch_many(self, ingredients: Iterable[str]) -> Dict[str, List[dict]]:
+        """
+        Look every ingredient up concurrently and merge the parsed results,
+        raising IngredientLookupError if any of them failed.
+        """
+        ingredients = list(dict.fromkeys(ingredients))
+        if len(ingredients) == 1:
+            # Not worth a hop through the thread pool
+            try:
+                return {ingredients[0]: self.fetch(ingredients[0])}
+            except Exception as e:
+                raise IngredientLookupError({}, {ingredients[0]: e}) from e
+
+        futures = {ingred: self.executor.submit(self.fetch, ingred) for ingred in ingredients}
+        results, errors = {}, {}
+        for ingred, future in futures.items():
+            try:
+                results[ingred] = future.result()
+            except Exception as e:
+                errors[ingred] = e
+
+        if errors:
+            raise IngredientLookupError(results, errors)
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+ingredient_client = IngredientClient()
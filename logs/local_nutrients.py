@@ -0,0 +1,111 @@
+import difflib
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .ingredient_cache import normalize_ingredient
+from .models import LocalNutrient
+
+# Leading amounts and units, e.g. '1 1/2 cups of' or '200g'
+QUANTITY_PATTERN = re.compile(
+    r'^[\d\s./½¼¾-]*'
+    r'(?:(?:cups?|tbsps?|tablespoons?|tsps?|teaspoons?|g|grams?|kg|oz|ounces?|lbs?|pounds?'
+    r'|ml|l|liters?|slices?|pieces?|cans?|handful)\b)?'
+    r'\s*(?:of\s+)?'
+)
+
+
+def strip_quantity(ingredient: str) -> str:
+    return QUANTITY_PATTERN.sub('', ingredient, count=1).strip()
+
+
+def singularize(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('oes') or word.endswith('ches') or word.endswith('shes'):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def as_parsed(nutrient: LocalNutrient) -> List[dict]:
+    """
+    Shape a local row like an entry of the parser API's 'parsed' list.
+    """
+    return [{'food': {
+        'label': nutrient.name,
+        'nutrients': {
+            'ENERC_KCAL': nutrient.calories,
+            'PROCNT': nutrient.protein,
+            'FAT': nutrient.fat,
+            'CHOCDF': nutrient.carbs,
+            'FIBTG': nutrient.fiber,
+        },
+    }}]
+
+
+class LocalNutrientIndex:
+    """
+    In-memory copy of the LocalNutrient table for lookups without a query.
+    Names are matched exactly, then without quantities and plurals, then
+    fuzzily against the names sharing a word with the ingredient.
+    The table is re-read every LOCAL_NUTRIENTS_RELOAD_INTERVAL seconds.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name: Dict[str, LocalNutrient] = {}
+        self._by_token: Dict[str, set] = defaultdict(set)
+        self._loaded_at: Optional[float] = None
+
+    def lookup(self, ingredient: str) -> Optional[List[dict]]:
+        self._ensure_loaded()
+        by_name = self._by_name
+        if not by_name:
+            return None
+
+        name = normalize_ingredient(ingredient)
+        candidates = [name, strip_quantity(name)]
+        candidates.append(' '.join(singularize(word) for word in candidates[-1].split()))
+        for candidate in candidates:
+            if candidate in by_name:
+                return as_parsed(by_name[candidate])
+
+        match = self._fuzzy_match(candidates[-1])
+        return as_parsed(by_name[match]) if match else None
+
+    def reload(self):
+        by_name = {nutrient.name: nutrient for nutrient in LocalNutrient.objects.all()}
+        by_token = defaultdict(set)
+        for name in by_name:
+            for token in name.split():
+                by_token[token].add(name)
+
+        with self._lock:
+            self._by_name = by_name
+            self._by_token = by_token
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > settings.LOCAL_NUTRIENTS_RELOAD_INTERVAL:
+            self.reload()
+
+    def _fuzzy_match(self, name: str) -> Optional[str]:
+        candidates = set()
+        for token in name.split():
+            candidates |= self._by_token.get(token, set())
+        matches = difflib.get_close_matches(name, candidates, n=1,
+                                            cutoff=settings.LOCAL_NUTRIENTS_MATCH_CUTOFF)
+        return matches[0] if matches else None
+
+
+local_nutrients = LocalNutrientIndex()
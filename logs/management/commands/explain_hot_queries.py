@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from logs.query_plans import HOT_QUERIES, compare, seed
+
+
+class Command(BaseCommand):
+    help = ('Show the query plans and timings of the hot query paths with and without '
+            'the indexes added for them. Everything runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, metavar='LOGS',
+                            help='Insert this many synthetic logs (with users and comments) first')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Times each query is run to measure it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                seed(options['seed'])
+            for hot_query in HOT_QUERIES:
+                comparison = compare(hot_query, repeat=options['repeat'])
+                self.stdout.write(self.style.MIGRATE_HEADING(comparison.label))
+                self.stdout.write(f'  With {", ".join(comparison.indexes)} '
+                                  f'({comparison.milliseconds:.2f}ms):')
+                self.stdout.write(_indent(comparison.plan))
+                self.stdout.write(f'  Without ({comparison.milliseconds_without:.2f}ms):')
+                self.stdout.write(_indent(comparison.plan_without))
+            transaction.set_rollback(True)
+
+
+def _indent(plan: str) -> str:
+    return '\n'.join(f'    {line}' for line in plan.splitlines())
@@ -0,0 +1,92 @@
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from logs.ingredient_cache import normalize_ingredient
+from logs.local_nutrients import local_nutrients
+from logs.models import LocalNutrient
+
+BUNDLED_CSV = Path(__file__).resolve().parent.parent.parent / 'data' / 'nutrients.csv'
+
+# Accepted header names per field, so USDA style exports can be imported as is
+COLUMN_ALIASES = {
+    'name': ['name', 'description', 'food', 'food_name'],
+    'calories': ['calories', 'kcal', 'energy_kcal', 'energy (kcal)', 'enerc_kcal'],
+    'protein': ['protein', 'protein (g)', 'procnt'],
+    'fat': ['fat', 'total_lipid', 'total lipid (fat) (g)', 'fat (g)'],
+    'carbs': ['carbs', 'carbohydrate', 'carbohydrate, by difference (g)', 'carbs (g)', 'chocdf'],
+    'fiber': ['fiber', 'fiber, total dietary (g)', 'fiber (g)', 'fibtg'],
+}
+NUTRIENT_FIELDS = ['calories', 'protein', 'fat', 'carbs', 'fiber']
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV of nutrients per 100g into the local nutrient table ' \
+           '(defaults to the bundled table).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', nargs='?', default=str(BUNDLED_CSV))
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete existing local nutrients before importing')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            csv_file = open(options['csv_path'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["csv_path"]}: {e}')
+
+        with csv_file, transaction.atomic():
+            reader = csv.DictReader(csv_file)
+            columns = self.resolve_columns(reader.fieldnames or [])
+            if options['replace']:
+                LocalNutrient.objects.all().delete()
+
+            imported = 0
+            batch = {}
+            for row in reader:
+                nutrient = self.parse_row(row, columns)
+                if nutrient is None:
+                    continue
+                batch[nutrient.name] = nutrient
+                if len(batch) >= options['batch_size']:
+                    imported += self.save_batch(batch.values())
+                    batch = {}
+            imported += self.save_batch(batch.values())
+
+        local_nutrients.invalidate()
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} nutrients.'))
+
+    def resolve_columns(self, fieldnames):
+        lowered = {name.strip().lower(): name for name in fieldnames}
+        columns = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in lowered:
+                    columns[field] = lowered[alias]
+                    break
+        if 'name' not in columns or 'calories' not in columns:
+            raise CommandError('CSV needs at least a name and a calories column')
+        return columns
+
+    def parse_row(self, row, columns):
+        name = normalize_ingredient(row.get(columns['name']) or '')
+        if not name:
+            return None
+
+        values = {}
+        for field in NUTRIENT_FIELDS:
+            raw = (row.get(columns[field]) if field in columns else None) or '0'
+            try:
+                values[field] = float(raw)
+            except ValueError:
+                return None
+        return LocalNutrient(name=name[:200], **values)
+
+    def save_batch(self, nutrients):
+        nutrients = list(nutrients)
+        LocalNutrient.objects.bulk_create(nutrients, update_conflicts=True, unique_fields=['name'],
+                                          update_fields=NUTRIENT_FIELDS)
+        return len(nutrients)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from logs.ingredient_cache import ingredient_cache
+from logs.models import IngredientCacheEntry
+
+
+class Command(BaseCommand):
+    help = 'Report how many nutrition API calls the ingredient cache has saved, or clear it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete every cached ingredient lookup')
+        parser.add_argument('--top', type=int, default=10,
+                            help='Number of most reused ingredients to list')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            ingredient_cache.clear()
+            self.stdout.write(self.style.SUCCESS('Ingredient cache cleared.'))
+            return
+
+        ingredient_cache.flush_hits()
+        entries = IngredientCacheEntry.objects.count()
+        saved_calls = IngredientCacheEntry.objects.aggregate(total=Sum('hit_count'))['total'] or 0
+        self.stdout.write(f'Cached ingredients: {entries}')
+        self.stdout.write(f'API calls saved by the cache: {saved_calls}')
+
+        for entry in IngredientCacheEntry.objects.order_by('-hit_count')[:options['top']]:
+            self.stdout.write(f'  {entry.hit_count:>8}  {entry.key}')
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0005_food_creator'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['-pub_date', '-id'], name='log_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0006_log_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=500, unique=True)),
+                ('parsed', models.JSONField(default=list)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0007_ingredientcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='food',
+            name='calories_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
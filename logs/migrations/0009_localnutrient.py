@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0008_food_calories_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocalNutrient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('calories', models.FloatField(default=0)),
+                ('protein', models.FloatField(default=0)),
+                ('fat', models.FloatField(default=0)),
+                ('carbs', models.FloatField(default=0)),
+                ('fiber', models.FloatField(default=0)),
+            ],
+        ),
+    ]
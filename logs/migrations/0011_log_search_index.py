@@ -0,0 +1,43 @@
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_logsearch
+USING fts5(name, description, ingredients, username, tokenize='trigram')
+"""
+
+POPULATE_SQL = """
+INSERT INTO logs_logsearch (rowid, name, description, ingredients, username)
+SELECT l.id, f.name, f."desc", f.ingredients, u.username
+FROM logs_log l
+JOIN logs_food f ON f.id = l.food_id
+JOIN access_customuser u ON u.id = l.creator_id
+"""
+
+
+def supports_search_index(connection):
+    # FTS5 is SQLite only, and the trigram tokenizer needs SQLite 3.34; other
+    # databases fall back to substring search
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34, 0)
+
+
+def create_search_index(apps, schema_editor):
+    if supports_search_index(schema_editor.connection):
+        schema_editor.execute(CREATE_SQL)
+        schema_editor.execute(POPULATE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if supports_search_index(schema_editor.connection):
+        schema_editor.execute('DROP TABLE IF EXISTS logs_logsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('access', '0001_initial'),
+        ('logs', '0010_food_nutrients'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+def copy_privacy_settings(apps, schema_editor):
+    Log = apps.get_model('logs', 'Log')
+    Log.objects.filter(creator__privacy__show_logs=False).update(is_public=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0011_log_search_index'),
+        ('settings', '0002_alter_privacy_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='is_public',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(copy_privacy_settings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['is_public', '-pub_date', '-id'], name='log_public_pub_date_id_idx'),
+        ),
+    ]
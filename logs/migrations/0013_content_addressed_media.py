@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:27
+
+from django.db import migrations, models
+import uploads.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0012_log_is_public'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='food',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=uploads.storage.get_media_storage, upload_to='logs', verbose_name='Image (Optional)'),
+        ),
+    ]
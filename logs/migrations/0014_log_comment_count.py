@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def count_comments(apps, schema_editor):
+    Log = apps.get_model('logs', 'Log')
+    Comment = apps.get_model('logs', 'Comment')
+    counts = Comment.objects.filter(log=OuterRef('pk')).order_by().values('log')\
+        .annotate(count=Count('pk')).values('count')
+    Log.objects.filter(pk__in=Comment.objects.values('log'))\
+        .update(comment_count=Subquery(counts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0013_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['log', '-pub_date', '-id'], name='comment_log_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0014_log_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['creator', '-pub_date', '-id'], name='log_creator_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import logs.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0015_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogSearch',
+            fields=[
+                ('log', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='logs.log')),
+                ('name', models.TextField()),
+                ('description', models.TextField()),
+                ('ingredients', models.TextField()),
+                ('username', models.TextField()),
+                ('document', logs.models.SearchDocumentField(db_column='logs_logsearch')),
+            ],
+            options={
+                'db_table': 'logs_logsearch',
+                'managed': False,
+            },
+        ),
+    ]
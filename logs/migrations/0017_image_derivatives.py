@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:40
+
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import migrations, models
+
+
+def record_existing_derivatives(apps, schema_editor):
+    # Rows whose derivatives are already on disk; new ones are recorded as they're generated
+    Food = apps.get_model('logs', 'Food')
+    storage = Food._meta.get_field('image').storage
+    sizes = list(settings.IMAGE_DERIVATIVE_SIZES)
+    for pk, name in Food.objects.exclude(image='').exclude(image__isnull=True)\
+            .values_list('pk', 'image').iterator():
+        try:
+            exists = bool(sizes) and storage.exists(f'{os.path.splitext(name)[0]}.{sizes[0]}.jpg')
+        except SuspiciousFileOperation:
+            # Not a stored upload, e.g. the default avatar
+            continue
+        if exists:
+            Food.objects.filter(pk=pk).update(image_derivatives=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0016_log_search_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='food',
+            name='image_derivatives',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(record_existing_derivatives, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,17 @@ from django.utils import timezone
 from django.db import models
 
 from access.models import CustomUser
+from settings.models import Privacy
+from uploads.storage import get_media_storage
+from . import nutrients
+
+
+class FoodQuerySet(models.QuerySet):
+    def total_nutrients(self):
+        """
+        Sum the nutrient vectors of every food in one pass over their packed column.
+        """
+        return nutrients.sum_packed(self.values_list('nutrients', flat=True).iterator())
 
 
 class Food(models.Model):
@@ -12,8 +23,25 @@ class Food(models.Model):
     desc = models.CharField('description', max_length=1000)
     ingredients = models.CharField(max_length=500)
     calories = models.IntegerField(default=0)
-    image = models.ImageField(upload_to='logs', null=True, blank=True,
+    # Set while the calorie lookup job for this food hasn't finished
+    calories_pending = models.BooleanField(default=False)
+    # Packed nutrients.NUTRIENT_KEYS vector, empty until calculated
+    nutrients = models.BinaryField(null=True, blank=True, editable=False)
+    image = models.ImageField(upload_to='logs', null=True, blank=True, storage=get_media_storage,
                               verbose_name='Image (Optional)')
+    # Name of the image whose derivatives were generated, see uploads.derivatives
+    image_derivatives = models.CharField(max_length=255, blank=True, editable=False)
+
+    objects = FoodQuerySet.as_manager()
+
+    @property
+    def nutrient_vector(self):
+        return nutrients.unpack(self.nutrients)
+
+    def macro_breakdown(self):
+        # (label, amount) of every nutrient besides calories, which are shown on their own
+        vector = self.nutrient_vector
+        return nutrients.labelled(vector)[1:] if vector else []
 
     def __str__(self):
         return f"{self.name} contributed {self.calories} calories."
@@ -23,6 +51,27 @@ class Log(models.Model):
     creator = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     food = models.OneToOneField(Food, on_delete=models.CASCADE)
     pub_date = models.DateTimeField('Date published')
+    # Copy of the creator's Privacy.show_logs, kept in sync by logs.signals,
+    # so the feed can filter public logs without joining Privacy
+    is_public = models.BooleanField(default=True)
+    # Number of comments on the log, kept up to date by logs.signals
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of the home feed
+            models.Index(fields=['-pub_date', '-id'], name='log_pub_date_id_idx'),
+            models.Index(fields=['is_public', '-pub_date', '-id'], name='log_public_pub_date_id_idx'),
+            # A user's logs on their profile, newest first, and their date range
+            models.Index(fields=['creator', '-pub_date', '-id'], name='log_creator_pub_date_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            show_logs = Privacy.objects.filter(user=self.creator_id)\
+                .values_list('show_logs', flat=True).first()
+            self.is_public = show_logs is not False
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.creator.username} ate {self.food.name} on {self.pub_date.date()}."
@@ -34,9 +83,81 @@ class Comment(models.Model):
     comment = models.CharField(max_length=1000)
     pub_date = models.DateTimeField('Date commented')
 
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of a log's comments, newest first
+            models.Index(fields=['log', '-pub_date', '-id'], name='comment_log_pub_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.creator.username} said {self.comment} on {self.pub_date.date()} "
 
     def is_recent(self):
         now = timezone.now()
         return now - timedelta(days=1) <= self.pub_date <= now
+
+
+class SearchDocumentField(models.TextField):
+    """
+    FTS5's hidden column named after its table, which MATCH queries.
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class LogSearch(models.Model):
+    """
+    A row of the FTS5 table that logs.search maintains with raw SQL
+    (created by migration 0011 where SQLite supports it). Unmanaged, so
+    searches can join it to logs.
+    """
+    log = models.OneToOneField(Log, primary_key=True, db_column='rowid', db_constraint=False,
+                               on_delete=models.DO_NOTHING, related_name='search_entry')
+    name = models.TextField()
+    description = models.TextField()
+    ingredients = models.TextField()
+    username = models.TextField()
+    document = SearchDocumentField(db_column='logs_logsearch')
+
+    class Meta:
+        managed = False
+        db_table = 'logs_logsearch'
+
+
+class IngredientCacheEntry(models.Model):
+    """
+    Durable tier of the ingredient lookup cache, holding the parsed
+    nutrition API response for one normalized ingredient.
+    """
+    key = models.CharField(max_length=500, unique=True)
+    parsed = models.JSONField(default=list)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} cached on {self.fetched_at.date()} ({self.hit_count} hits)"
+
+
+class LocalNutrient(models.Model):
+    """
+    Nutrients per 100g of an ingredient from the bundled/imported nutrient
+    table, consulted before the remote nutrition API.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    calories = models.FloatField(default=0)
+    protein = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fiber = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.name} has {self.calories} calories per 100g."
@@ -0,0 +1,57 @@
+"""
+Fixed-order nutrient vectors.
+
+Foods store their nutrients as a packed array of float32 in NUTRIENT_KEYS
+order (20 bytes a row), so totals over many foods are a column-wise sum
+over fixed-length tuples instead of a walk through nested API dicts.
+"""
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Edamam nutrient codes, in storage order
+NUTRIENT_KEYS = ('ENERC_KCAL', 'PROCNT', 'FAT', 'CHOCDF', 'FIBTG')
+NUTRIENT_LABELS = {
+    'ENERC_KCAL': 'Calories',
+    'PROCNT': 'Protein (g)',
+    'FAT': 'Fat (g)',
+    'CHOCDF': 'Carbohydrates (g)',
+    'FIBTG': 'Fiber (g)',
+}
+CALORIES = NUTRIENT_KEYS.index('ENERC_KCAL')
+
+_packer = struct.Struct(f'<{len(NUTRIENT_KEYS)}f')
+ZERO_VECTOR = (0.0,) * len(NUTRIENT_KEYS)
+
+NutrientVector = Tuple[float, ...]
+
+
+def pack(vector: Sequence[float]) -> bytes:
+    return _packer.pack(*vector)
+
+
+def unpack(data: Optional[bytes]) -> Optional[NutrientVector]:
+    if not data:
+        return None
+    return _packer.unpack(bytes(data))
+
+
+def vector_from_nutrients(nutrients: Dict[str, float]) -> NutrientVector:
+    return tuple(float(nutrients.get(key) or 0) for key in NUTRIENT_KEYS)
+
+
+def sum_vectors(vectors: Iterable[Optional[Sequence[float]]]) -> NutrientVector:
+    """
+    Column-wise total of many vectors in a single pass, skipping missing ones.
+    """
+    columns = list(zip(*(v for v in vectors if v is not None)))
+    if not columns:
+        return ZERO_VECTOR
+    return tuple(sum(column) for column in columns)
+
+
+def sum_packed(rows: Iterable[Optional[bytes]]) -> NutrientVector:
+    return sum_vectors(unpack(row) for row in rows)
+
+
+def labelled(vector: Sequence[float]) -> List[Tuple[str, float]]:
+    return [(NUTRIENT_LABELS[key], round(value, 1)) for key, value in zip(NUTRIENT_KEYS, vector)]
@@ -0,0 +1,138 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    A single page of results along with the opaque cursors needed
+    to request the pages on either side of it.
+    """
+    def __init__(self, items: list, next_cursor: Optional[str] = None,
+                 previous_cursor: Optional[str] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values: Sequence) -> str:
+    serialized = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(serialized, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, queryset, ordering: Sequence[str]) -> list:
+    """
+    Turn an opaque cursor back into the key values of `ordering`,
+    converted to the python types of the corresponding model fields.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor(cursor)
+
+    opts = queryset.model._meta
+    converted = []
+    for field_name, value in zip(_field_names(ordering), values):
+        # encode_cursor only writes strings and integers, and keys are never null
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            raise InvalidCursor(cursor)
+        try:
+            field = opts.get_field(field_name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. search rank) are plain JSON values
+            converted.append(value)
+            continue
+        try:
+            converted.append(field.to_python(value))
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor(cursor)
+    return converted
+
+
+def paginate(queryset, ordering: Sequence[str], after: Optional[str] = None,
+             before: Optional[str] = None, page_size: int = 25) -> KeysetPage:
+    """
+    Keyset paginate `queryset` by `ordering`, which must uniquely order rows
+    (end it with the primary key). `after` returns the page following the
+    cursor in `ordering` order, `before` the page preceding it.
+    Page N only ever reads `page_size + 1` rows, regardless of N.
+    """
+    field_names = _field_names(ordering)
+
+    if before:
+        boundary = decode_cursor(before, queryset, ordering)
+        reversed_ordering = [_reverse_order(o) for o in ordering]
+        rows = list(queryset.filter(_keyset_filter(reversed_ordering, boundary))
+                    .order_by(*reversed_ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        previous_cursor = _cursor_for(items[0], field_names) if items and has_more else None
+        next_cursor = _cursor_for(items[-1], field_names) if items else None
+        return KeysetPage(items, next_cursor, previous_cursor)
+
+    if after:
+        boundary = decode_cursor(after, queryset, ordering)
+        queryset = queryset.filter(_keyset_filter(ordering, boundary))
+
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    next_cursor = _cursor_for(items[-1], field_names) if items and has_more else None
+    previous_cursor = _cursor_for(items[0], field_names) if items and after else None
+    return KeysetPage(items, next_cursor, previous_cursor)
+
+
+def _field_names(ordering: Sequence[str]):
+    return [o.lstrip('-') for o in ordering]
+
+
+def _reverse_order(order: str):
+    return order[1:] if order.startswith('-') else f'-{order}'
+
+
+def _cursor_for(obj, field_names):
+    return encode_cursor([getattr(obj, name) for name in field_names])
+
+
+def _keyset_filter(ordering: Sequence[str], boundary: list):
+    """
+    Build the row-value comparison (a, b, c) > (x, y, z) as
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+    flipping each comparison for descending fields.
+    """
+    condition = Q()
+    equal_prefix = {}
+    for order, value in zip(ordering, boundary):
+        name = order.lstrip('-')
+        lookup = 'lt' if order.startswith('-') else 'gt'
+        condition |= Q(**equal_prefix, **{f'{name}__{lookup}': value})
+        equal_prefix[name] = value
+    return condition
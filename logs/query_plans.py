@@ -0,0 +1,117 @@
+"""
+Query plans of the hot query paths.
+
+Each entry in HOT_QUERIES builds the queryset a view runs on every request,
+along with the indexes added for it. `compare` explains and times a query
+as it is, then again after dropping those indexes inside a savepoint that
+is rolled back, to show the plan each index buys. `seed` fills the tables
+with synthetic rows first, so plans and timings reflect a large dataset.
+"""
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from access.models import CustomUser
+from benchmarks import seeding
+from settings.models import Privacy
+from .models import Comment, Log
+
+# Username (and email) prefix of the users `seed` creates
+SEED_PREFIX = 'explain'
+
+
+@dataclass
+class HotQuery:
+    label: str
+    indexes: List[str]
+    build: Callable
+
+
+@dataclass
+class PlanComparison:
+    label: str
+    indexes: List[str]
+    plan: str
+    plan_without: str
+    milliseconds: float
+    milliseconds_without: float
+
+
+def _busiest_log():
+    return Log.objects.order_by('-comment_count', 'id').values_list('id', flat=True).first()
+
+
+def _busiest_creator():
+    return Log.objects.order_by('-id').values_list('creator_id', flat=True).first()
+
+
+def _uncached_creators():
+    # The few creators of a feed page settings.visibility hasn't cached yet
+    return set(Log.objects.order_by('-pub_date', '-id').values_list('creator_id', flat=True)[:5])
+
+
+HOT_QUERIES = [
+    HotQuery('Home feed page', ['log_public_pub_date_id_idx', 'log_pub_date_id_idx'],
+             lambda: Log.objects.filter(is_public=True, pub_date__lte=timezone.now())
+             .order_by('-pub_date', '-id')[:26]),
+    HotQuery('Profile logs', ['log_creator_pub_date_id_idx'],
+             lambda: Log.objects.filter(creator=_busiest_creator()).order_by('-pub_date', '-id')[:50]),
+    HotQuery('Comment thread page', ['comment_log_pub_date_id_idx'],
+             lambda: Comment.objects.filter(log=_busiest_log(), pub_date__lte=timezone.now())
+             .order_by('-pub_date', '-id')[:51]),
+    HotQuery('Privacy of uncached creators', ['privacy_user_show_logs_idx'],
+             lambda: Privacy.objects.filter(user__in=_uncached_creators()).values_list('user_id', 'show_logs')),
+    HotQuery('Login by email', ['user_email_idx'],
+             lambda: CustomUser.objects.filter(email=f'{SEED_PREFIX}-1@example.com')),
+]
+
+
+def compare(hot_query: HotQuery, repeat: int = 20) -> PlanComparison:
+    queryset = hot_query.build()
+    plan, milliseconds = _explain(queryset, 'with indexes'), _time(queryset, repeat)
+
+    savepoint = transaction.savepoint()
+    try:
+        with connection.cursor() as cursor:
+            for name in hot_query.indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        queryset = hot_query.build()
+        plan_without, milliseconds_without = _explain(queryset, 'without indexes'), _time(queryset, repeat)
+    finally:
+        transaction.savepoint_rollback(savepoint)
+
+    return PlanComparison(hot_query.label, hot_query.indexes, plan, plan_without,
+                          milliseconds, milliseconds_without)
+
+
+def seed(log_count: int):
+    """
+    Seed `log_count` logs with benchmarks.seeding, then analyze the tables
+    so the planner has statistics about them.
+    """
+    seeding.seed(seeding.SeedConfig(users=max(1, log_count // 20), logs=log_count,
+                                    comments=log_count * 2, username_prefix=SEED_PREFIX))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def _explain(queryset, tag: str) -> str:
+    # Tagging the statement keeps the driver from reusing a plan prepared
+    # before the indexes were dropped, which QuerySet.explain() would do
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} /* {tag} */ {sql}', params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def _time(queryset, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset._chain())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
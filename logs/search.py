@@ -0,0 +1,136 @@
+"""
+Full-text log search backed by an SQLite FTS5 table.
+
+`logs_logsearch` holds one row per log (rowid = log id) with the food's name,
+description and ingredients and the creator's username, kept in sync by the
+receivers in logs.signals. The trigram tokenizer matches any substring of at
+least three characters, so prefixes and partial words still match as they
+did with icontains, but through the index.
+
+Searches join the table through the unmanaged LogSearch model. Results are
+ranked by which fields contain each term, weighted by RANK_WEIGHTS, rather
+than bm25: bm25 depends on statistics of the whole index, so ranks would
+shift as logs are added and cursor pages could repeat or skip results.
+"""
+import re
+from typing import Iterable
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from access.models import CustomUser
+from .models import Food, Log, LogSearch
+
+SEARCH_TABLE = LogSearch._meta.db_table
+# Trigrams can't match anything shorter, and SQLite only has them since 3.34
+MIN_TERM_LENGTH = 3
+MIN_SQLITE_VERSION = (3, 34, 0)
+# Best match first, newest first among equally good matches
+SEARCH_ORDERING = ('search_rank', '-pub_date', '-id')
+# How much a term found in each indexed field adds to a log's relevance
+RANK_WEIGHTS = {
+    'food__name': 4,
+    'creator__username': 2,
+    'food__desc': 1,
+    'food__ingredients': 1,
+}
+
+_term_pattern = re.compile(r'\S+')
+
+
+def is_supported() -> bool:
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= MIN_SQLITE_VERSION
+
+
+def query_terms(query: str) -> list:
+    return [term for term in _term_pattern.findall(query) if len(term) >= MIN_TERM_LENGTH]
+
+
+def fts_query(query: str) -> str:
+    """
+    Turn user input into an FTS5 query requiring every term of at least
+    MIN_TERM_LENGTH characters, each quoted so operators are taken literally.
+    Returns '' when no term is long enough.
+    """
+    terms = query_terms(query)
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def search(queryset, query: str):
+    """
+    Filter a Log queryset to the logs matching `query`. Indexed searches are
+    annotated with `search_rank` (lower is better, and depending only on the
+    log and the query, so cursors stay valid) for ordering by
+    SEARCH_ORDERING; queries too short for the index fall back to substring
+    matching on food name and username, ordered like the feed.
+    Returns the queryset and whether it is ranked.
+    """
+    match = fts_query(query) if is_supported() else ''
+    if not match:
+        return queryset.filter(
+            Q(creator__username__icontains=query) | Q(food__name__icontains=query)
+        ), False
+
+    # Negated, so better matches sort first like the rest of SEARCH_ORDERING
+    rank = Value(0, output_field=IntegerField())
+    for term in query_terms(query):
+        for field, weight in RANK_WEIGHTS.items():
+            rank -= Case(When(**{f'{field}__icontains': term}, then=Value(weight)), default=Value(0))
+    return queryset.filter(search_entry__document__match=match).annotate(search_rank=rank), True
+
+
+def index_logs(log_ids: Iterable[int]):
+    log_ids = list(log_ids)
+    if not log_ids or not is_supported():
+        return
+
+    placeholders = ', '.join(['%s'] * len(log_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', log_ids)
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, description, ingredients, username) '
+            f'SELECT l.id, f.name, f."desc", f.ingredients, u.username '
+            f'FROM {Log._meta.db_table} l '
+            f'JOIN {Food._meta.db_table} f ON f.id = l.food_id '
+            f'JOIN {CustomUser._meta.db_table} u ON u.id = l.creator_id '
+            f'WHERE l.id IN ({placeholders})', log_ids
+        )
+
+
+def remove_log(log_id: int):
+    if is_supported():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [log_id])
+
+
+def rename_creator(user: CustomUser):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {SEARCH_TABLE} SET username = %s '
+            f'WHERE rowid IN (SELECT id FROM {Log._meta.db_table} WHERE creator_id = %s) '
+            f'AND username != %s', [user.username, user.id, user.username]
+        )
+
+
+def rebuild_index(batch_size: int = 1000) -> int:
+    """
+    Reindex every log. Returns the number indexed.
+    """
+    if not is_supported():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    indexed = 0
+    batch = []
+    for log_id in Log.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        batch.append(log_id)
+        if len(batch) >= batch_size:
+            index_logs(batch)
+            indexed += len(batch)
+            batch = []
+    index_logs(batch)
+    return indexed + len(batch)
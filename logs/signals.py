@@ -0,0 +1,59 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from access.models import CustomUser
+from settings.models import Privacy
+from . import search
+from .models import Comment, Food, Log
+
+# Sent with `food`, `old_calories` and `new_calories` when a food's
+# calories are filled in after it was saved
+food_calories_changed = Signal()
+
+# Fields copied into the search index
+FOOD_SEARCH_FIELDS = {'name', 'desc', 'ingredients'}
+
+
+@receiver(post_save, sender=Log)
+def index_log(sender, instance, **kwargs):
+    search.index_logs([instance.id])
+
+
+@receiver(post_delete, sender=Log)
+def unindex_log(sender, instance, **kwargs):
+    search.remove_log(instance.id)
+
+
+@receiver(post_save, sender=Food)
+def reindex_food(sender, instance, created, update_fields=None, **kwargs):
+    # New foods get indexed along with the log created for them
+    if created or (update_fields is not None and not FOOD_SEARCH_FIELDS & set(update_fields)):
+        return
+    search.index_logs(Log.objects.filter(food=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=CustomUser)
+def reindex_creator(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save last_login only
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    search.rename_creator(instance)
+
+
+@receiver(post_save, sender=Privacy)
+def privacy_changed(sender, instance, **kwargs):
+    Log.objects.filter(creator=instance.user_id).exclude(is_public=instance.show_logs)\
+        .update(is_public=instance.show_logs)
+
+
+@receiver(post_save, sender=Comment)
+def comment_added(sender, instance, created, **kwargs):
+    if created:
+        Log.objects.filter(pk=instance.log_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_removed(sender, instance, **kwargs):
+    Log.objects.filter(pk=instance.log_id, comment_count__gt=0)\
+        .update(comment_count=F('comment_count') - 1)
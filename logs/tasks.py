@@ -0,0 +1,28 @@
+from jobs.queue import register
+
+from . import nutrients
+from .models import Food
+from .signals import food_calories_changed
+from .views import fetchIngredientData, parseNutrientData
+
+
+def give_up_on_calories(food_id: int):
+    # Leave the estimate at 0 rather than pending forever
+    Food.objects.filter(pk=food_id).update(calories_pending=False)
+
+
+@register('logs.calculate_calories', on_failure=give_up_on_calories)
+def calculate_calories(food_id: int):
+    try:
+        food = Food.objects.get(pk=food_id)
+    except Food.DoesNotExist:
+        # Log was deleted before its calories were calculated
+        return
+
+    ingred_json = fetchIngredientData(food.ingredients)
+    vector = parseNutrientData(ingred_json)
+    calories = round(vector[nutrients.CALORIES])
+    Food.objects.filter(pk=food_id).update(calories=calories, nutrients=nutrients.pack(vector),
+                                           calories_pending=False)
+    food_calories_changed.send(sender=Food, food=food, old_calories=food.calories,
+                               new_calories=calories)
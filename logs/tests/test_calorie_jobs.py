@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from logs.ingredient_cache import ingredient_cache
+from logs.models import Food, Log
+from test_util import account_util
+
+
+def fake_parsed(ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 150}}}]
+
+
+@override_settings(JOBS_WORKER_THREADS=0, JOBS_MAX_ATTEMPTS=2)
+@mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+class CalorieJobTests(TestCase):
+    def setUp(self):
+        ingredient_cache.memory.clear()
+        self.user = account_util.create_random_valid_user()
+        self.client.force_login(self.user)
+        self.form_data = {'name': 'rice bowl', 'desc': 'lunch',
+                          'ingredients': 'white rice, chicken breast'}
+
+    def test_create_log_does_not_call_api(self, request_mock):
+        """
+        Creating a log should save it immediately and leave the lookup to a job
+        """
+        response = self.client.post(reverse('logs:create-log'), self.form_data)
+        self.assertRedirects(response, reverse('logs:index'))
+
+        request_mock.assert_not_called()
+        food = Log.objects.get(creator=self.user).food
+        self.assertTrue(food.calories_pending)
+        self.assertTrue(Job.objects.filter(name='logs.calculate_calories',
+                                           payload={'food_id': food.id}).exists())
+
+    def test_job_fills_in_calories(self, request_mock):
+        """
+        Running the queued job should store the calories and clear the pending state
+        """
+        self.client.post(reverse('logs:create-log'), self.form_data)
+        queue.run_pending()
+
+        food = Food.objects.get(creator=self.user)
+        self.assertFalse(food.calories_pending)
+        self.assertEqual(food.calories, 300)
+
+    def test_detail_shows_pending_state(self, request_mock):
+        """
+        The detail page should show the calories are still being calculated
+        """
+        self.client.post(reverse('logs:create-log'), self.form_data)
+        log = Log.objects.get(creator=self.user)
+
+        response = self.client.get(reverse('logs:detail', args=[log.id]))
+        self.assertContains(response, 'calories-pending')
+
+        queue.run_pending()
+        response = self.client.get(reverse('logs:detail', args=[log.id]))
+        self.assertNotContains(response, 'calories-pending')
+        self.assertContains(response, 'Estimated Calories: 300')
+
+    def test_failing_lookup_stops_pending(self, request_mock):
+        """
+        Once retries are exhausted the food should no longer be shown as pending
+        """
+        request_mock.side_effect = ConnectionError('api down')
+        self.client.post(reverse('logs:create-log'), self.form_data)
+        for _ in range(2):
+            Job.objects.update(run_after=timezone.now())
+            queue.run_pending()
+
+        food = Food.objects.get(creator=self.user)
+        self.assertFalse(food.calories_pending)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_deleted_log_job_is_noop(self, request_mock):
+        """
+        A log deleted before its job runs should not make the job fail
+        """
+        self.client.post(reverse('logs:create-log'), self.form_data)
+        Food.objects.all().delete()
+
+        queue.run_pending()
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        request_mock.assert_not_called()
@@ -0,0 +1,95 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from logs.models import Comment
+from test_util import account_util, log_util
+
+
+class CommentCountTests(TestCase):
+    def setUp(self):
+        self.log = log_util.create_default_log()
+        self.user = account_util.create_random_valid_user()
+        self.client.force_login(self.user)
+
+    def test_comment_view_increments_count(self):
+        """
+        Posting a comment should update the log's stored count and the header
+        """
+        for text in ('first', 'second'):
+            self.client.post(reverse('logs:add-comment', args=[self.log.id]),
+                             log_util.create_comment_form(text))
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.comment_count, 2)
+
+        response = self.client.get(reverse('logs:detail', args=[self.log.id]))
+        self.assertContains(response, '2 Comments')
+
+    def test_blank_comment_not_counted(self):
+        self.client.post(reverse('logs:add-comment', args=[self.log.id]),
+                         log_util.create_comment_form('   '))
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.comment_count, 0)
+
+    def test_deleting_comment_decrements_count(self):
+        comment = log_util.create_comment(self.user, self.log, 'gone soon', 1)
+        comment.delete()
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.comment_count, 0)
+
+
+@override_settings(LOG_COMMENT_PAGE_SIZE=3)
+class CommentPaginationTests(TestCase):
+    def setUp(self):
+        self.log = log_util.create_default_log()
+        commenter = account_util.create_random_valid_user()
+        # Newest first, matching the thread ordering
+        self.comments = [log_util.create_comment(commenter, self.log, f'comment {i}', i + 1)
+                         for i in range(7)]
+
+    def get(self, url=None):
+        return self.client.get(url or reverse('logs:detail', args=[self.log.id]))
+
+    def test_first_page_is_newest_comments(self):
+        """
+        Only the newest page of comments should be loaded, with the total
+        count still shown
+        """
+        response = self.get()
+        self.assertEqual(response.context['comment_list'], self.comments[:3])
+        self.assertContains(response, '7 Comments')
+        self.assertIsNone(response.context['newer_comments_url'])
+        self.assertIsNotNone(response.context['older_comments_url'])
+
+    def test_walk_through_pages(self):
+        """
+        Following the older links should visit every comment exactly once,
+        and newer links should lead back
+        """
+        seen = []
+        url = None
+        while True:
+            response = self.get(url)
+            seen.extend(response.context['comment_list'])
+            url = response.context['older_comments_url']
+            if url is None:
+                break
+        self.assertEqual(seen, self.comments)
+
+        newer = self.get(response.context['newer_comments_url'])
+        self.assertEqual(newer.context['comment_list'], self.comments[3:6])
+
+    def test_cursor_links_stay_on_detail_page(self):
+        url = self.get().context['older_comments_url']
+        parsed = urlparse(url)
+        self.assertEqual(parsed.path, reverse('logs:detail', args=[self.log.id]))
+        self.assertIn('after', parse_qs(parsed.query))
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('logs:detail', args=[self.log.id]), {'after': 'garbage'})
+        self.assertEqual(response.context['comment_list'], self.comments[:3])
+
+    def test_counts_match_stored_rows(self):
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.comment_count, Comment.objects.filter(log=self.log).count())
@@ -0,0 +1,59 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from access.models import CustomUser
+from logs.models import Log
+from settings.models import Privacy
+from test_util import account_util, log_util, settings_util
+
+
+class FeedVisibilityTests(TestCase):
+    def setUp(self):
+        # Privacy rows created out of step with users, so their ids differ
+        self.public_user = account_util.create_user('public', save=False)
+        self.public_user.save()
+        self.private_user = account_util.create_user('private', save=True)
+        account_util.generatePrivacySetting(self.public_user)
+        self.set_show_logs(self.private_user, False)
+
+    def set_show_logs(self, user: CustomUser, show_logs: bool):
+        privacy = Privacy.objects.get(user=user)
+        privacy.show_logs = show_logs
+        privacy.save()
+
+    def feed(self):
+        return self.client.get(reverse('logs:index')).context['latest_logs']
+
+    def test_new_logs_copy_creator_privacy(self):
+        public_log = log_util.create_random_log(self.public_user)
+        private_log = log_util.create_random_log(self.private_user)
+        self.assertTrue(public_log.is_public)
+        self.assertFalse(private_log.is_public)
+
+    def test_feed_shows_only_public_users(self):
+        """
+        The feed should filter by users' privacy settings, not by Privacy ids
+        """
+        self.assertNotEqual(Privacy.objects.get(user=self.public_user).id, self.public_user.id)
+        public_log = log_util.create_random_log(self.public_user)
+        log_util.create_random_log(self.private_user)
+        self.assertEqual(self.feed(), [public_log])
+
+    def test_privacy_changes_update_logs(self):
+        """
+        Changing the privacy setting should hide or reveal every existing log
+        """
+        logs = [log_util.create_random_log(self.public_user) for _ in range(3)]
+        self.client.force_login(self.public_user)
+        self.client.post(reverse('settings:privacy'), settings_util.create_log_setting_form(False))
+        self.assertFalse(Log.objects.filter(pk__in=[log.pk for log in logs], is_public=True).exists())
+        self.assertEqual(self.feed(), [])
+
+        self.client.post(reverse('settings:privacy'), settings_util.create_log_setting_form(True))
+        self.assertEqual(len(self.feed()), 3)
+
+    def test_feed_doesnt_join_privacy(self):
+        log_util.create_random_log(self.public_user)
+        with self.assertNumQueries(1) as queries:
+            self.feed()
+        self.assertNotIn('settings_privacy', queries.captured_queries[0]['sql'])
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from logs import search
+from logs.models import Log
+from settings.models import Privacy
+from test_util import account_util, log_util, search_query_util
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.user = account_util.create_user('harriet', save=True)
+        self.now = timezone.now() - timedelta(hours=1)
+
+    def create_log(self, name: str, desc: str = 'desc', ingredients: str = '',
+                   user=None, minutes_ago: int = 0):
+        food = log_util.create_food(user or self.user, name, desc, ingredients=ingredients, save=True)
+        return log_util.create_log(user or self.user, food, self.now - timedelta(minutes=minutes_ago),
+                                   save=True)
+
+    def search(self, query: str, **params):
+        response = self.client.get(reverse('logs:index'), {'query': query, **params})
+        return response.context['latest_logs']
+
+    def test_matches_every_indexed_field(self):
+        """
+        Food name, description, ingredients and username should all be searchable
+        """
+        by_name = self.create_log('Mushroom risotto')
+        by_desc = self.create_log('Dinner', desc='Leftover lasagna')
+        by_ingredient = self.create_log('Lunch', ingredients='chickpeas, tahini')
+        other_user = account_util.create_user('bartholomew', save=True)
+        by_user = self.create_log('Snack', user=other_user)
+
+        self.assertEqual(self.search('risotto'), [by_name])
+        self.assertEqual(self.search('lasagna'), [by_desc])
+        self.assertEqual(self.search('tahini'), [by_ingredient])
+        self.assertEqual(self.search('bartholomew'), [by_user])
+
+    def test_prefix_and_substring_matching(self):
+        """
+        Partial words should match, case-insensitively
+        """
+        log = self.create_log('Blueberry pancakes')
+        self.assertEqual(self.search('blue'), [log])
+        self.assertEqual(self.search('PANCAKE'), [log])
+        self.assertEqual(self.search('berry'), [log])
+
+    def test_every_term_required(self):
+        both = self.create_log('Chicken rice bowl')
+        self.create_log('Chicken soup')
+        self.assertEqual(self.search('chicken rice'), [both])
+
+    def test_results_ranked_by_relevance(self):
+        """
+        Logs matching the query more closely should come first regardless of age
+        """
+        weak = self.create_log('Salad', desc='With a side of avocado toast and coffee', minutes_ago=0)
+        strong = self.create_log('Avocado', desc='Avocado', ingredients='avocado', minutes_ago=10)
+        self.assertEqual(self.search('avocado'), [strong, weak])
+
+    def test_ranked_results_paginate(self):
+        """
+        Cursor pages of ranked results should cover every match exactly once
+        """
+        logs = {self.create_log(f'Pasta {i}', minutes_ago=i) for i in range(5)}
+        self.create_log('Curry')
+
+        seen = []
+        params = {'page_size': 2}
+        while True:
+            response = self.client.get(reverse('logs:index'), {'query': 'pasta', **params})
+            seen.extend(response.context['latest_logs'])
+            if not response.context['older_url']:
+                break
+            params['after'] = response.context['older_url'].split('after=')[1]
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), logs)
+
+    def test_ranked_pages_unaffected_by_new_logs(self):
+        """
+        Logs added between page loads shouldn't shift existing matches across
+        the cursor, so no match is repeated or skipped
+        """
+        logs = [self.create_log(f'Pasta {i}', desc='pasta' if i % 2 else 'dinner', minutes_ago=i)
+                for i in range(6)]
+        response = self.client.get(reverse('logs:index'), {'query': 'pasta', 'page_size': 3})
+        seen = list(response.context['latest_logs'])
+
+        for i in range(20):
+            self.create_log(f'Lunch {i}', desc='pasta salad', minutes_ago=100 + i)
+        after = response.context['older_url'].split('after=')[1]
+        response = self.client.get(reverse('logs:index'), {'query': 'pasta', 'page_size': 3, 'after': after})
+        seen.extend(log for log in response.context['latest_logs'] if log in logs)
+        self.assertEqual(sorted(log.id for log in seen), sorted(log.id for log in logs))
+
+    def test_old_sqlite_falls_back(self):
+        """
+        SQLite before 3.34 has no trigram tokenizer, so searches shouldn't use the index
+        """
+        log = self.create_log('Gazpacho')
+        with mock.patch.object(connection.Database, 'sqlite_version_info', (3, 31, 1)):
+            self.assertFalse(search.is_supported())
+            self.assertEqual(self.search('gazpacho'), [log])
+
+    def test_index_follows_edits_and_deletes(self):
+        """
+        Renamed foods, renamed users and deleted logs should be reflected in results
+        """
+        log = self.create_log('Porridge')
+        food = log.food
+        food.name = 'Oatmeal'
+        food.save()
+        self.assertEqual(self.search('porridge'), [])
+        self.assertEqual(self.search('oatmeal'), [log])
+
+        self.user.username = 'henrietta'
+        self.user.save()
+        self.assertEqual(self.search('henrietta'), [log])
+        self.assertEqual(self.search('harriet'), [])
+
+        food.delete()
+        self.assertEqual(self.search('oatmeal'), [])
+
+    def test_private_logs_excluded(self):
+        self.create_log('Secret sandwich')
+        privacy = Privacy.objects.get(user=self.user)
+        privacy.show_logs = False
+        privacy.save()
+        self.assertEqual(self.search('sandwich'), [])
+
+    def test_short_queries_use_substring_search(self):
+        log = self.create_log('Xylophone cake')
+        response = self.client.post(reverse('logs:index'), search_query_util.create_search_form('xy'))
+        self.assertEqual(response.context['latest_logs'], [log])
+
+    def test_query_syntax_is_literal(self):
+        """
+        FTS operators and quotes typed by users shouldn't raise errors
+        """
+        self.create_log('Fish and chips')
+        for query in ['"fish', 'fish OR', 'NEAR(fish)', 'chips*', "fish' --"]:
+            response = self.client.get(reverse('logs:index'), {'query': query})
+            self.assertEqual(response.status_code, 200)
+
+    def test_rebuild_command(self):
+        log = self.create_log('Dumplings')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.SEARCH_TABLE}')
+        self.assertEqual(self.search('dumplings'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn(f'Indexed {Log.objects.count()} logs', out.getvalue())
+        self.assertEqual(self.search('dumplings'), [log])
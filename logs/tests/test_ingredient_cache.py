@@ -0,0 +1,149 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import requests
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from logs import views
+from logs.ingredient_cache import ingredient_cache, normalize_ingredient
+from logs.ingredient_client import IngredientLookupError
+from logs.models import IngredientCacheEntry
+
+
+def fake_parsed(ingredient: str, calories: int = 100):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': calories}}}]
+
+
+@mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+class IngredientCacheTests(TestCase):
+    def setUp(self):
+        ingredient_cache.clear()
+        ingredient_cache.reset_stats()
+
+    def test_normalize_ingredient(self, request_mock):
+        """
+        Case and whitespace differences should map to the same cache key
+        """
+        self.assertEqual(normalize_ingredient('  White   RICE '), 'white rice')
+
+    def test_repeat_lookup_not_requested(self, request_mock):
+        """
+        Ingredients looked up once should never be requested again
+        """
+        views.fetchIngredientData('white rice, chicken breast')
+        views.fetchIngredientData('Chicken Breast,white rice ')
+        self.assertEqual(request_mock.call_count, 2)
+        self.assertEqual(ingredient_cache.stats(),
+                         {'memory_hits': 2, 'db_hits': 0, 'misses': 2})
+
+    def test_duplicate_ingredients_requested_once(self, request_mock):
+        """
+        Repeated ingredients in one meal should be fetched once but still counted twice
+        """
+        ingred_json = views.fetchIngredientData('egg, egg, ,toast')
+        self.assertEqual(request_mock.call_count, 2)
+        self.assertEqual(views.parseCalorieData(ingred_json), 300)
+
+    def test_database_tier_survives_memory_eviction(self, request_mock):
+        """
+        Lookups should be served from the database once the in-process tier forgets them
+        """
+        views.fetchIngredientData('white rice')
+        ingredient_cache.memory.clear()
+
+        ingred_json = views.fetchIngredientData('white rice')
+        self.assertEqual(request_mock.call_count, 1)
+        self.assertEqual(ingred_json, fake_parsed('white rice'))
+        self.assertEqual(ingredient_cache.stats()['db_hits'], 1)
+        self.assertEqual(IngredientCacheEntry.objects.get(key='white rice').hit_count, 1)
+
+    def test_expired_entries_are_refetched(self, request_mock):
+        """
+        Entries older than the TTL should be looked up again
+        """
+        views.fetchIngredientData('white rice')
+        ingredient_cache.memory.clear()
+        IngredientCacheEntry.objects.update(fetched_at=timezone.now() - timedelta(days=365))
+
+        views.fetchIngredientData('white rice')
+        self.assertEqual(request_mock.call_count, 2)
+        self.assertEqual(IngredientCacheEntry.objects.count(), 1)
+
+    @override_settings(INGREDIENT_CACHE_MAX_ENTRIES=3, INGREDIENT_CACHE_MEMORY_SIZE=2)
+    def test_eviction_is_size_bounded(self, request_mock):
+        """
+        Both tiers should stay within their size limits, dropping least recently used entries
+        """
+        views.fetchIngredientData('a, b, c')
+        views.fetchIngredientData('a')
+        views.fetchIngredientData('d, e')
+
+        self.assertLessEqual(len(ingredient_cache.memory), 2)
+        self.assertEqual(IngredientCacheEntry.objects.count(), 3)
+        self.assertTrue(IngredientCacheEntry.objects.filter(key='e').exists())
+
+    @override_settings(INGREDIENT_CACHE_MAX_ENTRIES=100)
+    def test_writes_only_count_rows_occasionally(self, request_mock):
+        """
+        Inserts below the size limit shouldn't count or trim the table each time
+        """
+        ingredient_cache.set('a', fake_parsed('a'))
+        # Counted once, then estimated
+        with CaptureQueriesContext(connection) as queries:
+            ingredient_cache.set('b', fake_parsed('b'))
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        with override_settings(INGREDIENT_CACHE_MAX_ENTRIES=2):
+            ingredient_cache.set('c', fake_parsed('c'))
+        self.assertEqual(IngredientCacheEntry.objects.count(), 2)
+
+    @override_settings(INGREDIENT_CACHE_HIT_FLUSH_SIZE=3)
+    def test_memory_hits_reach_database(self, request_mock):
+        """
+        Hits served from memory should refresh their rows in batches, so the
+        database doesn't evict the hottest keys
+        """
+        views.fetchIngredientData('white rice')
+        IngredientCacheEntry.objects.update(last_used=timezone.now() - timedelta(days=1))
+        views.fetchIngredientData('white rice')
+        views.fetchIngredientData('white rice')
+        self.assertEqual(IngredientCacheEntry.objects.get(key='white rice').hit_count, 0)
+
+        views.fetchIngredientData('white rice')
+        entry = IngredientCacheEntry.objects.get(key='white rice')
+        self.assertEqual(entry.hit_count, 3)
+        self.assertGreater(entry.last_used, timezone.now() - timedelta(minutes=1))
+
+    def test_failed_request_not_cached(self, request_mock):
+        """
+        Errors from the nutrition API should propagate and not be cached
+        """
+        def fail_on_rice(ingredient):
+            if ingredient == 'white rice':
+                raise requests.HTTPError('rate limited')
+            return fake_parsed(ingredient)
+
+        request_mock.side_effect = fail_on_rice
+        with self.assertRaises(IngredientLookupError):
+            views.fetchIngredientData('white rice, egg')
+        # Ingredients that did succeed are kept for the retry
+        self.assertEqual(list(IngredientCacheEntry.objects.values_list('key', flat=True)), ['egg'])
+
+    def test_stats_command(self, request_mock):
+        """
+        The management command should report the API calls saved by the database tier
+        """
+        views.fetchIngredientData('white rice')
+        ingredient_cache.memory.clear()
+        views.fetchIngredientData('white rice')
+
+        out = StringIO()
+        call_command('ingredient_cache', stdout=out)
+        self.assertIn('API calls saved by the cache: 1', out.getvalue())
+
+        call_command('ingredient_cache', '--clear', stdout=out)
+        self.assertFalse(IngredientCacheEntry.objects.exists())
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.test import SimpleTestCase, override_settings
+
+from logs.ingredient_client import IngredientClient, IngredientLookupError
+
+
+class StandInParserHandler(BaseHTTPRequestHandler):
+    """
+    Mimics the Edamam parser: each ingredient is worth 100 calories and takes
+    `latency` seconds, except 'slow' ingredients which never answer in time
+    and 'broken' ingredients which error.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        ingredient = parse_qs(urlparse(self.path).query)['ingr'][0]
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests.append(ingredient)
+
+        if ingredient == 'broken':
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        time.sleep(5 if ingredient == 'slow' else server.latency)
+        body = json.dumps({'parsed': [
+            {'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 100}}}
+        ]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class IngredientClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInParserHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/api/food-database/v2/parser'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.connections = set()
+        self.server.requests = []
+        self.server.latency = 0
+        self.settings_override = override_settings(INGREDIENT_API_URL=self.url,
+                                                   INGREDIENT_API_TIMEOUT=(1, 1),
+                                                   INGREDIENT_API_MAX_CONCURRENCY=10)
+        self.settings_override.enable()
+        self.client = IngredientClient()
+
+    def tearDown(self):
+        self.client.close()
+        self.settings_override.disable()
+
+    def test_fetch_single_ingredient(self):
+        """
+        A single ingredient should be looked up and its parsed foods returned
+        """
+        parsed = self.client.fetch('white rice')
+        self.assertEqual(parsed[0]['food']['label'], 'white rice')
+        self.assertEqual(self.server.requests, ['white rice'])
+
+    def test_fetch_many_runs_concurrently(self):
+        """
+        Ten ingredients should take about one round-trip, not ten
+        """
+        self.server.latency = 0.3
+        ingredients = [f'ingredient {i}' for i in range(10)]
+
+        start = time.monotonic()
+        results = self.client.fetch_many(ingredients)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(set(results), set(ingredients))
+        self.assertEqual(sorted(self.server.requests), sorted(ingredients))
+        self.assertLess(elapsed, 0.3 * 10 / 2)
+
+    def test_session_keeps_connections_alive(self):
+        """
+        Sequential lookups should reuse one pooled connection
+        """
+        for i in range(5):
+            self.client.fetch(f'ingredient {i}')
+        self.assertEqual(len(self.server.connections), 1)
+
+    @override_settings(INGREDIENT_API_MAX_CONCURRENCY=2)
+    def test_concurrency_is_bounded(self):
+        """
+        No more than the configured number of connections should be opened
+        """
+        client = IngredientClient()
+        self.server.latency = 0.05
+        client.fetch_many([f'ingredient {i}' for i in range(8)])
+        client.close()
+        self.assertLessEqual(len(self.server.connections), 2)
+
+    def test_timeout_and_errors_reported_per_ingredient(self):
+        """
+        A slow or failing ingredient shouldn't hide the ingredients that succeeded
+        """
+        start = time.monotonic()
+        with self.assertRaises(IngredientLookupError) as cm:
+            self.client.fetch_many(['egg', 'slow', 'broken'])
+        self.assertLess(time.monotonic() - start, 4)
+
+        self.assertEqual(set(cm.exception.results), {'egg'})
+        self.assertEqual(set(cm.exception.errors), {'slow', 'broken'})
@@ -0,0 +1,95 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from logs import views
+from logs.ingredient_cache import ingredient_cache
+from logs.local_nutrients import local_nutrients, strip_quantity
+from logs.models import LocalNutrient
+
+
+def fake_parsed(ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 1000}}}]
+
+
+class LocalNutrientTests(TestCase):
+    def setUp(self):
+        ingredient_cache.memory.clear()
+        call_command('import_nutrients', stdout=StringIO())
+
+    def tearDown(self):
+        local_nutrients.invalidate()
+
+    def write_csv(self, content: str):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as csv_file:
+            csv_file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def calories_for(self, ingredient: str):
+        parsed = local_nutrients.lookup(ingredient)
+        return parsed[0]['food']['nutrients']['ENERC_KCAL'] if parsed else None
+
+    def test_bundled_table_imported(self):
+        """
+        The bundled table should be imported when no CSV is given
+        """
+        self.assertTrue(LocalNutrient.objects.filter(name='white rice').exists())
+
+    def test_exact_match(self):
+        self.assertEqual(self.calories_for('White Rice'), 130)
+
+    def test_quantities_and_plurals_ignored(self):
+        """
+        Amounts, units and plurals shouldn't prevent a match
+        """
+        self.assertEqual(strip_quantity('1 1/2 cups of white rice'), 'white rice')
+        self.assertEqual(self.calories_for('1 cup white rice'), 130)
+        self.assertEqual(self.calories_for('2 eggs'), 143)
+        self.assertEqual(self.calories_for('200g tomatoes'), 18)
+
+    def test_fuzzy_match(self):
+        """
+        Small misspellings should still match the closest local name
+        """
+        self.assertEqual(self.calories_for('chiken breast'), 165)
+        self.assertIsNone(self.calories_for('chicken soup'))
+
+    @mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+    def test_local_ingredients_skip_api(self, fetch_mock):
+        """
+        Only ingredients missing from the local table should reach the API
+        """
+        ingred_json = views.fetchIngredientData('1 cup white rice, chicken breast, dragonfruit')
+        fetch_mock.assert_called_once_with('dragonfruit')
+        self.assertEqual(views.parseCalorieData(ingred_json), 130 + 165 + 1000)
+
+    def test_import_usda_style_csv(self):
+        """
+        USDA style headers should be recognised, and re-importing should update rows
+        """
+        path = self.write_csv('Description,Energy (kcal),Protein (g),Total lipid (fat) (g)\n'
+                              'Dragonfruit,60,1.2,0\n'
+                              'White Rice,131,2.7,0.3\n')
+        out = StringIO()
+        call_command('import_nutrients', path, stdout=out)
+
+        self.assertIn('Imported 2 nutrients', out.getvalue())
+        self.assertEqual(self.calories_for('dragonfruit'), 60)
+        self.assertEqual(self.calories_for('white rice'), 131)
+
+    def test_import_replace(self):
+        path = self.write_csv('name,calories\ndragonfruit,60\n')
+        call_command('import_nutrients', path, '--replace', stdout=StringIO())
+        self.assertEqual(list(LocalNutrient.objects.values_list('name', flat=True)), ['dragonfruit'])
+
+    def test_import_requires_name_and_calories(self):
+        path = self.write_csv('food,protein\negg,12\n')
+        with self.assertRaises(CommandError):
+            call_command('import_nutrients', path, stdout=StringIO())
@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from logs.pagination import encode_cursor
+from test_util import account_util, log_util, search_query_util
+
+
+@override_settings(LOG_FEED_PAGE_SIZE=3)
+class LogFeedPaginationTests(TestCase):
+    def setUp(self):
+        self.num_logs = 7
+        self.user = account_util.create_random_valid_user()
+        now = timezone.now() - timedelta(hours=1)
+        # Newest first, matching the feed ordering
+        self.logs = []
+        for i in range(self.num_logs):
+            food = log_util.create_food(self.user, f'food{i}', 'desc', save=True)
+            log = log_util.create_log(self.user, food, now - timedelta(minutes=i), save=True)
+            self.logs.append(log)
+
+    def test_first_page_is_newest_logs(self):
+        """
+        The feed should only render the newest page of logs
+        """
+        response = self.client.get(reverse('logs:index'))
+        self.assertEqual(response.context['latest_logs'], self.logs[:3])
+        self.assertContains(response, '<li>', count=3)
+        self.assertIsNone(response.context['newer_url'])
+        self.assertIsNotNone(response.context['older_url'])
+
+    def test_walk_older_pages(self):
+        """
+        Following the older links should visit every log exactly once
+        """
+        seen = []
+        url = reverse('logs:index')
+        while url:
+            response = self.client.get(url)
+            seen.extend(response.context['latest_logs'])
+            url = response.context['older_url']
+
+        self.assertEqual(seen, self.logs)
+
+    def test_newer_link_returns_previous_page(self):
+        """
+        Going older then newer should return to the first page
+        """
+        response = self.client.get(reverse('logs:index'))
+        response = self.client.get(response.context['older_url'])
+        self.assertEqual(response.context['latest_logs'], self.logs[3:6])
+
+        response = self.client.get(response.context['newer_url'])
+        self.assertEqual(response.context['latest_logs'], self.logs[:3])
+        self.assertIsNone(response.context['newer_url'])
+
+    def test_equal_pub_dates_are_not_skipped(self):
+        """
+        Logs sharing a pub_date should be split across pages without
+        being skipped or repeated
+        """
+        pub_date = timezone.now() - timedelta(minutes=1)
+        tied = []
+        for i in range(4):
+            food = log_util.create_food(self.user, f'tied{i}', 'desc', save=True)
+            tied.append(log_util.create_log(self.user, food, pub_date, save=True))
+
+        response = self.client.get(reverse('logs:index'))
+        first_page = response.context['latest_logs']
+        response = self.client.get(response.context['older_url'])
+        second_page = response.context['latest_logs']
+
+        self.assertEqual(first_page + second_page[:1], tied[::-1])
+
+    def test_page_size_parameter(self):
+        """
+        Clients can ask for a different page size, bounded by the maximum
+        """
+        response = self.client.get(reverse('logs:index'), {'page_size': 5})
+        self.assertEqual(len(response.context['latest_logs']), 5)
+        self.assertIn('page_size=5', response.context['older_url'])
+
+        with self.settings(LOG_FEED_MAX_PAGE_SIZE=4):
+            response = self.client.get(reverse('logs:index'), {'page_size': 1000})
+            self.assertEqual(len(response.context['latest_logs']), 4)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """
+        A malformed cursor should fall back to the first page instead of erroring
+        """
+        for cursor in ['not-a-cursor', encode_cursor(['x']), encode_cursor(['bad date', 1])]:
+            response = self.client.get(reverse('logs:index'), {'after': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['latest_logs'], self.logs[:3])
+
+    def test_cursor_values_of_wrong_type_return_first_page(self):
+        """
+        Cursors holding JSON values of the wrong type for their key should
+        fall back to the first page instead of erroring
+        """
+        for values in [[None, 1], [1, 1], [{'a': 1}, 1], ['2020-01-01T00:00:00', None]]:
+            with self.subTest(values):
+                response = self.client.get(reverse('logs:index'), {'after': encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['latest_logs'], self.logs[:3])
+
+    def test_search_results_are_paginated(self):
+        """
+        Searching should page through matches and keep the query in the page links
+        """
+        other_user = account_util.create_random_valid_user()
+        food = log_util.create_food(other_user, 'unrelated', 'desc', save=True)
+        log_util.create_log(other_user, food, timezone.now(), save=True)
+
+        response = self.client.post(reverse('logs:index'),
+                                    search_query_util.create_search_form('food'))
+        self.assertEqual(response.context['latest_logs'], self.logs[:3])
+        self.assertIn('query=food', response.context['older_url'])
+
+        seen = list(response.context['latest_logs'])
+        url = response.context['older_url']
+        while url:
+            response = self.client.get(url)
+            seen.extend(response.context['latest_logs'])
+            url = response.context['older_url']
+        self.assertEqual(seen, self.logs)
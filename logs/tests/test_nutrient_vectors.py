@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from logs import nutrients, views
+from logs.ingredient_cache import ingredient_cache
+from logs.models import Food, Log
+from test_util import account_util, log_util
+
+
+def fake_parsed(ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {
+        'ENERC_KCAL': 100.4, 'PROCNT': 10, 'FAT': 2.5, 'CHOCDF': 12, 'FIBTG': 1,
+    }}}]
+
+
+class NutrientVectorTests(TestCase):
+    def test_pack_round_trip(self):
+        """
+        Packed vectors should be compact and unpack to the same values
+        """
+        vector = (100.5, 10.0, 2.5, 12.0, 1.0)
+        packed = nutrients.pack(vector)
+        self.assertEqual(len(packed), 4 * len(nutrients.NUTRIENT_KEYS))
+        self.assertEqual(nutrients.unpack(packed), vector)
+        self.assertIsNone(nutrients.unpack(None))
+
+    def test_missing_nutrients_are_zero(self):
+        self.assertEqual(nutrients.vector_from_nutrients({'ENERC_KCAL': 50, 'FAT': None}),
+                         (50.0, 0.0, 0.0, 0.0, 0.0))
+
+    def test_parse_nutrient_data_sums_ingredients(self):
+        """
+        Every ingredient's nutrients should be totalled per nutrient
+        """
+        ingred_json = fake_parsed('a') + fake_parsed('b')
+        self.assertEqual(views.parseNutrientData(ingred_json), (200.8, 20.0, 5.0, 24.0, 2.0))
+        self.assertEqual(views.parseCalorieData(ingred_json), 201)
+        self.assertEqual(views.parseNutrientData([]), nutrients.ZERO_VECTOR)
+
+    def test_total_nutrients_over_foods(self):
+        """
+        Totals over many foods should skip foods without calculated nutrients
+        """
+        user = account_util.create_random_valid_user()
+        for vector in [(100, 1, 2, 3, 4), (50, 1, 1, 1, 1), None]:
+            food = log_util.create_food(user, 'food', 'desc')
+            food.nutrients = nutrients.pack(vector) if vector else None
+            food.save()
+
+        self.assertEqual(Food.objects.filter(creator=user).total_nutrients(), (150, 2, 3, 4, 5))
+        self.assertEqual(Food.objects.none().total_nutrients(), nutrients.ZERO_VECTOR)
+
+
+@override_settings(JOBS_WORKER_THREADS=0)
+@mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+class FoodNutrientJobTests(TestCase):
+    def setUp(self):
+        ingredient_cache.memory.clear()
+        self.user = account_util.create_random_valid_user()
+        self.client.force_login(self.user)
+
+    def test_job_stores_nutrient_vector(self, fetch_mock):
+        """
+        The calorie job should store the full nutrient vector along with calories
+        """
+        self.client.post(reverse('logs:create-log'),
+                         {'name': 'bowl', 'desc': 'lunch', 'ingredients': 'rice, beans'})
+        queue.run_pending()
+
+        food = Food.objects.get(creator=self.user)
+        self.assertEqual(food.calories, 201)
+        self.assertAlmostEqual(food.nutrient_vector[0], 200.8, places=3)
+        self.assertEqual(food.nutrient_vector[1:], (20.0, 5.0, 24.0, 2.0))
+
+        log = Log.objects.get(food=food)
+        response = self.client.get(reverse('logs:detail', args=[log.id]))
+        self.assertContains(response, 'Protein (g)')
+        self.assertContains(response, 'nutrient-table')
@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from settings.visibility import privacy_cache
+from test_util import account_util, log_util, search_query_util
+
+
+class LogQueryBudgetTests(TestCase):
+    """
+    Each view has a fixed query budget that must not grow with the number
+    of rows rendered. A template touching an unloaded relation per row
+    will blow the budget and fail these tests.
+    """
+    index_budget = 1
+    detail_budget = 3
+
+    def create_logs(self, count: int):
+        for _ in range(count):
+            user = account_util.create_random_valid_user()
+            food = log_util.create_food(user, log_util.generateRandStr(8), 'desc', save=True)
+            log_util.create_log(user, food, timezone.now(), save=True)
+
+    def test_index_query_budget(self):
+        """
+        The feed should run the same number of queries for 1 or 20 logs
+        """
+        for count in (1, 19):
+            self.create_logs(count)
+            with self.assertNumQueries(self.index_budget):
+                response = self.client.get(reverse('logs:index'))
+            self.assertContains(response, 'log-entry-container')
+
+    def test_index_search_query_budget(self):
+        """
+        Searching the feed should not add per-row queries
+        """
+        self.create_logs(20)
+        with self.assertNumQueries(self.index_budget):
+            self.client.post(reverse('logs:index'), search_query_util.create_search_form('a'))
+
+    def test_detail_query_budget(self):
+        """
+        The detail page should run the same number of queries for 1 or 30 comments
+        """
+        log = log_util.create_default_log()
+        for count in (1, 29):
+            for _ in range(count):
+                commenter = account_util.create_random_valid_user()
+                log_util.create_comment(commenter, log, 'comment', 1, past=True)
+            # Budgets assume a cold privacy cache
+            privacy_cache.clear()
+            with self.assertNumQueries(self.detail_budget):
+                response = self.client.get(reverse('logs:detail', args=[log.id]))
+            self.assertContains(response, 'post-container')
@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from logs import query_plans
+from logs.models import Log
+
+
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        query_plans.seed(400)
+
+    def test_hot_queries_use_their_indexes(self):
+        """
+        Every hot query should be planned with one of the indexes added for it,
+        and fall back to another plan once they are dropped
+        """
+        for hot_query in query_plans.HOT_QUERIES:
+            with self.subTest(hot_query.label):
+                comparison = query_plans.compare(hot_query, repeat=1)
+                self.assertTrue(any(name in comparison.plan for name in hot_query.indexes), comparison.plan)
+                self.assertFalse(any(name in comparison.plan_without for name in hot_query.indexes),
+                                 comparison.plan_without)
+
+    def test_dropped_indexes_restored(self):
+        query_plans.compare(query_plans.HOT_QUERIES[0], repeat=1)
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, Log._meta.db_table)
+        self.assertIn('log_public_pub_date_id_idx', indexes)
+
+    def test_command_reports_every_query(self):
+        out = StringIO()
+        call_command('explain_hot_queries', '--repeat', '1', stdout=out)
+        for hot_query in query_plans.HOT_QUERIES:
+            self.assertIn(hot_query.label, out.getvalue())
+
+    def test_lookups_match_seeded_rows(self):
+        """
+        The hot queries should look up rows the seed created, so their plans
+        reflect a real lookup
+        """
+        for hot_query in query_plans.HOT_QUERIES:
+            with self.subTest(hot_query.label):
+                self.assertTrue(hot_query.build().exists())
@@ -1,52 +1,97 @@
-import os
+from urllib.parse import urlencode
 
+from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Q
 
+from . import nutrients, search
 from .models import Food, Log, Comment
 from .forms import FoodForm, LogSearchForm
-from settings.models import Privacy
+from .ingredient_cache import ingredient_cache, normalize_ingredient
+from .ingredient_client import IngredientLookupError, ingredient_client
+from .local_nutrients import local_nutrients
+from .pagination import InvalidCursor, paginate
+from jobs import queue as jobs
+from settings import visibility
+from uploads.processing import queue_processing, stage_upload
+
+# Newest first, with id as a tie-breaker so the ordering is unique for cursors
+FEED_ORDERING = ('-pub_date', '-id')
+COMMENT_ORDERING = ('-pub_date', '-id')
 
-import requests
 
 # Should list all logs globally like some sort of home page feed
 # Taking into account user privacy settings
 def index(request):
     context = {}
 
-    public_log_filter = get_privacy_settings(True)
     latest_logs = Log.objects.filter(
-        pub_date__lte=timezone.now(), creator__in=public_log_filter).order_by('-pub_date')
-
-    if request.method == 'POST':
-        query_form = LogSearchForm(request.POST)
-        if query_form.is_valid():
-            # Might be better to separate query options into separate forms
-            query = query_form.cleaned_data['query']
-            latest_logs = latest_logs.filter(
-                Q(creator__username__icontains=query) | Q(food__name__icontains=query)
-            ).order_by('-pub_date')
-
-    context['latest_logs'] = latest_logs
-    context['form'] = LogSearchForm(request.POST)
+        pub_date__lte=timezone.now(), is_public=True
+    ).select_related('creator', 'food')
+
+    # Searches are POSTed from the form, but page links carry the query in the URL
+    query_form = LogSearchForm(request.POST if request.method == 'POST' else request.GET)
+    query = ''
+    ordering = FEED_ORDERING
+    if query_form.is_valid():
+        # Might be better to separate query options into separate forms
+        query = query_form.cleaned_data['query']
+        if query:
+            latest_logs, ranked = search.search(latest_logs, query)
+            if ranked:
+                ordering = search.SEARCH_ORDERING
+
+    page_size = get_feed_page_size(request)
+    try:
+        page = paginate(latest_logs, ordering, after=request.GET.get('after'),
+                        before=request.GET.get('before'), page_size=page_size)
+    except InvalidCursor:
+        page = paginate(latest_logs, ordering, page_size=page_size)
+
+    context['latest_logs'] = page.items
+    context['older_url'] = feed_page_url(query, page_size, after=page.next_cursor)
+    context['newer_url'] = feed_page_url(query, page_size, before=page.previous_cursor)
+    context['form'] = query_form
     return render(request, 'logs/index.html', context)
 
 
+def get_feed_page_size(request):
+    default_size = settings.LOG_FEED_PAGE_SIZE
+    try:
+        page_size = int(request.GET.get('page_size', default_size))
+    except ValueError:
+        return default_size
+    return max(1, min(page_size, settings.LOG_FEED_MAX_PAGE_SIZE))
+
+
+def feed_page_url(query: str, page_size: int, after=None, before=None):
+    if not (after or before):
+        return None
+
+    params = {}
+    if query:
+        params['query'] = query
+    if page_size != settings.LOG_FEED_PAGE_SIZE:
+        params['page_size'] = page_size
+    if after:
+        params['after'] = after
+    else:
+        params['before'] = before
+    return f"{reverse('logs:index')}?{urlencode(params)}"
+
+
 def detail(request, log_id):
     context = {}
 
-    log = get_object_or_404(Log, pk=log_id)
-    log_privacy = Privacy.objects.get(user=log.creator.id)
-    comments = log.comment_set.filter(pub_date__lte=timezone.now())
+    log = get_object_or_404(Log.objects.select_related('creator', 'food'), pk=log_id)
 
-    if not log_privacy.show_logs and request.user.id != log.creator.id:
+    if not visibility.can_view(request.user, log.creator_id, request):
         context['privacyMessage'] = 'You do not have permission to view this log!'
     else:
         context['log'] = log
-        context['comment_list'] = comments
+        context.update(getCommentPage(request, log))
 
     if request.method == 'POST':
         if request.user == log.creator:
@@ -58,6 +103,29 @@ def detail(request, log_id):
     return render(request, 'logs/detail.html', context)
 
 
+def getCommentPage(request, log: Log):
+    """
+    Context for one page of `log`'s published comments, newest first,
+    along with links to the pages on either side.
+    """
+    comments = log.comment_set.filter(pub_date__lte=timezone.now()).select_related('creator')
+    page_size = settings.LOG_COMMENT_PAGE_SIZE
+    try:
+        page = paginate(comments, COMMENT_ORDERING, after=request.GET.get('after'),
+                        before=request.GET.get('before'), page_size=page_size)
+    except InvalidCursor:
+        page = paginate(comments, COMMENT_ORDERING, page_size=page_size)
+
+    detail_url = reverse('logs:detail', args=(log.id,))
+    return {
+        'comment_list': page.items,
+        'older_comments_url': f"{detail_url}?{urlencode({'after': page.next_cursor})}#comments"
+        if page.has_next else None,
+        'newer_comments_url': f"{detail_url}?{urlencode({'before': page.previous_cursor})}#comments"
+        if page.has_previous else None,
+    }
+
+
 def create_log(request):
     if not request.user.is_authenticated:
         return HttpResponseRedirect(reverse('access:signup'))
@@ -72,16 +140,20 @@ def create_log(request):
             ingreds = form.cleaned_data['ingredients']
             img = form.cleaned_data.get('image')
 
-            # Calculate calories based off ingredients provided
-            ingred_json = fetchIngredientData(ingreds)
-            calories = parseCalorieData(ingred_json)
-
             food_obj = Food(creator=request.user, name=food_name, desc=desc,
-                            ingredients=ingreds, calories=calories, image=img)
+                            ingredients=ingreds, calories_pending=True)
             food_obj.save()
+            if img:
+                # Resized, stripped of metadata and added to the food in the background
+                staged = stage_upload(food_obj, 'image', img)
+                queue_processing(food_obj, 'image', staged)
 
             log = Log(creator=request.user, food=food_obj, pub_date=timezone.now())
             log.save()
+
+            # Calories are calculated off ingredients provided in the background
+            # so the request doesn't wait on the nutrition API
+            jobs.enqueue('logs.calculate_calories', food_id=food_obj.id)
             return HttpResponseRedirect(reverse('logs:index'))
 
         # Redirect to same page and render error message
@@ -101,8 +173,7 @@ def comment(request, log_id):
     if request.user.is_authenticated:
         log = get_object_or_404(Log, pk=log_id)
         # Authenticated user cannot comment on other users' PRIVATE logs
-        log_privacy = Privacy.objects.get(user=log.creator.id)
-        if not log_privacy.show_logs and request.user != log.creator:
+        if not visibility.can_view(request.user, log.creator_id, request):
             return HttpResponseRedirect(reverse('logs:index'))
 
         try:
@@ -110,8 +181,8 @@ def comment(request, log_id):
         except (KeyError, Comment.DoesNotExist):
             error_message = 'Error getting comment data. Please try again!'
             return render(request, 'logs/detail.html', {'log': log,
-                                                        'comment_list': log.comment_set.all(),
-                                                        'error_message': error_message})
+                                                        'error_message': error_message,
+                                                        **getCommentPage(request, log)})
         # Get user currently signed in
         if len(comment_data.strip()) > 0:
             # request.user exists due to session cookie
@@ -127,33 +198,49 @@ def comment(request, log_id):
     return HttpResponseRedirect(reverse('logs:detail', args=(log_id,)))
 
 
-def get_privacy_settings(privacy_setting: bool):
-    return Privacy.objects.filter(show_logs=privacy_setting).values_list('id')
-
-
 # https://developer.edamam.com/food-database-api-docs for API documentation
 def fetchIngredientData(ingredientsStr: str):
-    ingredients = ingredientsStr.split(',')
-    # URL encode ' '
-    ingred_query = '%20and%20'.join(ingredients)
-
-    # Get the Parsed response
-    query_url = 'https://api.edamam.com/api/food-database/v2/parser'
-    query_url += f'?app_id={os.getenv("APP_ID")}&app_key={os.getenv("APP_KEY")}'
-    query_url += f'&ingr={ingred_query}&nutrition-type=cooking'
-
-    response_json = requests.get(query_url).json()
-    ingred_json = response_json.get('parsed')
+    ingredients = [normalize_ingredient(ingred) for ingred in ingredientsStr.split(',')]
+    ingredients = [ingred for ingred in ingredients if ingred]
+
+    # The local nutrient table answers common ingredients without a query
+    parsed_by_ingred = {}
+    for ingred in dict.fromkeys(ingredients):
+        parsed = local_nutrients.lookup(ingred)
+        if parsed is not None:
+            parsed_by_ingred[ingred] = parsed
+
+    # Only ingredients that haven't been looked up recently leave the box,
+    # and those are requested concurrently
+    unknown = [ingred for ingred in ingredients if ingred not in parsed_by_ingred]
+    if unknown:
+        parsed_by_ingred.update(ingredient_cache.get_many(unknown))
+    missing = [ingred for ingred in dict.fromkeys(ingredients) if ingred not in parsed_by_ingred]
+    if missing:
+        try:
+            fetched = ingredient_client.fetch_many(missing)
+        except IngredientLookupError as e:
+            # Keep what did succeed for the retry
+            for ingred, parsed in e.results.items():
+                ingredient_cache.set(ingred, parsed)
+            raise
+        for ingred, parsed in fetched.items():
+            ingredient_cache.set(ingred, parsed)
+        parsed_by_ingred.update(fetched)
+
+    ingred_json = [parsed for ingred in ingredients for parsed in parsed_by_ingred[ingred]]
     # print(ingred_json)
     return ingred_json
 
 
-def parseCalorieData(ingredients_json_list):
-    total_calories = 0
+def parseNutrientData(ingredients_json_list):
+    # Sum every ingredient's nutrients as fixed-order vectors
+    return nutrients.sum_vectors(
+        nutrients.vector_from_nutrients(ingred_dict.get('food').get('nutrients'))
+        for ingred_dict in ingredients_json_list
+    )
 
-    for ingred_dict in ingredients_json_list:
-        # print(ingred_dict.get('food'))
-        nutrition_dict = ingred_dict.get('food').get('nutrients')
-        total_calories += nutrition_dict.get('ENERC_KCAL')
 
-    return total_calories
+def parseCalorieData(ingredients_json_list):
+    total_calories = parseNutrientData(ingredients_json_list)[nutrients.CALORIES]
+    return round(total_calories)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ObservabilityConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'observability'
+
+    def ready(self):
+        # Time template rendering for the request instrumentation
+        from . import instrumentation
+        instrumentation.instrument_templates()
@@ -0,0 +1,97 @@
+"""
+Per-request instrumentation.
+
+A RequestRecorder is made current for the duration of a sampled request by
+observability.middleware. While it is, every query run on any database
+connection is counted and timed through a connection execute wrapper, and
+renders of Django templates are timed by a wrapper installed on the
+template backend at startup. Nothing is recorded outside sampled requests.
+"""
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.db import connections
+from django.template.backends.django import Template
+
+_current: ContextVar[Optional['RequestRecorder']] = ContextVar('request_recorder', default=None)
+
+
+class RequestRecorder:
+    def __init__(self):
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements = Counter()
+        self._rendering = 0
+
+    @property
+    def duplicate_queries(self) -> int:
+        """
+        Queries repeating the SQL of an earlier one in the request, typically
+        the same lookup run once per row (an N+1 query).
+        """
+        return self.query_count - len(self.statements)
+
+    def most_repeated(self):
+        """
+        The (sql, count) run most often, or None.
+        """
+        common = self.statements.most_common(1)
+        return common[0] if common else None
+
+    def __call__(self, execute, sql, params, many, context):
+        # Execute wrapper, see https://docs.djangoproject.com/en/stable/topics/db/instrumentation/
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.query_count += 1
+            self.statements[sql] += 1
+
+
+def current_recorder() -> Optional[RequestRecorder]:
+    return _current.get()
+
+
+@contextmanager
+def recording():
+    recorder = RequestRecorder()
+    token = _current.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+    finally:
+        _current.reset(token)
+
+
+def instrument_templates():
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    @wraps(render)
+    def timed_render(self, context=None, request=None):
+        recorder = _current.get()
+        if recorder is None:
+            return render(self, context, request)
+
+        # Only the outermost render counts, templates rendered inside it
+        # (e.g. by inclusion tags) are part of its time
+        recorder._rendering += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            recorder._rendering -= 1
+            if not recorder._rendering:
+                recorder.template_seconds += time.perf_counter() - start
+
+    timed_render.instrumented = True
+    Template.render = timed_render
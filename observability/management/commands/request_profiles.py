@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from observability import profiling
+
+SORT_KEYS = ['cumulative', 'tottime', 'calls', 'ncalls']
+
+
+class Command(BaseCommand):
+    help = 'List the URL names with stored request profiles, or show the hottest functions of one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('view', nargs='?', help="URL name to show, e.g. 'logs:detail'")
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative')
+        parser.add_argument('--limit', type=int, default=30, help='Number of functions to show')
+        parser.add_argument('--filter',
+                            help="Only show functions whose file or name matches this regex, e.g. 'logs/views'")
+        parser.add_argument('--token', action='store_true',
+                            help=f'Print a token that profiles requests sending it in the '
+                                 f'{profiling.PROFILE_HEADER} header or ?{profiling.PROFILE_PARAMETER}= parameter')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the stored profiles of the view, or of every view')
+
+    def handle(self, *args, **options):
+        view = options['view']
+        if options['token']:
+            self.stdout.write(profiling.make_token())
+            return
+        if options['clear']:
+            deleted = profiling.clear(view)
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} profiles.'))
+            return
+
+        if view is None:
+            views = profiling.profiled_views()
+            if not views:
+                self.stdout.write('No requests have been profiled.')
+            for name, count in views.items():
+                self.stdout.write(f'{name}: {count} profiles')
+            return
+
+        stats = profiling.aggregate(view)
+        if stats is None:
+            raise CommandError(f'No profiles of {view!r}')
+        stats.stream = self.stdout
+        restrictions = [options['filter']] if options['filter'] else []
+        stats.sort_stats(options['sort']).print_stats(*restrictions, options['limit'])
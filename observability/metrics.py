@@ -0,0 +1,249 @@
+"""
+In-process metrics registry.
+
+Counters and histograms are sharded per thread: each thread updates a
+shard only it writes to, so recording takes no lock, and the shards are
+only summed when `Registry.render` formats every metric in the Prometheus
+text format for the /metrics endpoint. The shards of threads that have
+exited are folded into one retired shard then, so they don't pile up.
+Metrics can instead be computed at render time by a `function` returning
+{label values: value}, for values another component already keeps (e.g.
+cache statistics).
+"""
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+Labels = Tuple[str, ...]
+
+
+class Metric(ABC):
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Dict[Labels, float]]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+
+    @abstractmethod
+    def samples(self):
+        """
+        Yield (suffix, labels, value) for every sample of the metric.
+        """
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {_escape_help(self.documentation)}',
+                 f'# TYPE {self.name} {self.type}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class ShardedMetric(Metric):
+    """
+    A metric whose updates go to a shard per thread.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+        # (owning thread, shard) pairs, and the sum of the exited threads' shards
+        self._shards = []
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            # First update from this thread
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # Nothing writes to it anymore
+                    self._merge(self._retired, shard)
+            self._shards = live
+            retired = self._copy(self._retired)
+        # Copying a dict doesn't release the GIL, so the owning thread can't
+        # change its size midway
+        return [retired] + [self._copy(shard) for _, shard in live]
+
+    @abstractmethod
+    def _merge(self, totals: dict, shard: dict):
+        """
+        Add the values of `shard` to `totals`.
+        """
+
+    def _copy(self, shard: dict) -> dict:
+        return dict(shard)
+
+
+class Counter(ShardedMetric):
+    type = 'counter'
+
+    def inc(self, *label_values: str, amount: float = 1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        if self.function is not None:
+            return dict(self.function())
+        totals = {}
+        for shard in self._snapshots():
+            self._merge(totals, shard)
+        return totals
+
+    def _merge(self, totals: dict, shard: dict):
+        for label_values, value in shard.items():
+            totals[label_values] = totals.get(label_values, 0) + value
+
+    def samples(self):
+        for label_values, value in sorted(self.values().items()):
+            yield '', dict(zip(self.labelnames, label_values)), value
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Sets replace the value across threads,
+    so unlike counters gauges share a single dict.
+    """
+    type = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def set(self, value: float, *label_values: str):
+        self._values[label_values] = value
+
+    def values(self) -> Dict[Labels, float]:
+        if self.function is not None:
+            return dict(self.function())
+        return dict(self._values)
+
+    def samples(self):
+        for label_values, value in sorted(self.values().items()):
+            yield '', dict(zip(self.labelnames, label_values)), value
+
+
+class Histogram(ShardedMetric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values: str):
+        shard = self._shard()
+        series = shard.get(label_values)
+        if series is None:
+            # Per bucket counts (the last for values above every bucket), then the sum
+            series = shard[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def values(self) -> Dict[Labels, list]:
+        totals = {}
+        for shard in self._snapshots():
+            self._merge(totals, shard)
+        return totals
+
+    def _merge(self, totals: dict, shard: dict):
+        for label_values, series in shard.items():
+            total = totals.setdefault(label_values, [0] * (len(self.buckets) + 2))
+            for i, value in enumerate(series):
+                total[i] += value
+
+    def _copy(self, shard: dict) -> dict:
+        # The owning thread keeps updating its series in place
+        return {label_values: list(series) for label_values, series in dict(shard).items()}
+
+    def samples(self):
+        for label_values, series in sorted(self.values().items()):
+            labels = dict(zip(self.labelnames, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield '_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            count = cumulative + series[len(self.buckets)]
+            yield '_bucket', {**labels, 'le': '+Inf'}, count
+            yield '_sum', labels, series[-1]
+            yield '_count', labels, count
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add `metric`, or return the one already registered under its name
+        (e.g. when a module is imported again).
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f'Metric {metric.name!r} is already registered differently')
+                if metric.function is not None:
+                    existing.function = metric.function
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), function=None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label(str(value))}"' for name, value in labels.items())
+    return f'{{{pairs}}}'
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n')
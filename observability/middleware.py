@@ -0,0 +1,151 @@
+import cProfile
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .instrumentation import recording
+from .metrics import registry
+from .profiling import PROFILE_HEADER, save_profile, should_profile
+
+logger = logging.getLogger('observability.requests')
+
+# From Python 3.12 cProfile profiles the whole process, so only one request
+# is profiled at a time
+_profiling_lock = threading.Lock()
+
+# Other methods share one label value, so clients can't add series at will
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+REQUESTS = registry.counter('http_requests_total', 'Requests served, by URL name, method and status code.',
+                            ['view', 'method', 'status'])
+REQUEST_DURATION = registry.histogram('http_request_duration_seconds', 'Request latency by URL name.',
+                                      ['view'])
+REQUEST_QUERIES = registry.histogram('http_request_queries', 'Database queries per request by URL name.',
+                                     ['view'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Record the latency and query count of every request in the metrics
+    registry, by the name of the URL pattern it resolved to.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        # Unresolved paths share one series, so scanners can't add series at will
+        view = match.view_name if match else 'unresolved'
+        method = request.method if request.method in METHODS else 'other'
+        REQUESTS.inc(view, method, str(response.status_code))
+        REQUEST_DURATION.observe(elapsed, view)
+        REQUEST_QUERIES.observe(counter.count, view)
+        return response
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Record the query count, SQL time, repeated queries and template render
+    time of a REQUEST_INSTRUMENTATION_SAMPLE_RATE fraction of requests.
+    Sampled requests get a Server-Timing header and a JSON log line on the
+    'observability.requests' logger; the rest run untouched.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with recording() as recorder:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = recorder.sql_seconds * 1000
+        template_ms = recorder.template_seconds * 1000
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={sql_ms:.1f};desc="{recorder.query_count} queries"',
+            f'tpl;dur={template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        line = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'queries': recorder.query_count,
+            'sql_ms': round(sql_ms, 2),
+            'duplicate_queries': recorder.duplicate_queries,
+            'template_ms': round(template_ms, 2),
+        }
+        repeated = recorder.most_repeated()
+        if repeated and repeated[1] >= settings.REQUEST_INSTRUMENTATION_REPEAT_THRESHOLD:
+            line['most_repeated_sql'] = repeated[0]
+            line['most_repeated_count'] = repeated[1]
+            logger.warning(json.dumps(line))
+        else:
+            logger.info(json.dumps(line))
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Run sampled requests, and requests bearing a profiling token, under
+    cProfile and store the profile by URL name (see observability.profiling).
+    It goes last in MIDDLEWARE so profiles show the view rather than the
+    middleware around it. Requests arriving while another is profiled, or
+    while another profiler is active, are served unprofiled.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request) or not _profiling_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool (e.g. a coverage run) holds sys.monitoring
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            _profiling_lock.release()
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name:
+            name = save_profile(profiler, match.view_name)
+            response[PROFILE_HEADER] = f'{match.view_name} {name}'
+        return response
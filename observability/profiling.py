@@ -0,0 +1,125 @@
+"""
+Stored cProfile profiles of sampled requests.
+
+ProfilingMiddleware profiles a PROFILING_SAMPLE_RATE fraction of requests,
+plus any request carrying a token from `make_token` in the X-Profile header
+or the 'profile' query parameter. Each profile is saved to its own file in
+a directory per URL name under PROFILING_DIR, so processes never write to
+the same file, keeping the newest PROFILING_MAX_PER_VIEW. `aggregate`
+merges a view's profiles for the request_profiles command.
+"""
+import os
+import pstats
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAMETER = 'profile'
+TOKEN_SALT = 'observability.profiling'
+
+
+def make_token() -> str:
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def has_valid_token(request) -> bool:
+    token = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAMETER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request) -> bool:
+    rate = settings.PROFILING_SAMPLE_RATE
+    return (rate > 0 and random.random() < rate) or has_valid_token(request)
+
+
+def save_profile(profiler, view_name: str) -> str:
+    """
+    Save `profiler`'s stats for `view_name` and drop its oldest profiles
+    beyond PROFILING_MAX_PER_VIEW. Returns the new file's name.
+    """
+    directory = _view_directory(view_name)
+    os.makedirs(directory, exist_ok=True)
+    # Sorts oldest first, and doesn't collide across processes
+    name = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}.prof'
+    profiler.dump_stats(os.path.join(directory, name))
+
+    for stale in profile_files(view_name)[:-settings.PROFILING_MAX_PER_VIEW]:
+        try:
+            os.remove(stale)
+        except FileNotFoundError:
+            # Pruned by another process at the same time
+            pass
+    return name
+
+
+def profile_files(view_name: str) -> List[str]:
+    directory = _view_directory(view_name)
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.prof'))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def profiled_views() -> Dict[str, int]:
+    """
+    Map every profiled URL name to its number of stored profiles.
+    """
+    try:
+        directories = sorted(os.listdir(str(settings.PROFILING_DIR)))
+    except FileNotFoundError:
+        return {}
+    views = {}
+    for directory in directories:
+        view_name = directory.replace('.', ':')
+        count = len(profile_files(view_name))
+        if count:
+            views[view_name] = count
+    return views
+
+
+def aggregate(view_name: str) -> Optional[pstats.Stats]:
+    stats = None
+    for path in profile_files(view_name):
+        try:
+            if stats is None:
+                stats = pstats.Stats(path)
+            else:
+                stats.add(path)
+        except (OSError, EOFError):
+            # Pruned or still being written
+            continue
+    return stats
+
+
+def clear(view_name: Optional[str] = None) -> int:
+    """
+    Delete the stored profiles of `view_name`, or of every view. Returns
+    how many were deleted.
+    """
+    views = [view_name] if view_name else list(profiled_views())
+    deleted = 0
+    for view in views:
+        for path in profile_files(view):
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
+
+
+def _view_directory(view_name: str) -> str:
+    # URL names are 'namespace:name', and ':' isn't allowed in Windows paths
+    return os.path.join(str(settings.PROFILING_DIR), view_name.replace(':', '.'))
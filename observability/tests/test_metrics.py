@@ -0,0 +1,141 @@
+import threading
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from observability.metrics import Metric, Registry, registry
+from test_util import log_util
+
+
+class MetricsRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_sums_thread_shards(self):
+        """
+        Increments from many threads should all be counted
+        """
+        counter = self.registry.counter('things_total', 'Things.', ['kind'])
+
+        def work():
+            for _ in range(1000):
+                counter.inc('a')
+            counter.inc('b', amount=2)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter.values(), {('a', ): 8000, ('b', ): 16})
+
+    def test_exited_threads_shards_retired(self):
+        """
+        The shards of threads that exited should be folded together, keeping
+        their counts
+        """
+        counter = self.registry.counter('things_total', 'Things.')
+        histogram = self.registry.histogram('latency_seconds', 'Latency.', buckets=(1, ))
+
+        def work():
+            counter.inc()
+            histogram.observe(0.5)
+
+        for _ in range(50):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(counter.values(), {(): 50})
+        self.assertEqual(histogram.values(), {(): [50, 0, 25.0]})
+        self.assertEqual((counter._shards, histogram._shards), ([], []))
+        work()
+        self.assertEqual(counter.values(), {(): 51})
+        self.assertEqual(len(counter._shards), 1)
+
+    def test_histogram_rendering(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency.', ['view'], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value, 'logs:index')
+
+        text = self.registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{view="logs:index",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{view="logs:index",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{view="logs:index",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum{view="logs:index"} 4.05', text)
+        self.assertIn('latency_seconds_count{view="logs:index"} 4', text)
+
+    def test_function_metrics_and_escaping(self):
+        self.registry.gauge('size', 'Size.', ['name'], function=lambda: {('say "hi"\n', ): 3})
+        self.assertIn('size{name="say \\"hi\\"\\n"} 3', self.registry.render())
+
+    def test_metrics_must_define_samples(self):
+        class Incomplete(Metric):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete('incomplete', 'Incomplete.')
+
+    def test_registering_twice_returns_same_metric(self):
+        first = self.registry.counter('things_total', 'Things.')
+        self.assertIs(self.registry.counter('things_total', 'Things.'), first)
+        with self.assertRaises(ValueError):
+            self.registry.histogram('things_total', 'Things.')
+
+
+class MetricsEndpointTests(TestCase):
+    def test_requests_recorded_by_url_name(self):
+        """
+        Requests should be counted and timed under the name of the URL they resolved to
+        """
+        log = log_util.create_default_log()
+        before = registry.get('http_requests_total').values().get(('logs:detail', 'GET', '200'), 0)
+        self.client.get(reverse('logs:detail', args=[log.id]))
+
+        requests = registry.get('http_requests_total').values()
+        self.assertEqual(requests[('logs:detail', 'GET', '200')], before + 1)
+        self.assertIn(('logs:detail', ), registry.get('http_request_duration_seconds').values())
+        self.assertIn(('logs:detail', ), registry.get('http_request_queries').values())
+
+    def test_unresolved_paths_share_a_series(self):
+        self.client.get('/no/such/page')
+        self.assertIn(('unresolved', 'GET', '404'), registry.get('http_requests_total').values())
+
+    def test_unknown_methods_share_a_series(self):
+        self.client.generic('FROBNICATE', '/no/such/page')
+        requests = registry.get('http_requests_total').values()
+        self.assertIn(('unresolved', 'other', '404'), requests)
+        self.assertFalse(any(method == 'FROBNICATE' for _, method, _ in requests))
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('logs:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{view="logs:index",le="0.005"}', text)
+        self.assertIn('ingredient_cache_lookups_total{result="misses"}', text)
+        self.assertIn('privacy_cache_lookups_total{result="hit"}', text)
+        self.assertIn('jobs_pending 0', text)
+
+    @override_settings(DEBUG=True)
+    def test_metrics_restricted_to_allowed_addresses(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(response.status_code, 403)
+
+    def test_metrics_token_required_in_production(self):
+        """
+        Without DEBUG, localhost shouldn't be trusted, as a reverse proxy on
+        the same host would forward every request from it
+        """
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret',
+                                   REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core import signing
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from observability import profiling
+from observability.middleware import ProfilingMiddleware
+from test_util import log_util
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        overrides = override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_unsampled_requests_not_profiled(self):
+        log = log_util.create_default_log()
+        response = self.client.get(reverse('logs:detail', args=[log.id]))
+        self.assertNotIn(profiling.PROFILE_HEADER, response)
+        self.assertEqual(profiling.profiled_views(), {})
+
+    def test_token_header(self):
+        """
+        Requests bearing a token should be profiled and stored by URL name
+        """
+        log = log_util.create_default_log()
+        response = self.client.get(reverse('logs:detail', args=[log.id]),
+                                   HTTP_X_PROFILE=profiling.make_token())
+        self.assertTrue(response[profiling.PROFILE_HEADER].startswith('logs:detail '))
+        self.assertEqual(profiling.profiled_views(), {'logs:detail': 1})
+
+        functions = {(os.path.basename(path), name) for path, _, name in profiling.aggregate('logs:detail').stats}
+        self.assertIn(('views.py', 'detail'), functions)
+
+    def test_token_parameter(self):
+        self.client.get(reverse('logs:index'), {'profile': profiling.make_token()})
+        self.assertEqual(profiling.profiled_views(), {'logs:index': 1})
+
+    def test_invalid_tokens(self):
+        """
+        Forged and expired tokens shouldn't enable profiling
+        """
+        self.client.get(reverse('logs:index'), HTTP_X_PROFILE='profile:forged:token')
+        forged = signing.TimestampSigner(salt='another salt').sign('profile')
+        self.client.get(reverse('logs:index'), HTTP_X_PROFILE=forged)
+        with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.client.get(reverse('logs:index'), HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(profiling.profiled_views(), {})
+
+    def test_sample_rate(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            self.client.get(reverse('logs:index'))
+            self.client.get(reverse('profiles:index'))
+            self.client.get(reverse('logs:index'))
+        self.assertEqual(profiling.profiled_views(), {'logs:index': 2, 'profiles:index': 1})
+
+    def test_unresolved_paths_not_stored(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            response = self.client.get('/no-such-page')
+        self.assertNotIn(profiling.PROFILE_HEADER, response)
+        self.assertEqual(profiling.profiled_views(), {})
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_concurrent_requests(self):
+        """
+        A request arriving while another is profiled should be served
+        unprofiled, as cProfile can only profile one at a time from Python 3.12
+        """
+        entered, release = threading.Event(), threading.Event()
+
+        def view(request):
+            request.resolver_match = resolve(request.path)
+            if request.GET.get('wait'):
+                entered.set()
+                release.wait(5)
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(view)
+        responses = {}
+        first = threading.Thread(target=lambda: responses.update(
+            first=middleware(RequestFactory().get(reverse('logs:index'), {'wait': 1}))))
+        first.start()
+        self.assertTrue(entered.wait(5))
+        try:
+            responses['second'] = middleware(RequestFactory().get(reverse('logs:index')))
+        finally:
+            release.set()
+            first.join()
+
+        self.assertNotIn(profiling.PROFILE_HEADER, responses['second'])
+        self.assertIn(profiling.PROFILE_HEADER, responses['first'])
+        self.assertEqual(profiling.profiled_views(), {'logs:index': 1})
+
+        # Once it's done, the next request is profiled again
+        middleware(RequestFactory().get(reverse('logs:index')))
+        self.assertEqual(profiling.profiled_views(), {'logs:index': 2})
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_other_profiler_active(self):
+        with mock.patch('cProfile.Profile.enable',
+                        side_effect=ValueError('Another profiling tool is already active')):
+            response = self.client.get(reverse('logs:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(profiling.profiled_views(), {})
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_MAX_PER_VIEW=3)
+    def test_oldest_profiles_pruned(self):
+        names = [self.client.get(reverse('logs:index'))[profiling.PROFILE_HEADER].split()[1]
+                 for _ in range(5)]
+        kept = [os.path.basename(path) for path in profiling.profile_files('logs:index')]
+        self.assertEqual(kept, names[2:])
+
+    def test_command(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            self.client.get(reverse('logs:index'))
+            self.client.get(reverse('logs:index'))
+
+        out = StringIO()
+        call_command('request_profiles', stdout=out)
+        self.assertEqual(out.getvalue(), 'logs:index: 2 profiles\n')
+
+        out = StringIO()
+        call_command('request_profiles', 'logs:index', '--filter', 'logs/views', stdout=out)
+        self.assertIn('(index)', out.getvalue())
+        self.assertNotIn('django/', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('request_profiles', 'profiles:index', stdout=StringIO())
+
+        out = StringIO()
+        call_command('request_profiles', '--clear', stdout=out)
+        self.assertIn('Deleted 2 profiles', out.getvalue())
+        self.assertEqual(profiling.profiled_views(), {})
+
+    def test_command_token(self):
+        out = StringIO()
+        call_command('request_profiles', '--token', stdout=out)
+        self.client.get(reverse('logs:index'), HTTP_X_PROFILE=out.getvalue().strip())
+        self.assertEqual(profiling.profiled_views(), {'logs:index': 1})
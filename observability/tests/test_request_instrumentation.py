@@ -0,0 +1,76 @@
+import json
+
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from access.models import CustomUser
+from observability.instrumentation import current_recorder, recording
+from observability.middleware import RequestInstrumentationMiddleware
+from test_util import log_util
+
+
+@override_settings(REQUEST_INSTRUMENTATION_SAMPLE_RATE=1, REQUEST_INSTRUMENTATION_REPEAT_THRESHOLD=5)
+class RequestInstrumentationTests(TestCase):
+    def test_server_timing_header(self):
+        """
+        Sampled responses should report their SQL, template and total time
+        """
+        log = log_util.create_default_log()
+        with self.assertLogs('observability.requests', 'INFO') as logs:
+            response = self.client.get(reverse('logs:detail', args=[log.id]))
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['view'], 'logs:detail')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['template_ms'], 0)
+
+    def test_query_count_matches(self):
+        log = log_util.create_default_log()
+        with self.assertLogs('observability.requests', 'INFO') as logs, \
+                self.assertNumQueries(3):
+            self.client.get(reverse('logs:detail', args=[log.id]))
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['queries'], 3)
+
+    @override_settings(REQUEST_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_untouched(self):
+        response = self.client.get(reverse('logs:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_repeated_queries_logged_as_warning(self):
+        """
+        A view running the same statement once per row should be flagged
+        """
+        for i in range(6):
+            CustomUser.objects.create(username=f'user{i}')
+
+        def per_row_view(request):
+            for user_id in CustomUser.objects.values_list('id', flat=True):
+                CustomUser.objects.get(pk=user_id)
+            return HttpResponse()
+
+        middleware = RequestInstrumentationMiddleware(per_row_view)
+        with self.assertLogs('observability.requests', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+
+        line = json.loads(logs.records[-1].getMessage())
+        # One get per user, of which all but the first repeat it
+        self.assertEqual(line['most_repeated_count'], 6)
+        self.assertEqual(line['duplicate_queries'], 5)
+        self.assertIn('SELECT', line['most_repeated_sql'])
+
+    def test_templates_timed_while_recording(self):
+        template = engines['django'].from_string('{% for i in items %}{{ i }}{% endfor %}')
+        self.assertEqual(template.render({'items': range(3)}), '012')
+        with recording() as recorder:
+            self.assertIs(current_recorder(), recorder)
+            template.render({'items': range(3)})
+            self.assertGreater(recorder.template_seconds, 0)
+        self.assertIsNone(current_recorder())
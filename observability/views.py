@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .metrics import registry
+
+
+def metrics(request):
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _may_scrape(request) -> bool:
+    token = settings.METRICS_TOKEN
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    # Behind a reverse proxy every request comes from localhost, so addresses
+    # are only trusted by the development server
+    return settings.DEBUG and request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
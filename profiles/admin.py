@@ -1,3 +1,19 @@
-# from django.contrib import admin
+from django.contrib import admin
+
+from .models import DailyCalories, UserStats, WeeklyCalories
+
 
 # Register your models here.
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'log_count', 'total_calories', 'comment_count', 'last_log_date')
+
+
+@admin.register(DailyCalories)
+class DailyCaloriesAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'calories', 'log_count')
+
+
+@admin.register(WeeklyCalories)
+class WeeklyCaloriesAdmin(admin.ModelAdmin):
+    list_display = ('user', 'week_start', 'calories', 'log_count')
@@ -6,4 +6,5 @@ class ProfileForm(forms.Form):
 
 
 class UserSearchForm(forms.Form):
-    query = forms.CharField(label='Search username', required=False)
+    query = forms.CharField(label='Search username', required=False,
+                            widget=forms.TextInput({'list': 'username-suggestions', 'autocomplete': 'off'}))
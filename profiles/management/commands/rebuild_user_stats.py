@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from profiles.rollups import rebuild_rollups
+from profiles.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute every user\'s profile statistics and calorie history from their logs and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int,
+                            help='Only rebuild these users')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or None
+        rebuilt = rebuild_user_stats(user_ids, batch_size=options['batch_size'])
+        rebuild_rollups(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {rebuilt} users.'))
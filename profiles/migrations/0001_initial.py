@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('access', '0004_alter_customuser_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_calories', models.BigIntegerField(default=0)),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('first_log_date', models.DateTimeField(blank=True, null=True)),
+                ('last_log_date', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
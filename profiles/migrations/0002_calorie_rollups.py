@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('profiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyCalories',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('calories', models.BigIntegerField(default=0)),
+                ('log_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCalories',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories', models.BigIntegerField(default=0)),
+                ('log_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='weeklycalories',
+            constraint=models.UniqueConstraint(fields=('user', 'week_start'), name='weekly_calories_user_week_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycalories',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='daily_calories_user_date_unique'),
+        ),
+    ]
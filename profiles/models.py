@@ -1,3 +1,57 @@
-# from django.db import models
+from django.db import models
 
-# Create your models here.
+from access.models import CustomUser
+
+
+class UserStats(models.Model):
+    """
+    Per-user totals maintained incrementally as logs and comments are
+    written (see profiles.signals), so profiles never aggregate raw logs.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True,
+                                related_name='stats')
+    total_calories = models.BigIntegerField(default=0)
+    log_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    first_log_date = models.DateTimeField(null=True, blank=True)
+    last_log_date = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} logged {self.log_count} foods for {self.total_calories} calories"
+
+
+class DailyCalories(models.Model):
+    """
+    Calories and number of logs a user published on a (local) day.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()
+    calories = models.BigIntegerField(default=0)
+    log_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_calories_user_date_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} ate {self.calories} calories on {self.date}"
+
+
+class WeeklyCalories(models.Model):
+    """
+    Calories and number of logs a user published in an ISO week,
+    identified by the Monday it starts on.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    week_start = models.DateField()
+    calories = models.BigIntegerField(default=0)
+    log_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'week_start'], name='weekly_calories_user_week_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} ate {self.calories} calories the week of {self.week_start}"
@@ -0,0 +1,119 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from access.models import CustomUser
+from logs.models import Log
+from .models import DailyCalories, WeeklyCalories
+
+
+def local_day(moment: datetime) -> date:
+    return timezone.localtime(moment).date()
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def record_log(log: Log, calories: int, log_count: int):
+    """
+    Add a log's calories (negative when it's deleted) to its day and week.
+    """
+    day = local_day(log.pub_date)
+    _bump(DailyCalories, {'user_id': log.creator_id, 'date': day}, calories, log_count)
+    _bump(WeeklyCalories, {'user_id': log.creator_id, 'week_start': week_start(day)},
+          calories, log_count)
+
+
+def _bump(model, key: dict, calories: int, log_count: int):
+    updates = {'calories': F('calories') + calories, 'log_count': F('log_count') + log_count}
+    if model.objects.filter(**key).update(**updates):
+        return
+    if log_count <= 0:
+        # The logs being removed or changed were counted in a row that is gone,
+        # which only happens when their user is being deleted
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, calories=calories, log_count=log_count)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**key).update(**updates)
+
+
+def rebuild_rollups(user_ids: Optional[Iterable[int]] = None):
+    """
+    Recompute daily rollups with one grouped query, and weekly ones from those.
+    """
+    logs = Log.objects.all()
+    daily = DailyCalories.objects.all()
+    weekly = WeeklyCalories.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        logs = logs.filter(creator__in=user_ids)
+        daily = daily.filter(user__in=user_ids)
+        weekly = weekly.filter(user__in=user_ids)
+
+    days = logs.annotate(date=TruncDate('pub_date', tzinfo=timezone.get_current_timezone()))\
+        .values('creator', 'date')\
+        .annotate(calories=Coalesce(Sum('food__calories'), 0), log_count=Count('id'))\
+        .order_by()
+
+    with transaction.atomic():
+        daily.delete()
+        weekly.delete()
+
+        day_rows = []
+        weeks = defaultdict(lambda: [0, 0])
+        for row in days.iterator():
+            day_rows.append(DailyCalories(user_id=row['creator'], date=row['date'],
+                                          calories=row['calories'], log_count=row['log_count']))
+            week = weeks[(row['creator'], week_start(row['date']))]
+            week[0] += row['calories']
+            week[1] += row['log_count']
+
+        DailyCalories.objects.bulk_create(day_rows, batch_size=1000)
+        WeeklyCalories.objects.bulk_create(
+            [WeeklyCalories(user_id=user_id, week_start=start, calories=calories, log_count=count)
+             for (user_id, start), (calories, count) in weeks.items()],
+            batch_size=1000)
+
+
+def history(user: CustomUser, start: date, end: date, period: str = 'day') -> List[dict]:
+    """
+    Calorie series from `start` to `end` inclusive, one entry per day or ISO
+    week, with zeros for periods without logs.
+    """
+    if period == 'week':
+        start, end = week_start(start), week_start(end)
+        rows = WeeklyCalories.objects.filter(user=user, week_start__range=(start, end))
+        totals = {row.week_start: row for row in rows}
+        step = timedelta(weeks=1)
+    else:
+        rows = DailyCalories.objects.filter(user=user, date__range=(start, end))
+        totals = {row.date: row for row in rows}
+        step = timedelta(days=1)
+
+    series = []
+    current = start
+    while current <= end:
+        row = totals.get(current)
+        entry = {
+            'date': current.isoformat(),
+            'calories': row.calories if row else 0,
+            'logs': row.log_count if row else 0,
+        }
+        if period == 'week':
+            iso_year, iso_week, _ = current.isocalendar()
+            entry['iso_year'], entry['iso_week'] = iso_year, iso_week
+        series.append(entry)
+        if end - current < step:
+            # Stepping past the end could pass date.max
+            break
+        current += step
+    return series
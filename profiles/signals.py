@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from access.models import CustomUser
+from logs.models import Comment, Food, Log
+from logs.signals import food_calories_changed
+from . import rollups, stats
+from .username_index import username_index
+
+
+@receiver(post_save, sender=Log)
+def log_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.record_log_created(instance)
+        rollups.record_log(instance, instance.food.calories, 1)
+
+
+@receiver(post_delete, sender=Log)
+def log_deleted(sender, instance, **kwargs):
+    # Logs are deleted before the food they cascade from, so it can still be read
+    if Log.food.is_cached(instance):
+        calories = instance.food.calories
+    else:
+        calories = Food.objects.filter(pk=instance.food_id).values_list('calories', flat=True).first() or 0
+    stats.record_log_deleted(instance, calories)
+    rollups.record_log(instance, -calories, -1)
+
+
+@receiver(food_calories_changed)
+def calories_changed(sender, food, old_calories, new_calories, **kwargs):
+    delta = new_calories - old_calories
+    for log in Log.objects.filter(food=food).only('creator_id', 'pub_date'):
+        stats.record_calories_changed(log.creator_id, delta)
+        if delta:
+            rollups.record_log(log, delta, 0)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.record_comment_created(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.record_comment_deleted(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only
+    if update_fields is None or {'username', 'is_active'} & set(update_fields):
+        username_index.add(instance)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    username_index.remove(instance.id)
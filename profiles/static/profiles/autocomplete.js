@@ -0,0 +1,33 @@
+// Suggest usernames from the autocomplete endpoint as the search box is typed in
+document.addEventListener('DOMContentLoaded', () => {
+    const suggestions = document.getElementById('username-suggestions');
+    const input = document.querySelector('#query-form input[name="query"]');
+    if (!suggestions || !input) {
+        return;
+    }
+
+    let controller = null;
+    input.addEventListener('input', () => {
+        const prefix = input.value.trim();
+        if (controller) {
+            controller.abort();
+        }
+        if (!prefix) {
+            suggestions.replaceChildren();
+            return;
+        }
+
+        controller = new AbortController();
+        const url = `${suggestions.dataset.url}?q=${encodeURIComponent(prefix)}`;
+        fetch(url, {signal: controller.signal})
+            .then(response => response.json())
+            .then(data => {
+                suggestions.replaceChildren(...data.results.map(result => {
+                    const option = document.createElement('option');
+                    option.value = result.username;
+                    return option;
+                }));
+            })
+            .catch(() => {});
+    });
+});
@@ -0,0 +1,116 @@
+from typing import Iterable, Optional
+
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, When
+from django.db.models.functions import Coalesce
+
+from access.models import CustomUser
+from logs.models import Comment, Log
+from .models import UserStats
+
+
+def get_user_stats(user: CustomUser) -> UserStats:
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        rebuild_user_stats([user.id])
+        return UserStats.objects.get(user=user)
+
+
+def rebuild_user_stats(user_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """
+    Recompute stats from the raw tables with one grouped query per table
+    per batch of users, for every user when `user_ids` isn't given.
+    Returns the number of users rebuilt.
+    """
+    users = CustomUser.objects.order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=list(user_ids))
+
+    rebuilt = 0
+    batch = []
+    for user_id in users.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            rebuilt += _rebuild_batch(batch)
+            batch = []
+    if batch:
+        rebuilt += _rebuild_batch(batch)
+    return rebuilt
+
+
+def _rebuild_batch(user_ids):
+    log_totals = {
+        row['creator']: row for row in
+        Log.objects.filter(creator__in=user_ids).values('creator').annotate(
+            log_count=Count('id'), total_calories=Coalesce(Sum('food__calories'), 0),
+            first_log_date=Min('pub_date'), last_log_date=Max('pub_date'))
+    }
+    comment_counts = dict(
+        Comment.objects.filter(creator__in=user_ids).values('creator')
+        .annotate(count=Count('id')).values_list('creator', 'count')
+    )
+
+    stats = []
+    for user_id in user_ids:
+        totals = log_totals.get(user_id, {})
+        stats.append(UserStats(user_id=user_id,
+                               total_calories=totals.get('total_calories', 0),
+                               log_count=totals.get('log_count', 0),
+                               comment_count=comment_counts.get(user_id, 0),
+                               first_log_date=totals.get('first_log_date'),
+                               last_log_date=totals.get('last_log_date')))
+
+    UserStats.objects.bulk_create(
+        stats, update_conflicts=True, unique_fields=['user'],
+        update_fields=['total_calories', 'log_count', 'comment_count',
+                       'first_log_date', 'last_log_date'])
+    return len(stats)
+
+
+def _update_or_rebuild(user_id: int, **updates):
+    # A user without a stats row yet gets one computed from scratch,
+    # which already includes the change being recorded
+    if not UserStats.objects.filter(user=user_id).update(**updates):
+        if CustomUser.objects.filter(pk=user_id).exists():
+            rebuild_user_stats([user_id])
+
+
+def record_log_created(log: Log):
+    pub_date = log.pub_date
+    _update_or_rebuild(
+        log.creator_id,
+        log_count=F('log_count') + 1,
+        total_calories=F('total_calories') + log.food.calories,
+        first_log_date=Case(When(Q(first_log_date__isnull=True) | Q(first_log_date__gt=pub_date),
+                                 then=pub_date), default=F('first_log_date')),
+        last_log_date=Case(When(Q(last_log_date__isnull=True) | Q(last_log_date__lt=pub_date),
+                                then=pub_date), default=F('last_log_date')),
+    )
+
+
+def record_log_deleted(log: Log, calories: int):
+    user_id = log.creator_id
+    if not UserStats.objects.filter(user=user_id).update(
+            log_count=F('log_count') - 1, total_calories=F('total_calories') - calories):
+        return
+
+    # Only a deleted first or last log moves the date range
+    if UserStats.objects.filter(Q(first_log_date=log.pub_date) | Q(last_log_date=log.pub_date),
+                                user=user_id).exists():
+        dates = Log.objects.filter(creator=user_id).aggregate(first=Min('pub_date'),
+                                                              last=Max('pub_date'))
+        UserStats.objects.filter(user=user_id).update(first_log_date=dates['first'],
+                                                      last_log_date=dates['last'])
+
+
+def record_calories_changed(user_id: int, delta: int):
+    if delta:
+        _update_or_rebuild(user_id, total_calories=F('total_calories') + delta)
+
+
+def record_comment_created(comment: Comment):
+    _update_or_rebuild(comment.creator_id, comment_count=F('comment_count') + 1)
+
+
+def record_comment_deleted(comment: Comment):
+    UserStats.objects.filter(user=comment.creator_id).update(comment_count=F('comment_count') - 1)
@@ -0,0 +1,173 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import queue
+from logs.ingredient_cache import ingredient_cache
+from profiles.models import DailyCalories, WeeklyCalories
+from settings.models import Privacy
+from test_util import account_util, log_util
+
+
+def fake_parsed(ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 120}}}]
+
+
+class CalorieHistoryTests(TestCase):
+    def setUp(self):
+        self.user = account_util.create_random_valid_user()
+        self.today = timezone.localdate()
+        # A Wednesday well in the past, so its week is Monday to Sunday around it
+        self.wednesday = self.today - timedelta(days=self.today.weekday() - 2 + 14)
+
+    def create_log(self, calories: int, day, hour: int = 12):
+        moment = timezone.make_aware(datetime.combine(day, time(hour)))
+        food = log_util.create_food(self.user, 'food', 'desc', calories=calories, save=True)
+        return log_util.create_log(self.user, food, moment, save=True)
+
+    def get_history(self, user=None, **params):
+        user = user or self.user
+        return self.client.get(reverse('profiles:history', args=[user.id]), params)
+
+    def test_logs_update_daily_and_weekly_rollups(self):
+        """
+        Creating logs should add to the rollup row of their day and ISO week
+        """
+        self.create_log(100, self.wednesday, hour=8)
+        self.create_log(50, self.wednesday, hour=20)
+        self.create_log(25, self.wednesday + timedelta(days=1))
+
+        day = DailyCalories.objects.get(user=self.user, date=self.wednesday)
+        self.assertEqual((day.calories, day.log_count), (150, 2))
+        week = WeeklyCalories.objects.get(user=self.user,
+                                          week_start=self.wednesday - timedelta(days=2))
+        self.assertEqual((week.calories, week.log_count), (175, 3))
+
+    def test_log_deletion_updates_rollups(self):
+        """
+        Deleting a log, as the detail view does through its food, should undo it
+        """
+        self.create_log(100, self.wednesday)
+        log = self.create_log(50, self.wednesday)
+        log.food.delete()
+
+        day = DailyCalories.objects.get(user=self.user, date=self.wednesday)
+        self.assertEqual((day.calories, day.log_count), (100, 1))
+        self.assertEqual(WeeklyCalories.objects.get(user=self.user).calories, 100)
+
+    def test_user_deletion_leaves_no_rollups(self):
+        """
+        Logs cascading from a deleted user shouldn't recreate their rollup rows
+        """
+        self.create_log(100, self.wednesday)
+        self.user.delete()
+
+        self.assertFalse(DailyCalories.objects.exists())
+        self.assertFalse(WeeklyCalories.objects.exists())
+
+    @override_settings(JOBS_WORKER_THREADS=0)
+    @mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+    def test_background_calories_added(self, fetch_mock):
+        """
+        Calories filled in by the background job should land on the log's day
+        """
+        ingredient_cache.memory.clear()
+        self.client.force_login(self.user)
+        self.client.post(reverse('logs:create-log'),
+                         {'name': 'meal', 'desc': 'desc', 'ingredients': 'a, b'})
+        queue.run_pending()
+
+        day = DailyCalories.objects.get(user=self.user, date=self.today)
+        self.assertEqual((day.calories, day.log_count), (240, 1))
+
+    def test_daily_series_fills_gaps(self):
+        """
+        Days without logs should be reported with zero calories
+        """
+        self.create_log(100, self.wednesday)
+        self.create_log(40, self.wednesday + timedelta(days=2))
+
+        response = self.get_history(start=self.wednesday.isoformat(),
+                                    end=(self.wednesday + timedelta(days=2)).isoformat())
+        self.assertEqual(response.status_code, 200)
+        series = response.json()['series']
+        self.assertEqual([entry['calories'] for entry in series], [100, 0, 40])
+        self.assertEqual([entry['logs'] for entry in series], [1, 0, 1])
+        self.assertEqual(series[0]['date'], self.wednesday.isoformat())
+
+    def test_weekly_series(self):
+        """
+        Weekly entries should start on Mondays and carry their ISO week
+        """
+        self.create_log(100, self.wednesday)
+        self.create_log(30, self.wednesday + timedelta(days=7))
+
+        response = self.get_history(period='week', start=self.wednesday.isoformat(),
+                                    end=(self.wednesday + timedelta(days=7)).isoformat())
+        series = response.json()['series']
+        monday = self.wednesday - timedelta(days=2)
+        self.assertEqual([entry['date'] for entry in series],
+                         [monday.isoformat(), (monday + timedelta(days=7)).isoformat()])
+        self.assertEqual([entry['calories'] for entry in series], [100, 30])
+        self.assertEqual(series[0]['iso_week'], monday.isocalendar()[1])
+
+    def test_default_range(self):
+        self.create_log(75, self.today)
+        series = self.get_history().json()['series']
+        self.assertEqual(len(series), 30)
+        self.assertEqual(series[-1], {'date': self.today.isoformat(), 'calories': 75, 'logs': 1})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get_history(period='year').status_code, 400)
+        self.assertEqual(self.get_history(start='yesterday').status_code, 400)
+        self.assertEqual(self.get_history(start='2024-02-01', end='2024-01-01').status_code, 400)
+        self.assertEqual(self.get_history(start='2000-01-01', end='2024-01-01').status_code, 400)
+
+    def test_calendar_edges(self):
+        """
+        Ranges reaching the first or last day of the calendar should be served
+        """
+        for period in ('day', 'week'):
+            with self.subTest(period):
+                response = self.get_history(start='9999-12-01', end='9999-12-31', period=period)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(response.json()['series'][-1]['date'], '9999-12-31')
+
+        response = self.get_history(end='0001-01-05')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['start'], '0001-01-01')
+        self.assertEqual(len(response.json()['series']), 5)
+
+    def test_private_history(self):
+        """
+        Private users' history should only be served to themselves
+        """
+        Privacy.objects.filter(user=self.user).update(show_logs=False)
+        self.assertEqual(self.get_history().status_code, 403)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.get_history().status_code, 200)
+
+    def test_missing_user(self):
+        response = self.client.get(reverse('profiles:history', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild_command(self):
+        """
+        The rebuild command should recompute drifted rollups from the logs
+        """
+        self.create_log(100, self.wednesday)
+        self.create_log(20, self.wednesday + timedelta(days=1))
+        DailyCalories.objects.update(calories=0)
+        WeeklyCalories.objects.all().delete()
+
+        call_command('rebuild_user_stats', stdout=StringIO())
+
+        self.assertEqual(DailyCalories.objects.get(user=self.user, date=self.wednesday).calories, 100)
+        week = WeeklyCalories.objects.get(user=self.user)
+        self.assertEqual((week.calories, week.log_count), (120, 2))
@@ -1,7 +1,10 @@
-from django.test import TestCase
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
+from logs.pagination import encode_cursor
 from test_util import log_util
 
 
@@ -63,3 +66,49 @@ class ProfileLogsTest(TestCase):
 
         for log in logs:
             self.assertContains(request, log.food.name)
+
+    @override_settings(PROFILE_LOG_PAGE_SIZE=3)
+    def test_logs_paginated(self):
+        """
+        Profiles should list a page of logs at a time, newest first, while
+        the heading counts every log
+        """
+        now = timezone.now()
+        logs = [log_util.create_log(self.user, log_util.create_random_food(),
+                                    now - timedelta(minutes=i), save=True)
+                for i in range(7)]
+
+        seen = []
+        response = self.client.get(reverse('profiles:user', args=(self.user.id, )))
+        self.assertContains(response, 'Food Logs (7)')
+        self.assertIsNone(response.context['newer_logs_url'])
+        while True:
+            self.assertLessEqual(len(response.context['logs']), 3)
+            seen.extend(response.context['logs'])
+            if not response.context['older_logs_url']:
+                break
+            response = self.client.get(response.context['older_logs_url'])
+        self.assertEqual(seen, logs)
+
+        response = self.client.get(response.context['newer_logs_url'])
+        self.assertEqual(list(response.context['logs']), logs[3:6])
+
+    @override_settings(PROFILE_LOG_PAGE_SIZE=3)
+    def test_cursor_values_of_wrong_type_return_first_page(self):
+        """
+        Cursors holding JSON values of the wrong type for their key should
+        fall back to the first page of logs, and of the directory
+        """
+        now = timezone.now()
+        logs = [log_util.create_log(self.user, log_util.create_random_food(),
+                                    now - timedelta(minutes=i), save=True)
+                for i in range(4)]
+
+        for values in [[None, 1], [1, 1], [{'a': 1}, 1], ['2020-01-01T00:00:00', None]]:
+            with self.subTest(values):
+                cursor = encode_cursor(values)
+                response = self.client.get(reverse('profiles:user', args=(self.user.id, )), {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['logs']), logs[:3])
+                response = self.client.get(reverse('profiles:index'), {'after': cursor})
+                self.assertEqual(response.status_code, 200)
@@ -7,6 +7,7 @@ from django.test import TestCase, override_settings
 
 from test_util import image_upload_util, account_util
 from access.models import CustomUser
+from jobs import queue
 
 MEDIA_ROOT = tempfile.mkdtemp() + "/media"
 MEDIA_URL = "/media/"
@@ -14,6 +15,7 @@ MEDIA_URL = "/media/"
 
 @override_settings(MEDIA_ROOT=MEDIA_ROOT)
 @override_settings(MEDIA_URL=MEDIA_URL)
+@override_settings(JOBS_WORKER_THREADS=0)
 class ProfileImageUploadTests(TestCase):
     @classmethod
     def tearDownClass(cls):
@@ -33,6 +35,8 @@ class ProfileImageUploadTests(TestCase):
         uploaded_image = SimpleUploadedFile('img.gif', profile_image, content_type='image/gif')
         response = self.client.post(self.user_profile_path, {'profile_picture': uploaded_image})
         self.assertRedirects(response, self.user_profile_path)
+        # Uploads are only added to the profile once processed
+        queue.run_pending()
 
         response = self.client.get(self.user_profile_path)
         updated_user = CustomUser.objects.get(pk=self.user.id)
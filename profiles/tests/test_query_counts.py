@@ -0,0 +1,43 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from settings.visibility import privacy_cache
+from test_util import account_util, log_util
+
+
+class ProfileQueryBudgetTests(TestCase):
+    """
+    The profile page has a fixed query budget that must not grow
+    with the number of logs the user has.
+    """
+    user_budget = 4
+
+    def setUp(self):
+        self.user = account_util.create_random_valid_user()
+
+    def test_user_profile_query_budget(self):
+        """
+        The profile page should run the same number of queries for 1 or 20 logs
+        """
+        for count in (1, 19):
+            for _ in range(count):
+                food = log_util.create_food(self.user, log_util.generateRandStr(8), 'desc',
+                                            calories=10, save=True)
+                log_util.create_log(self.user, food, timezone.now(), save=True)
+            # Budgets assume a cold privacy cache
+            privacy_cache.clear()
+            with self.assertNumQueries(self.user_budget):
+                response = self.client.get(reverse('profiles:user', args=[self.user.id]))
+            self.assertContains(response, 'logs-container')
+
+    def test_calories_count_matches_logs(self):
+        """
+        Total calories should be summed across all of the user's logs
+        """
+        for calories in (100, 250, 5):
+            food = log_util.create_food(self.user, 'food', 'desc', calories=calories, save=True)
+            log_util.create_log(self.user, food, timezone.now(), save=True)
+
+        response = self.client.get(reverse('profiles:user', args=[self.user.id]))
+        self.assertEqual(response.context['calories_count'], 355)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import queue
+from logs.ingredient_cache import ingredient_cache
+from logs.models import Log
+from profiles.models import UserStats
+from test_util import account_util, log_util
+
+
+def fake_parsed(ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 120}}}]
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.user = account_util.create_random_valid_user()
+        self.now = timezone.now()
+
+    def create_log(self, calories: int, days_ago: int = 0):
+        food = log_util.create_food(self.user, 'food', 'desc', calories=calories, save=True)
+        return log_util.create_log(self.user, food, self.now - timedelta(days=days_ago), save=True)
+
+    def stats(self):
+        return UserStats.objects.get(user=self.user)
+
+    def test_log_creation_updates_stats(self):
+        """
+        Creating logs should update the totals and the date range
+        """
+        self.create_log(100, days_ago=2)
+        self.create_log(50, days_ago=5)
+        self.create_log(25, days_ago=1)
+
+        stats = self.stats()
+        self.assertEqual(stats.log_count, 3)
+        self.assertEqual(stats.total_calories, 175)
+        self.assertEqual(stats.first_log_date, self.now - timedelta(days=5))
+        self.assertEqual(stats.last_log_date, self.now - timedelta(days=1))
+
+    def test_log_deletion_updates_stats(self):
+        """
+        Deleting logs, as the detail view does through their food, should undo them
+        """
+        first = self.create_log(100, days_ago=3)
+        self.create_log(50, days_ago=2)
+        last = self.create_log(25, days_ago=1)
+
+        first.food.delete()
+        Log.objects.get(pk=last.pk).food.delete()
+
+        stats = self.stats()
+        self.assertEqual(stats.log_count, 1)
+        self.assertEqual(stats.total_calories, 50)
+        self.assertEqual(stats.first_log_date, self.now - timedelta(days=2))
+        self.assertEqual(stats.last_log_date, self.now - timedelta(days=2))
+
+    def test_comment_count(self):
+        log = self.create_log(10)
+        comments = [log_util.create_comment(self.user, log, 'hi', 1) for _ in range(3)]
+        comments[0].delete()
+        self.assertEqual(self.stats().comment_count, 2)
+
+    @override_settings(JOBS_WORKER_THREADS=0)
+    @mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+    def test_background_calories_added(self, fetch_mock):
+        """
+        Calories filled in by the background job should be added to the total
+        """
+        ingredient_cache.memory.clear()
+        self.create_log(30)
+        self.client.force_login(self.user)
+        self.client.post(reverse('logs:create-log'),
+                         {'name': 'meal', 'desc': 'desc', 'ingredients': 'a, b'})
+        self.assertEqual(self.stats().total_calories, 30)
+
+        queue.run_pending()
+        self.assertEqual(self.stats().total_calories, 270)
+
+    def test_profile_uses_stats(self):
+        """
+        The profile should show the maintained totals without summing logs
+        """
+        self.create_log(100)
+        UserStats.objects.filter(user=self.user).update(total_calories=12345)
+
+        response = self.client.get(reverse('profiles:user', args=[self.user.id]))
+        self.assertEqual(response.context['calories_count'], 12345)
+
+    def test_missing_stats_built_on_demand(self):
+        self.create_log(100)
+        UserStats.objects.all().delete()
+
+        response = self.client.get(reverse('profiles:user', args=[self.user.id]))
+        self.assertEqual(response.context['calories_count'], 100)
+
+    def test_rebuild_command(self):
+        """
+        The rebuild command should recompute drifted stats for every user
+        """
+        other = account_util.create_random_valid_user()
+        self.create_log(100)
+        log = self.create_log(20)
+        log_util.create_comment(other, log, 'nice', 1)
+        UserStats.objects.update(total_calories=0, log_count=0, comment_count=0)
+
+        out = StringIO()
+        call_command('rebuild_user_stats', stdout=out)
+
+        self.assertIn('Rebuilt stats for 2 users', out.getvalue())
+        self.assertEqual(self.stats().total_calories, 120)
+        self.assertEqual(self.stats().log_count, 2)
+        self.assertEqual(UserStats.objects.get(user=other).comment_count, 1)
@@ -0,0 +1,169 @@
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from access.models import CustomUser
+from profiles.username_index import username_index
+from settings import deletion
+from test_util import account_util
+
+
+class UsernameAutocompleteTests(TestCase):
+    def setUp(self):
+        # The index lives in memory, so drop what earlier tests left in it
+        username_index.invalidate()
+        self.users = {name: account_util.create_user(name, save=True)
+                      for name in ['alice', 'Alfred', 'alison', 'bob', 'albert']}
+
+    def tearDown(self):
+        username_index.invalidate()
+
+    def complete(self, prefix: str, **params):
+        response = self.client.get(reverse('profiles:autocomplete'), {'q': prefix, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['username'] for result in response.json()['results']]
+
+    def test_prefix_matches_sorted(self):
+        """
+        Usernames starting with the prefix should be returned alphabetically,
+        ignoring case
+        """
+        self.assertEqual(self.complete('al'), ['albert', 'Alfred', 'alice', 'alison'])
+        self.assertEqual(self.complete('ALI'), ['alice', 'alison'])
+        self.assertEqual(self.complete('z'), [])
+        self.assertEqual(self.complete(''), [])
+
+    def test_results_link_to_profiles(self):
+        response = self.client.get(reverse('profiles:autocomplete'), {'q': 'bob'})
+        bob = self.users['bob']
+        self.assertEqual(response.json()['results'],
+                         [{'id': bob.id, 'username': 'bob',
+                           'url': reverse('profiles:user', args=[bob.id])}])
+
+    def test_limit(self):
+        self.assertEqual(self.complete('al', limit=2), ['albert', 'Alfred'])
+        self.assertEqual(self.complete('al', limit='lots'), ['albert', 'Alfred', 'alice', 'alison'])
+
+    def test_current_user_excluded(self):
+        self.client.force_login(self.users['alice'])
+        self.assertEqual(self.complete('ali'), ['alison'])
+
+    def test_signups_renames_and_deletions(self):
+        """
+        The index should follow users being created, renamed and deleted
+        without being reloaded
+        """
+        self.complete('a')
+        account_util.create_user('alfonso', save=True)
+        self.assertIn('alfonso', self.complete('alf'))
+
+        bob = self.users['bob']
+        bob.username = 'alan'
+        bob.save()
+        self.assertEqual(self.complete('b'), [])
+        self.assertEqual(self.complete('ala'), ['alan'])
+
+        CustomUser.objects.get(username='alison').delete()
+        self.assertEqual(self.complete('ali'), ['alice'])
+
+    def test_deactivated_users_excluded(self):
+        """
+        Accounts awaiting deletion shouldn't be suggested or listed
+        """
+        self.complete('a')
+        deletion.request_deletion(self.users['alice'])
+        self.assertEqual(self.complete('ali'), ['alison'])
+
+        username_index.invalidate()
+        self.assertEqual(self.complete('ali'), ['alison'])
+        response = self.client.get(reverse('profiles:index'))
+        self.assertNotContains(response, '> alice <')
+
+    def test_lookups_dont_query(self):
+        self.complete('a')
+        with self.assertNumQueries(0):
+            self.assertEqual(username_index.complete('bo'), [{'id': self.users['bob'].id,
+                                                              'username': 'bob'}])
+
+
+class UsernameIndexReloadTests(TransactionTestCase):
+    """
+    Reloads run in another thread with its own connection, which only sees
+    committed rows
+    """
+    def setUp(self):
+        username_index.invalidate()
+        for name in ['alice', 'alison', 'albert']:
+            account_util.create_user(name, save=True)
+
+    def tearDown(self):
+        username_index.invalidate()
+
+    def complete(self, prefix: str):
+        return [result['username'] for result in username_index.complete(prefix)]
+
+    def test_changes_by_other_processes_picked_up(self):
+        """
+        Users added or removed without this process' receivers running should
+        appear once a reload after USERNAME_INDEX_RELOAD_INTERVAL finishes,
+        the stale index answering meanwhile
+        """
+        self.complete('a')
+        CustomUser.objects.bulk_create([CustomUser(username='alma', email='alma@example.com')])
+        CustomUser.objects.filter(username='alison').update(username='zed')
+        self.assertEqual(self.complete('alm'), [])
+
+        with mock.patch('profiles.username_index.time.monotonic',
+                        return_value=username_index._loaded_at + 61), \
+                override_settings(USERNAME_INDEX_RELOAD_INTERVAL=60):
+            with mock.patch.object(username_index, 'load', wraps=username_index.load) as load:
+                self.assertEqual(self.complete('al'), ['albert', 'alice', 'alison'])
+                reloader = username_index._reloader
+                # Lookups while the reload runs don't start another
+                self.complete('al')
+                if reloader is not None:
+                    reloader.join()
+            self.assertEqual(load.call_count, 1)
+            self.assertEqual(self.complete('al'), ['albert', 'alice', 'alma'])
+
+
+@override_settings(PROFILE_DIRECTORY_PAGE_SIZE=2)
+class UserDirectoryPaginationTests(TestCase):
+    def setUp(self):
+        self.usernames = ['dana', 'carl', 'erin', 'abby', 'beth']
+        for name in self.usernames:
+            account_util.create_user(name, save=True)
+
+    def collect(self, response):
+        seen = [user.username for user in response.context['users']]
+        while response.context['next_url']:
+            response = self.client.get(response.context['next_url'])
+            seen.extend(user.username for user in response.context['users'])
+        return seen, response
+
+    def test_directory_paginated(self):
+        """
+        The directory should render a page at a time, covering every user in order
+        """
+        response = self.client.get(reverse('profiles:index'))
+        self.assertContains(response, '<li>', count=2)
+        self.assertIsNone(response.context['previous_url'])
+
+        seen, last_page = self.collect(response)
+        self.assertEqual(seen, sorted(self.usernames))
+        self.assertIsNotNone(last_page.context['previous_url'])
+
+        response = self.client.get(last_page.context['previous_url'])
+        self.assertEqual([user.username for user in response.context['users']], ['carl', 'dana'])
+
+    def test_search_results_paginated(self):
+        account_util.create_user('zara', save=True)
+        response = self.client.post(reverse('profiles:index'), {'query': 'a'})
+        self.assertIn('query=a', response.context['next_url'])
+        seen, _ = self.collect(response)
+        self.assertEqual(seen, ['abby', 'carl', 'dana', 'zara'])
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('profiles:index'), {'after': 'garbage'})
+        self.assertEqual([user.username for user in response.context['users']], ['abby', 'beth'])
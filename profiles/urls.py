@@ -6,5 +6,7 @@ app_name = 'profiles'
 
 urlpatterns = [
     path('', views.index, name='index'),
-    path('<int:user_id>/', views.user, name='user')
+    path('autocomplete', views.autocomplete, name='autocomplete'),
+    path('<int:user_id>/', views.user, name='user'),
+    path('<int:user_id>/history', views.history, name='history'),
 ]
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+from access.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+# (lowercased username, user id, username); sorting by the first item
+# puts every username sharing a prefix next to each other
+Entry = Tuple[str, int, str]
+
+
+class UsernameIndex:
+    """
+    Sorted in-memory array of active users' usernames for case-insensitive
+    prefix lookups, which bisect to the first match and read the next `limit`
+    entries.
+    Loaded from the database on first use, then kept current by the
+    CustomUser receivers in profiles.signals. Those only see this process'
+    changes, so the index is also re-read every USERNAME_INDEX_RELOAD_INTERVAL
+    seconds to pick up sign-ups, renames and deletions made by other workers.
+    Those reloads run in a background thread, one at a time, while lookups
+    keep using the index being replaced.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: List[Entry] = []
+        self._by_id: Dict[int, Entry] = {}
+        self._loaded_at: Optional[float] = None
+        self._reloader: Optional[threading.Thread] = None
+
+    def complete(self, prefix: str, limit: int = 10, exclude_id: Optional[int] = None) -> List[dict]:
+        self._ensure_loaded()
+        prefix = prefix.lower()
+        matches = []
+        with self._lock:
+            entries = self._entries
+            position = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(matches) < limit:
+                key, user_id, username = entries[position]
+                if not key.startswith(prefix):
+                    break
+                if user_id != exclude_id:
+                    matches.append({'id': user_id, 'username': username})
+                position += 1
+        return matches
+
+    def add(self, user: CustomUser):
+        if self._loaded_at is None:
+            return
+        if not user.is_active:
+            self.remove(user.id)
+            return
+        entry = (user.username.lower(), user.id, user.username)
+        with self._lock:
+            if self._by_id.get(user.id) == entry:
+                return
+            self._discard(user.id)
+            insort(self._entries, entry)
+            self._by_id[user.id] = entry
+
+    def remove(self, user_id: int):
+        if self._loaded_at is not None:
+            with self._lock:
+                self._discard(user_id)
+
+    def load(self):
+        entries = sorted((username.lower(), user_id, username) for user_id, username in
+                         CustomUser.objects.filter(is_active=True).values_list('id', 'username').iterator())
+        with self._lock:
+            self._entries = entries
+            self._by_id = {entry[1]: entry for entry in entries}
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = []
+            self._by_id = {}
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            self.load()
+        elif time.monotonic() - loaded_at > settings.USERNAME_INDEX_RELOAD_INTERVAL:
+            with self._lock:
+                if self._reloader is not None:
+                    return
+                reloader = self._reloader = threading.Thread(target=self._reload, name='username-index-reload',
+                                                             daemon=True)
+            reloader.start()
+
+    def _reload(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception('Reloading the username index failed')
+        finally:
+            # The thread owns its connection, don't leak it
+            connections.close_all()
+            with self._lock:
+                self._reloader = None
+
+    def _discard(self, user_id: int):
+        entry = self._by_id.pop(user_id, None)
+        if entry is not None:
+            position = bisect_left(self._entries, entry)
+            del self._entries[position]
+
+
+username_index = UsernameIndex()
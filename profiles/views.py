@@ -1,40 +1,89 @@
-import os
+from datetime import date
+from urllib.parse import urlencode
 
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import HttpResponse, HttpResponseRedirect, render
 from django.urls import reverse
 from django.utils import timezone
 
-from access.models import CustomUser, default_avatar
+from access.models import CustomUser
 from logs.models import Log
+from logs.pagination import InvalidCursor, paginate
 from .forms import ProfileForm, UserSearchForm
-from settings.models import Privacy
+from .rollups import history as calorie_history
+from .stats import get_user_stats
+from .username_index import username_index
+from settings import visibility
+from uploads.processing import queue_processing, stage_upload
+
+
+# Alphabetical, with id as a tie-breaker so the ordering is unique for cursors
+DIRECTORY_ORDERING = ('username', 'id')
+# Newest first, matching the (creator, -pub_date, -id) index
+PROFILE_LOG_ORDERING = ('-pub_date', '-id')
 
 
 # Create your views here.
 def index(request):
     context = {}
 
-    if request.method == 'POST':
-        search_form = UserSearchForm(request.POST)
-        if search_form.is_valid():
-            username_query = search_form.cleaned_data['query']
-            users = CustomUser.objects.filter(username__icontains=username_query)\
-                .exclude(username=request.user.username).order_by('username')
-            context['users'] = users
-            context['form'] = search_form
-            return render(request, 'profiles/index.html', context)
-        else:
-            return HttpResponseRedirect(reverse('profiles:index'))
-
+    # Deactivated accounts are waiting to be deleted
+    users = CustomUser.objects.filter(is_active=True)
     if request.user.is_authenticated:
-        uid = request.user.id
-        users = CustomUser.objects.exclude(pk=uid).order_by('username')
+        users = users.exclude(pk=request.user.id)
+
+    # Searches are POSTed from the form, but page links carry the query in the URL
+    search_form = UserSearchForm(request.POST if request.method == 'POST' else request.GET)
+    query = ''
+    if search_form.is_valid():
+        query = search_form.cleaned_data['query']
+        if query:
+            users = users.filter(username__icontains=query)
+    elif request.method == 'POST':
+        return HttpResponseRedirect(reverse('profiles:index'))
+
+    page_size = settings.PROFILE_DIRECTORY_PAGE_SIZE
+    try:
+        page = paginate(users, DIRECTORY_ORDERING, after=request.GET.get('after'),
+                        before=request.GET.get('before'), page_size=page_size)
+    except InvalidCursor:
+        page = paginate(users, DIRECTORY_ORDERING, page_size=page_size)
+
+    context['users'] = page.items
+    context['next_url'] = directory_page_url(query, after=page.next_cursor)
+    context['previous_url'] = directory_page_url(query, before=page.previous_cursor)
+    context['form'] = search_form
+    return render(request, 'profiles/index.html', context)
+
+
+def directory_page_url(query: str, after=None, before=None):
+    if not (after or before):
+        return None
+
+    params = {'query': query} if query else {}
+    if after:
+        params['after'] = after
     else:
-        users = CustomUser.objects.all().order_by('username')
+        params['before'] = before
+    return f"{reverse('profiles:index')}?{urlencode(params)}"
 
-    context['users'] = users
-    context['form'] = UserSearchForm()
-    return render(request, 'profiles/index.html', context)
+
+def autocomplete(request):
+    """
+    Usernames starting with `q`, as JSON, from the in-memory username index.
+    """
+    prefix = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', settings.USERNAME_AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        limit = settings.USERNAME_AUTOCOMPLETE_LIMIT
+    limit = max(1, min(limit, settings.USERNAME_AUTOCOMPLETE_MAX_LIMIT))
+
+    results = username_index.complete(prefix, limit, exclude_id=request.user.id) if prefix else []
+    for result in results:
+        result['url'] = reverse('profiles:user', args=(result['id'], ))
+    return JsonResponse({'results': results})
 
 
 def user(request, user_id):
@@ -42,17 +91,17 @@ def user(request, user_id):
 
     try:
         user_obj = CustomUser.objects.get(pk=user_id)
-        user_privacy = Privacy.objects.get(user=user_obj)
-        user_logs = Log.objects.filter(creator=user_obj.id).order_by('-pub_date')
         context['target'] = user_obj
-        if user_privacy.show_logs or request.user.id == user_id:
-            context['logs'] = user_logs
+        if visibility.can_view(request.user, user_obj.id, request):
+            context.update(getProfileLogPage(request, user_obj))
         else:
             context['privacyMessage'] = "This user's logs are private!"
 
         # Calculate statistics
         context['day_age'] = (timezone.now() - user_obj.date_joined).days
-        context['calories_count'] = sum(log.food.calories for log in user_logs)
+        stats = get_user_stats(user_obj)
+        context['stats'] = stats
+        context['calories_count'] = stats.total_calories
 
     except CustomUser.DoesNotExist:
         return HttpResponse('User does not exist!', status=404)
@@ -61,16 +110,88 @@ def user(request, user_id):
         if request.user.id == user_id:
             form = ProfileForm(request.POST, request.FILES)
             if form.is_valid():
-                old_pic = user_obj.profile_picture
                 new_pic = form.cleaned_data['profile_picture']
-                user_obj.profile_picture = new_pic
-                user_obj.save()
-                if old_pic != default_avatar:
-                    if os.path.exists(old_pic.path):
-                        os.remove(old_pic.path)
+                # Resized and stripped of metadata in the background, which
+                # then swaps it in and releases the old picture
+                staged = stage_upload(user_obj, 'profile_picture', new_pic)
+                queue_processing(user_obj, 'profile_picture', staged)
 
         return HttpResponseRedirect(reverse('profiles:user', args=(user_id, )))
 
     context['form'] = ProfileForm()
 
     return render(request, 'profiles/user.html', context)
+
+
+def getProfileLogPage(request, user_obj):
+    """
+    A keyset page of `user_obj`'s logs, newest first, with links to the
+    pages on either side of it.
+    """
+    user_logs = Log.objects.filter(creator=user_obj.id).select_related('food')
+    page_size = settings.PROFILE_LOG_PAGE_SIZE
+    try:
+        page = paginate(user_logs, PROFILE_LOG_ORDERING, after=request.GET.get('after'),
+                        before=request.GET.get('before'), page_size=page_size)
+    except InvalidCursor:
+        page = paginate(user_logs, PROFILE_LOG_ORDERING, page_size=page_size)
+
+    return {
+        'logs': page.items,
+        'older_logs_url': profile_logs_url(user_obj.id, after=page.next_cursor),
+        'newer_logs_url': profile_logs_url(user_obj.id, before=page.previous_cursor),
+    }
+
+
+def profile_logs_url(user_id, after=None, before=None):
+    if not (after or before):
+        return None
+
+    params = {'after': after} if after else {'before': before}
+    return f"{reverse('profiles:user', args=(user_id, ))}?{urlencode(params)}#logs"
+
+
+def history(request, user_id):
+    """
+    Calorie series for a user as JSON, read from the daily or weekly rollups.
+    Takes optional `start` and `end` dates (YYYY-MM-DD) and `period` (day or week).
+    """
+    try:
+        user_obj = CustomUser.objects.get(pk=user_id)
+    except CustomUser.DoesNotExist:
+        return JsonResponse({'error': 'User does not exist!'}, status=404)
+
+    if not visibility.can_view(request.user, user_obj.id, request):
+        return JsonResponse({'error': "This user's logs are private!"}, status=403)
+
+    period = request.GET.get('period', 'day')
+    if period not in ('day', 'week'):
+        return JsonResponse({'error': 'period must be day or week'}, status=400)
+
+    try:
+        end = date.fromisoformat(request.GET['end']) if 'end' in request.GET \
+            else timezone.localdate()
+        # Starting no earlier than date.min
+        start = date.fromisoformat(request.GET['start']) if 'start' in request.GET \
+            else date.fromordinal(max(1, end.toordinal() - (settings.CALORIE_HISTORY_DEFAULT_DAYS - 1)))
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be formatted YYYY-MM-DD'}, status=400)
+
+    if start > end:
+        return JsonResponse({'error': 'start must not be after end'}, status=400)
+    if (end - start).days >= settings.CALORIE_HISTORY_MAX_DAYS:
+        return JsonResponse({'error': f'Ranges are limited to {settings.CALORIE_HISTORY_MAX_DAYS} days'},
+                            status=400)
+
+    try:
+        series = calorie_history(user_obj, start, end, period)
+    except OverflowError:
+        return JsonResponse({'error': 'Dates must be within the calendar'}, status=400)
+
+    return JsonResponse({
+        'user': user_obj.id,
+        'period': period,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': series,
+    })
@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from .models import Privacy
+from .models import AccountDeletion, Privacy
 
 # Register your models here.
 admin.site.register(Privacy)
+
+
+@admin.register(AccountDeletion)
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ('username', 'status', 'foods_deleted', 'comments_deleted', 'requested', 'finished')
+    list_filter = ('status', )
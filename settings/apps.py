@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SettingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'settings'
+
+    def ready(self):
+        # Drop cached privacy lookups when settings change, and register
+        # the account deletion job
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,73 @@
+"""
+Background deletion of accounts.
+
+Deleting an account only deactivates the user and makes their logs private; the
+'settings.delete_account' job in settings.tasks then deletes their comments,
+then everyone's comments on their logs, then their foods (with their logs and
+images), ACCOUNT_DELETION_BATCH_SIZE rows per transaction, before deleting the
+user. Comments on the logs go first so deleting a food never cascades to an
+unbounded number of them.
+Each batch records its progress on the AccountDeletion row, and a job that
+fails part way picks up from whatever is left when retried. Batches also beat
+the job's heartbeat, so long deletions aren't requeued as stale and run twice.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from access.models import CustomUser
+from jobs.queue import enqueue, heartbeat
+from logs.models import Comment, Food
+from profiles.username_index import username_index
+from .models import AccountDeletion, Privacy
+
+
+def request_deletion(user: CustomUser) -> AccountDeletion:
+    with transaction.atomic():
+        CustomUser.objects.filter(pk=user.pk).update(is_active=False)
+        # Saved rather than updated, so logs.signals hides the user's logs
+        # and settings.signals drops cached lookups
+        for privacy in Privacy.objects.filter(user=user):
+            privacy.show_logs = False
+            privacy.save()
+        deletion = AccountDeletion.objects.create(user_id=user.pk, username=user.username)
+        enqueue('settings.delete_account', deletion_id=deletion.pk)
+    # The update doesn't send signals. Other processes drop the user when
+    # their index next reloads
+    username_index.remove(user.pk)
+    return deletion
+
+
+def delete_account(deletion: AccountDeletion, batch_size: int = None):
+    batch_size = batch_size or settings.ACCOUNT_DELETION_BATCH_SIZE
+    AccountDeletion.objects.filter(pk=deletion.pk).update(status=AccountDeletion.RUNNING)
+
+    user_id = deletion.user_id
+    while _delete_batch(deletion, Comment.objects.filter(creator=user_id), 'comments_deleted', batch_size):
+        pass
+    comments_on_logs = Comment.objects.filter(Q(log__creator=user_id) | Q(log__food__creator=user_id))
+    while _delete_batch(deletion, comments_on_logs, 'comments_deleted', batch_size):
+        pass
+    # Deleting a food deletes its log
+    foods = Food.objects.filter(Q(creator=user_id) | Q(log__creator=user_id))
+    while _delete_batch(deletion, foods, 'foods_deleted', batch_size):
+        pass
+
+    with transaction.atomic():
+        # Also releases the profile picture, see uploads.signals
+        for user in CustomUser.objects.filter(pk=user_id):
+            user.delete()
+        AccountDeletion.objects.filter(pk=deletion.pk).update(status=AccountDeletion.DONE,
+                                                              finished=timezone.now())
+
+
+def _delete_batch(deletion: AccountDeletion, queryset, counter: str, batch_size: int) -> int:
+    heartbeat()
+    with transaction.atomic():
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if ids:
+            # Deleting through the queryset sends each row's delete signals
+            queryset.model.objects.filter(pk__in=ids).delete()
+            AccountDeletion.objects.filter(pk=deletion.pk).update(**{counter: F(counter) + len(ids)})
+    return len(ids)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0003_account_deletion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='privacy',
+            index=models.Index(fields=['user', 'show_logs'], name='privacy_user_show_logs_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from access.models import CustomUser
 
@@ -8,5 +9,41 @@ class Privacy(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     show_logs = models.BooleanField(default=True, verbose_name="Make logs public")
 
+    class Meta:
+        indexes = [
+            # Covers the show_logs lookups of settings.visibility, so they
+            # never read the table
+            models.Index(fields=['user', 'show_logs'], name='privacy_user_show_logs_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s log privacy settings set to {self.show_logs}"
+
+
+class AccountDeletion(models.Model):
+    """
+    Progress of deleting a deactivated account's data in the background,
+    kept after the account itself is gone.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    # Not a foreign key, since the user is deleted last
+    user_id = models.IntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    foods_deleted = models.PositiveIntegerField(default=0)
+    comments_deleted = models.PositiveIntegerField(default=0)
+    requested = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Deletion of {self.username}'s account {self.status}"
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import visibility
+from .models import Privacy
+
+
+@receiver(post_save, sender=Privacy)
+@receiver(post_delete, sender=Privacy)
+def privacy_changed(sender, instance, **kwargs):
+    visibility.invalidate(instance.user_id)
@@ -0,0 +1,16 @@
+from jobs.queue import register
+
+from .deletion import delete_account
+from .models import AccountDeletion
+
+
+def give_up_on_deletion(deletion_id: int):
+    AccountDeletion.objects.filter(pk=deletion_id).update(status=AccountDeletion.FAILED)
+
+
+@register('settings.delete_account', on_failure=give_up_on_deletion)
+def delete_account_data(deletion_id: int):
+    deletion = AccountDeletion.objects.filter(pk=deletion_id).first()
+    if deletion is None or deletion.status == AccountDeletion.DONE:
+        return
+    delete_account(deletion)
@@ -1,9 +1,15 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.hashers import check_password
 
-from .models import Privacy
+from . import deletion, visibility
+from .models import AccountDeletion, Privacy
 from access.models import CustomUser
+from jobs import queue
+from logs.models import Comment, Food, Log
 from test_util import util, account_util, log_util, settings_util
 
 
@@ -149,6 +155,92 @@ class PrivacyTemplateTests(TestCase):
         self.assertIn('login', response.headers.get('location'))
 
 
+class PrivacyVisibilityTests(TestCase):
+    def setUp(self):
+        visibility.privacy_cache.clear()
+        self.viewer = account_util.create_random_valid_user()
+        self.public_users = [account_util.create_random_valid_user() for _ in range(3)]
+        self.private_users = [account_util.create_random_valid_user() for _ in range(2)]
+        Privacy.objects.filter(user__in=self.private_users).update(show_logs=False)
+        self.request = RequestFactory().get('/')
+
+    def ids(self, users):
+        return {user.id for user in users}
+
+    def test_visible_for_resolves_many_in_one_query(self):
+        """
+        Visibility of many creators should be looked up with a single query
+        """
+        creators = self.ids(self.public_users + self.private_users)
+        with self.assertNumQueries(1):
+            visible = visibility.visible_for(self.viewer, creators, self.request)
+        self.assertEqual(visible, self.ids(self.public_users))
+
+    def test_own_logs_always_visible(self):
+        private_user = self.private_users[0]
+        self.assertTrue(visibility.can_view(private_user, private_user.id))
+        self.assertFalse(visibility.can_view(self.viewer, private_user.id))
+        self.assertFalse(visibility.can_view(AnonymousUser(), private_user.id))
+
+    def test_lookups_memoized_per_request_and_process(self):
+        user_id = self.public_users[0].id
+        visibility.show_logs(user_id, self.request)
+        with self.assertNumQueries(0):
+            self.assertTrue(visibility.show_logs(user_id, self.request))
+
+        visibility.privacy_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertTrue(visibility.show_logs(user_id, self.request))
+        with self.assertNumQueries(1):
+            visibility.show_logs(user_id, RequestFactory().get('/'))
+        with self.assertNumQueries(0):
+            visibility.show_logs(user_id)
+
+    @override_settings(PRIVACY_CACHE_TTL=0)
+    def test_cache_entries_expire(self):
+        user_id = self.public_users[0].id
+        visibility.show_logs(user_id)
+        with self.assertNumQueries(1):
+            visibility.show_logs(user_id)
+
+    @override_settings(PRIVACY_CACHE_MAX_ENTRIES=3)
+    def test_least_recently_used_entries_evicted(self):
+        """
+        The cache should keep only the most recently used users, and drop
+        expired entries when they are looked up
+        """
+        first, second, third = [user.id for user in self.public_users]
+        visibility.show_logs_many([first, second, third])
+        visibility.show_logs(first)
+        visibility.show_logs(self.private_users[0].id)
+
+        with self.assertNumQueries(0):
+            visibility.show_logs_many([first, third])
+        with self.assertNumQueries(1):
+            visibility.show_logs(second)
+
+        with override_settings(PRIVACY_CACHE_TTL=0):
+            visibility.show_logs(self.viewer.id)
+        self.assertEqual(visibility.privacy_cache.get_many([self.viewer.id]), {})
+        self.assertNotIn(self.viewer.id, visibility.privacy_cache._entries)
+
+    def test_privacy_view_invalidates_cache(self):
+        """
+        Changing the privacy setting should take effect immediately
+        """
+        user = self.public_users[0]
+        self.assertTrue(visibility.can_view(self.viewer, user.id))
+
+        self.client.force_login(user)
+        self.client.post(reverse('settings:privacy'), settings_util.create_log_setting_form(False))
+        self.assertFalse(visibility.can_view(self.viewer, user.id))
+
+    def test_missing_privacy_row_uses_default(self):
+        user = account_util.create_user('noprivacy')
+        user.save()
+        self.assertEqual(visibility.show_logs(user.id), Privacy._meta.get_field('show_logs').default)
+
+
 class EmailChangeTests(TestCase):
     def setUp(self):
         self.user = account_util.create_random_valid_user()
@@ -205,6 +297,7 @@ class EmailChangeTests(TestCase):
         self.assertIn('login', response.headers.get('location'))
 
 
+@override_settings(JOBS_WORKER_THREADS=0)
 class DeleteAccountTests(TestCase):
     def setUp(self):
         self.default_user = account_util.create_default_valid_user()
@@ -241,9 +334,28 @@ class DeleteAccountTests(TestCase):
         self.client.force_login(self.default_user)
         delete_form = settings_util.create_delete_form(account_util.valid_pass)
         self.client.post(reverse('settings:delete-acc'), delete_form)
+        queue.run_pending()
 
         self.assertFalse(CustomUser.objects.filter(email=self.default_user.email).exists())
 
+    def test_valid_submission_deactivates_account_immediately(self):
+        """
+        The account should be deactivated, logged out and its logs hidden before
+        the background deletion has run
+        """
+        log = log_util.create_random_log(self.default_user)
+        self.client.force_login(self.default_user)
+        delete_form = settings_util.create_delete_form(account_util.valid_pass)
+        self.client.post(reverse('settings:delete-acc'), delete_form)
+
+        self.default_user.refresh_from_db()
+        self.assertFalse(self.default_user.is_active)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        log.refresh_from_db()
+        self.assertFalse(log.is_public)
+        self.assertEqual(AccountDeletion.objects.get(user_id=self.default_user.id).status,
+                         AccountDeletion.PENDING)
+
     def test_valid_submission_deletes_account_with_custom_avatar(self):
         """
         Entering correct password should result in account deletion.
@@ -259,6 +371,79 @@ class DeleteAccountTests(TestCase):
         self.assertIn('login', response.headers.get('location'))
 
 
+@override_settings(JOBS_WORKER_THREADS=0, ACCOUNT_DELETION_BATCH_SIZE=2)
+class AccountDeletionJobTests(TestCase):
+    def setUp(self):
+        self.user = account_util.create_random_valid_user()
+        self.other = account_util.create_random_valid_user()
+        self.logs = [log_util.create_random_log(self.user) for _ in range(5)]
+        self.other_log = log_util.create_random_log(self.other)
+        for log in self.logs[:3]:
+            log_util.create_comment(self.other, log, 'nice', 1)
+        for _ in range(3):
+            log_util.create_comment(self.user, self.other_log, 'yum', 1)
+
+    def test_deletes_data_in_batches(self):
+        """
+        Logs, their foods and comments, and the user's own comments should be
+        deleted along with the user, with the deleted rows counted
+        """
+        progress = deletion.request_deletion(self.user)
+        queue.run_pending()
+
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, AccountDeletion.DONE)
+        self.assertIsNotNone(progress.finished)
+        self.assertEqual(progress.foods_deleted, 5)
+        # Their own comments, and others' comments on their logs
+        self.assertEqual(progress.comments_deleted, 6)
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Log.objects.filter(creator=self.user.pk).exists())
+        self.assertFalse(Food.objects.filter(pk__in=[log.food_id for log in self.logs]).exists())
+        self.assertFalse(Comment.objects.filter(log__in=self.logs).exists())
+
+        self.assertFalse(Comment.objects.filter(log=self.other_log).exists())
+
+        # Other users' data is untouched
+        self.assertTrue(Log.objects.filter(pk=self.other_log.pk).exists())
+        self.assertTrue(CustomUser.objects.filter(pk=self.other.pk).exists())
+
+    def test_food_batches_dont_cascade_to_comments(self):
+        """
+        Comments on the user's logs should be deleted in their own batches,
+        so no food deletion has to cascade to them
+        """
+        progress = deletion.request_deletion(self.user)
+        batches = []
+        delete_batch = deletion._delete_batch
+
+        def record_batch(progress, queryset, counter, batch_size):
+            if counter == 'foods_deleted':
+                batches.append(Comment.objects.filter(log__creator=self.user.pk).count())
+            return delete_batch(progress, queryset, counter, batch_size)
+
+        with mock.patch('settings.deletion._delete_batch', side_effect=record_batch):
+            queue.run_pending()
+        self.assertTrue(batches)
+        self.assertEqual(set(batches), {0})
+        progress.refresh_from_db()
+        self.assertEqual((progress.status, progress.comments_deleted), (AccountDeletion.DONE, 6))
+
+    def test_resumes_after_partial_deletion(self):
+        """
+        Running the deletion again after it stopped part way should delete
+        whatever is left
+        """
+        progress = deletion.request_deletion(self.user)
+        deletion._delete_batch(progress, Food.objects.filter(log__creator=self.user.pk), 'foods_deleted', 2)
+        queue.run_pending()
+
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, AccountDeletion.DONE)
+        self.assertEqual(progress.foods_deleted, 5)
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+
+
 class ChangePasswordViewTests(TestCase):
     def setUp(self):
         self.uname = account_util.valid_uname
@@ -1,14 +1,12 @@
-import os.path
-
 from django.shortcuts import render, reverse
 from django.http import HttpResponseRedirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import logout
 
+from . import deletion
 from .forms import PasswordForm, EmailForm, DeleteForm
-from access.models import CustomUser, default_avatar
-from logs.models import Log
+from access.models import CustomUser
 from .models import Privacy
 
 
@@ -70,7 +68,8 @@ def delete(request):
             # Still need to validate correct password
             user = CustomUser.objects.get(pk=request.user.id)
             if user.check_password(form.cleaned_data['password']):
-                delete_account_data(user)
+                deletion.request_deletion(user)
+                logout(request)
                 return HttpResponseRedirect(reverse('access:signup'))
 
         context['error'] = 'Incorrect password!'
@@ -89,28 +88,11 @@ def privacy(request):
 
     if request.method == 'POST':
         log_setting_choice = request.POST['log-setting']
-        user_privacy_settings.show_logs = log_setting_choice
+        # Posted as a string, e.g. 'False'
+        user_privacy_settings.show_logs = Privacy._meta.get_field('show_logs').to_python(log_setting_choice)
         user_privacy_settings.save()
         return HttpResponseRedirect(reverse('settings:privacy'))
 
     # Send render value of log setting checkbox
     context['logValue'] = user_privacy_settings.show_logs
     return render(request, 'settings/privacy.html', context)
-
-
-def delete_account_data(user: CustomUser):
-    logs = Log.objects.filter(creator=user.id)
-
-    # Delete all log images
-    for log in logs:
-        img_path = log.food.image.path
-        if os.path.exists(img_path):
-            os.remove(img_path)
-
-    # Delete profile picture
-    if user.profile_picture != default_avatar:
-        pro_pic_path = user.profile_picture.path
-        if os.path.exists(pro_pic_path):
-            os.remove(pro_pic_path)
-
-    user.delete()
@@ -0,0 +1,130 @@
+"""
+Lookups of whether users' logs are visible to others.
+
+Answers are memoized on the request, so a page asking about the same user
+many times queries at most once, and cached for PRIVACY_CACHE_TTL seconds
+in the process, for the PRIVACY_CACHE_MAX_ENTRIES most recently used users.
+Privacy receivers in settings.signals invalidate a user's entry when their
+setting is saved; other processes see the change once their entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set
+
+from django.conf import settings
+
+from observability.metrics import registry
+from .models import Privacy
+
+# Users without a Privacy row get the model's default
+DEFAULT_SHOW_LOGS = Privacy._meta.get_field('show_logs').default
+
+
+class PrivacyCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # user id: (show_logs, expiry), least recently used first
+        self._entries: Dict[int, tuple] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, bool]:
+        now = time.monotonic()
+        found = {}
+        missed = 0
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.get(user_id)
+                if entry is not None and entry[1] > now:
+                    found[user_id] = entry[0]
+                    self._entries.move_to_end(user_id)
+                else:
+                    if entry is not None:
+                        del self._entries[user_id]
+                    missed += 1
+            self.hits += len(found)
+            self.misses += missed
+        return found
+
+    def set_many(self, values: Dict[int, bool]):
+        expires = time.monotonic() + settings.PRIVACY_CACHE_TTL
+        with self._lock:
+            for user_id, show_logs in values.items():
+                self._entries[user_id] = (show_logs, expires)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.PRIVACY_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+privacy_cache = PrivacyCache()
+
+registry.counter('privacy_cache_lookups_total', 'Privacy setting cache lookups by result.', ['result'],
+                 function=lambda: {('hit', ): privacy_cache.hits, ('miss', ): privacy_cache.misses})
+
+
+def show_logs_many(user_ids: Iterable[int], request=None) -> Dict[int, bool]:
+    """
+    Map each user id to their show_logs setting, querying only for the
+    users in neither the request memo nor the process cache.
+    """
+    user_ids = set(user_ids)
+    memo = _request_memo(request)
+    found = {user_id: memo[user_id] for user_id in user_ids & memo.keys()}
+
+    missing = user_ids - found.keys()
+    if missing:
+        cached = privacy_cache.get_many(missing)
+        found.update(cached)
+        missing -= cached.keys()
+
+    if missing:
+        loaded = dict.fromkeys(missing, DEFAULT_SHOW_LOGS)
+        loaded.update(Privacy.objects.filter(user__in=missing).values_list('user_id', 'show_logs'))
+        privacy_cache.set_many(loaded)
+        found.update(loaded)
+
+    memo.update(found)
+    return found
+
+
+def show_logs(user_id: int, request=None) -> bool:
+    return show_logs_many([user_id], request)[user_id]
+
+
+def visible_for(viewer, creator_ids: Iterable[int], request=None) -> Set[int]:
+    """
+    The subset of `creator_ids` whose logs `viewer` may see: public users,
+    and the viewer themselves.
+    """
+    viewer_id = viewer.id if viewer is not None else None
+    creator_ids = set(creator_ids)
+    visible = creator_ids & {viewer_id}
+    others = show_logs_many(creator_ids - visible, request)
+    return visible | {user_id for user_id, public in others.items() if public}
+
+
+def can_view(viewer, creator_id: int, request=None) -> bool:
+    return creator_id in visible_for(viewer, [creator_id], request)
+
+
+def invalidate(user_id: int, request=None):
+    privacy_cache.invalidate(user_id)
+    _request_memo(request).pop(user_id, None)
+
+
+def _request_memo(request: Optional[object]) -> dict:
+    if request is None:
+        return {}
+    memo = getattr(request, '_privacy_memo', None)
+    if memo is None:
+        memo = request._privacy_memo = {}
+    return memo
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Blob
+
+
+# Register your models here.
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'references', 'created')
+    search_fields = ('name', )
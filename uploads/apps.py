@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class UploadsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'uploads'
+
+    def ready(self):
+        # Generate image derivatives as uploads are saved, and register
+        # the background processing job
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,57 @@
+"""
+Reference counting of stored media.
+
+The receivers in uploads.signals take a reference when a model field starts
+pointing at a file and release it when the field moves to another file or
+its row is deleted. Content-addressed blobs are only deleted once nothing
+references them. Files stored before content addressing (and staged
+uploads) belong to a single row, so releasing them deletes them outright.
+"""
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import F
+
+from .derivatives import delete_derivatives
+from .models import Blob
+
+
+def acquire(storage, name: str):
+    if name and storage.is_content_addressed(name):
+        if not Blob.objects.filter(name=name).update(references=F('references') + 1):
+            # Deleted while unreferenced, but the file is being reused
+            Blob.objects.get_or_create(name=name, defaults={'size': _size(storage, name),
+                                                            'references': 1})
+
+
+def release(storage, name: str):
+    if not name:
+        return
+    if storage.is_content_addressed(name):
+        Blob.objects.filter(name=name).update(references=F('references') - 1)
+        discard_if_unreferenced(storage, name)
+    else:
+        _delete(storage, name)
+
+
+def discard_if_unreferenced(storage, name: str) -> bool:
+    """
+    Delete a content-addressed blob and its derivatives if no field
+    references it. Returns whether it was deleted.
+    """
+    deleted, _ = Blob.objects.filter(name=name, references__lte=0).delete()
+    if deleted:
+        _delete(storage, name)
+    return bool(deleted)
+
+
+def _delete(storage, name: str):
+    try:
+        if storage.exists(name):
+            storage.delete(name)
+    except SuspiciousFileOperation:
+        # Not a stored upload, e.g. the default avatar
+        return
+    delete_derivatives(storage, name)
+
+
+def _size(storage, name: str) -> int:
+    return storage.size(name) if storage.exists(name) else 0
@@ -0,0 +1,122 @@
+"""
+Resized copies of uploaded images.
+
+Each upload gets one JPEG and one WebP copy per size in IMAGE_DERIVATIVE_SIZES,
+fitted within a square of that many pixels and stored next to the original:
+'logs/lunch.png' gets 'logs/lunch.thumb.jpg', 'logs/lunch.thumb.webp' and so on.
+Names are derived from the original's, and the row records which image its
+derivatives were generated for in a '<field>_derivatives' column, so
+templates can link a derivative without a database lookup or a stat.
+"""
+import os
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# File extension and Pillow format of each derivative
+FORMATS = {
+    'jpg': 'JPEG',
+    'webp': 'WEBP',
+}
+
+
+def derivative_name(name: str, size: str, extension: str) -> str:
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.{extension}'
+
+
+def derivatives_field(field_name: str) -> str:
+    return f'{field_name}_derivatives'
+
+
+def has_derivatives(field_file) -> bool:
+    recorded = getattr(field_file.instance, derivatives_field(field_file.field.name), None)
+    return bool(field_file) and recorded == field_file.name
+
+
+def record_derivatives(instance, field_name: str):
+    """
+    Note on `instance`'s row that its current `field_name` file has derivatives.
+    """
+    column = derivatives_field(field_name)
+    name = getattr(instance, field_name).name
+    setattr(instance, column, name)
+    type(instance).objects.filter(pk=instance.pk).update(**{column: name})
+
+
+def generate_derivatives(field_file) -> list:
+    """
+    Write every size and format of `field_file`'s image to its storage,
+    replacing any earlier copies. Returns the names written, or nothing
+    when the file isn't an image Pillow can read.
+    """
+    storage = field_file.storage
+    names = [derivative_name(field_file.name, size, extension)
+             for size in settings.IMAGE_DERIVATIVE_SIZES for extension in FORMATS]
+    if _is_content_addressed(storage, field_file.name) and all(storage.exists(n) for n in names):
+        # Derivatives of identical content were made for an earlier upload
+        return names
+
+    try:
+        with storage.open(field_file.name, 'rb') as original:
+            image = Image.open(original)
+            image.load()
+    except (OSError, UnidentifiedImageError, SuspiciousFileOperation):
+        return []
+
+    image = ImageOps.exif_transpose(image)
+    written = []
+    for size, pixels in settings.IMAGE_DERIVATIVE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((pixels, pixels), Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            name = derivative_name(field_file.name, size, extension)
+            # Content-addressed storage replaces files in place
+            if not _is_content_addressed(storage, name) and storage.exists(name):
+                storage.delete(name)
+            written.append(storage.save(name, ContentFile(_encode(resized, image_format))))
+    return written
+
+
+def delete_derivatives(storage, name: str):
+    for size in settings.IMAGE_DERIVATIVE_SIZES:
+        for extension in FORMATS:
+            derivative = derivative_name(name, size, extension)
+            try:
+                if storage.exists(derivative):
+                    storage.delete(derivative)
+            except SuspiciousFileOperation:
+                return
+
+
+def derivative_url(field_file, size: str, extension: str = 'jpg') -> Optional[str]:
+    """
+    URL of a derivative of `field_file`, or None if it hasn't been generated
+    (e.g. for images uploaded before derivatives existed, or the default avatar).
+    """
+    if size not in settings.IMAGE_DERIVATIVE_SIZES or not has_derivatives(field_file):
+        return None
+    return field_file.storage.url(derivative_name(field_file.name, size, extension))
+
+
+def _is_content_addressed(storage, name: str) -> bool:
+    return getattr(storage, 'is_content_addressed', lambda name: False)(name)
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no transparency, so flatten onto white
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.IMAGE_DERIVATIVE_QUALITY)
+    return buffer.getvalue()
@@ -0,0 +1,181 @@
+"""
+Garbage collection of media files no row references.
+
+The referenced names are read once into a set, streaming the columns of
+every image field and the referenced blobs, then the media tree is walked
+in path order and compared against it a batch at a time. Walks can stop
+after a number of files and resume from a checkpoint on the next run.
+"""
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from .derivatives import FORMATS
+from .models import Blob
+
+CHECKPOINT_NAME = '.gc-checkpoint'
+QUARANTINE_DIR = '.quarantine'
+
+
+@dataclass
+class Report:
+    scanned: int = 0
+    orphans: int = 0
+    reclaimed_bytes: int = 0
+    finished: bool = True
+    errors: List[str] = field(default_factory=list)
+
+
+def referenced_roots(chunk_size: int = 10000) -> Set[str]:
+    """
+    Names of referenced files without their extension, which also covers
+    their derivatives ('<root>.<size>.<ext>').
+    """
+    from .signals import IMAGE_FIELDS
+
+    roots = set()
+    for model, field_names in IMAGE_FIELDS.items():
+        for field_name in field_names:
+            default = model._meta.get_field(field_name).default
+            if isinstance(default, str) and default:
+                roots.add(_root(default.lstrip('/')))
+            names = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})\
+                .values_list(field_name, flat=True).order_by()
+            roots.update(_root(name) for name in names.iterator(chunk_size=chunk_size))
+    names = Blob.objects.filter(references__gt=0).values_list('name', flat=True)
+    roots.update(_root(name) for name in names.iterator(chunk_size=chunk_size))
+    return roots
+
+
+def is_referenced(name: str, roots: Set[str]) -> bool:
+    root = _root(name)
+    if root in roots:
+        return True
+    # Derivatives are '<original root>.<size>.<format>'
+    base, _, size = root.rpartition('.')
+    extension = os.path.splitext(name)[1].lstrip('.')
+    return extension in FORMATS and size in settings.IMAGE_DERIVATIVE_SIZES and base in roots
+
+
+def walk(root_dir: str, after: Optional[str] = None) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Yield (relative name, entry) for every file under `root_dir` in path
+    order, starting after the relative name `after`. Directories entirely
+    before `after` aren't listed.
+    """
+    after_parts = tuple(after.split('/')) if after else ()
+
+    def visit(directory: str, parts: tuple):
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not parts and entry.name in (CHECKPOINT_NAME, QUARANTINE_DIR):
+                continue
+            entry_parts = parts + (entry.name, )
+            if entry.is_dir(follow_symlinks=False):
+                if entry_parts >= after_parts[:len(entry_parts)]:
+                    yield from visit(entry.path, entry_parts)
+            elif entry.is_file(follow_symlinks=False) and entry_parts > after_parts:
+                yield '/'.join(entry_parts), entry
+
+    yield from visit(root_dir, ())
+
+
+def collect(quarantine: bool = False, dry_run: bool = False, batch_size: int = 1000,
+            limit: Optional[int] = None, min_age: Optional[int] = None,
+            resume: bool = True) -> Report:
+    """
+    Remove (or move to QUARANTINE_DIR) unreferenced files older than
+    `min_age` seconds. With `limit`, stop after scanning that many files
+    and leave a checkpoint for the next run to continue from.
+    """
+    media_root = str(settings.MEDIA_ROOT)
+    min_age = settings.MEDIA_GC_MIN_AGE if min_age is None else min_age
+    cutoff = time.time() - min_age
+    checkpoint = read_checkpoint() if resume else None
+    quarantine_dir = os.path.join(media_root, QUARANTINE_DIR, time.strftime('%Y%m%d-%H%M%S'))
+
+    roots = referenced_roots()
+    report = Report()
+    batch = []
+    last_name = None
+    for name, entry in walk(media_root, checkpoint):
+        if limit is not None and report.scanned >= limit:
+            report.finished = False
+            break
+        report.scanned += 1
+        last_name = name
+        batch.append((name, entry))
+        if len(batch) >= batch_size:
+            _collect_batch(batch, roots, cutoff, quarantine_dir if quarantine else None, dry_run, report)
+            batch = []
+    _collect_batch(batch, roots, cutoff, quarantine_dir if quarantine else None, dry_run, report)
+
+    if not dry_run:
+        write_checkpoint(None if report.finished else last_name)
+    return report
+
+
+def _collect_batch(batch, roots: Set[str], cutoff: float, quarantine_dir: Optional[str],
+                   dry_run: bool, report: Report):
+    orphans = []
+    for name, entry in batch:
+        # Dot files are temporary files of writes in progress
+        if is_referenced(name, roots) or os.path.basename(name).startswith('.'):
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        # Recent files may belong to uploads whose rows aren't saved yet
+        if stat.st_mtime > cutoff:
+            continue
+        orphans.append((name, entry.path, stat.st_size))
+
+    report.orphans += len(orphans)
+    report.reclaimed_bytes += sum(size for _, _, size in orphans)
+    if dry_run or not orphans:
+        return
+
+    for name, path, _ in orphans:
+        try:
+            if quarantine_dir:
+                destination = os.path.join(quarantine_dir, name)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.move(path, destination)
+            else:
+                os.remove(path)
+        except OSError as error:
+            report.errors.append(f'{name}: {error}')
+    Blob.objects.filter(name__in=[name for name, _, _ in orphans], references__lte=0).delete()
+
+
+def read_checkpoint() -> Optional[str]:
+    try:
+        with open(_checkpoint_path()) as file:
+            return json.load(file).get('after')
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_checkpoint(after: Optional[str]):
+    path = _checkpoint_path()
+    if after is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({'after': after}, file)
+
+
+def _checkpoint_path() -> str:
+    return os.path.join(str(settings.MEDIA_ROOT), CHECKPOINT_NAME)
+
+
+def _root(name: str) -> str:
+    return os.path.splitext(name)[0]
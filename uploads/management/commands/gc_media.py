@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from uploads.gc import QUARANTINE_DIR, collect
+
+
+class Command(BaseCommand):
+    help = 'Remove media files no food image or profile picture references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report orphans without removing them')
+        parser.add_argument('--quarantine', action='store_true',
+                            help=f'Move orphans under MEDIA_ROOT/{QUARANTINE_DIR} instead of deleting them')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--limit', type=int,
+                            help='Scan at most this many files, continuing from here on the next run')
+        parser.add_argument('--min-age', type=int,
+                            help='Only remove files unmodified for this many seconds '
+                                 '(defaults to MEDIA_GC_MIN_AGE)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint of an unfinished run')
+
+    def handle(self, *args, **options):
+        report = collect(quarantine=options['quarantine'], dry_run=options['dry_run'],
+                         batch_size=options['batch_size'], limit=options['limit'],
+                         min_age=options['min_age'], resume=not options['restart'])
+
+        for error in report.errors:
+            self.stderr.write(error)
+        verb = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {report.scanned} files, {report.orphans} orphaned. '
+            f'{verb} {filesizeformat(report.reclaimed_bytes)} ({report.reclaimed_bytes} bytes).'))
+        if not report.finished:
+            self.stdout.write('Stopped at the limit; run again to continue.')
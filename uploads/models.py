@@ -0,0 +1,16 @@
+from django.db import models
+
+
+# Create your models here.
+class Blob(models.Model):
+    """
+    A file in content-addressed storage, with the number of model fields
+    currently referencing it. Unreferenced blobs are deleted.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    references = models.IntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.references} references)'
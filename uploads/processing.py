@@ -0,0 +1,72 @@
+"""
+Background processing of uploaded images.
+
+Views only stream the upload to IMAGE_STAGING_DIR and queue the
+'uploads.process_image' job in uploads.tasks, which decodes it, applies and
+strips its EXIF data, fits it within IMAGE_MAX_DIMENSION and re-encodes it.
+Rows keep their previous image until the job swaps the processed file in,
+so raw uploads (and their location data) are never linked. Uploads that
+can't be processed are deleted, and a newer upload of the same field
+supersedes any still waiting.
+"""
+import os
+import time
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from jobs.queue import enqueue
+
+
+def stage_upload(instance, field_name: str, upload) -> str:
+    """
+    Save `upload` for `field_name` of a saved `instance` to the staging
+    directory, without decoding it, and return its name. The row is left
+    untouched.
+    """
+    storage = instance._meta.get_field(field_name).storage
+    _, extension = os.path.splitext(upload.name)
+    # Names sort by upload time within the field's directory, so the job can
+    # tell whether a newer upload superseded this one
+    name = f'{time.time_ns():020d}-{uuid.uuid4().hex}{extension.lower()}'
+    return storage.save(os.path.join(staging_directory(instance._meta.label, instance.pk, field_name), name),
+                        upload)
+
+
+def staging_directory(model: str, pk: int, field_name: str) -> str:
+    return f'{settings.IMAGE_STAGING_DIR}/{model.lower()}/{pk}/{field_name}'
+
+
+def queue_processing(instance, field_name: str, staged: str):
+    """
+    Queue the staged upload of `instance` for processing.
+    """
+    enqueue('uploads.process_image', model=instance._meta.label, pk=instance.pk,
+            field=field_name, staged=staged)
+
+
+def encode_upload(file) -> tuple:
+    """
+    Decode an uploaded image and re-encode it upright, without metadata,
+    within IMAGE_MAX_DIMENSION. Returns the bytes and their file extension.
+    """
+    image = Image.open(file)
+    image.load()
+    image = ImageOps.exif_transpose(image)
+    limit = settings.IMAGE_MAX_DIMENSION
+    image.thumbnail((limit, limit), Image.LANCZOS)
+
+    buffer = BytesIO()
+    if image.mode in ('RGBA', 'LA', 'P') and _has_transparency(image):
+        image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    image.convert('RGB').save(buffer, 'JPEG', quality=settings.IMAGE_UPLOAD_QUALITY, optimize=True)
+    return buffer.getvalue(), 'jpg'
+
+
+def _has_transparency(image: Image.Image) -> bool:
+    if image.mode == 'P':
+        return 'transparency' in image.info
+    return image.getchannel('A').getextrema()[0] < 255
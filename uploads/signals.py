@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from access.models import CustomUser
+from logs.models import Food
+from . import blobs
+from .derivatives import generate_derivatives, record_derivatives
+
+# Image fields that get derivatives and reference counted storage, by model
+IMAGE_FIELDS = {
+    Food: ['image'],
+    CustomUser: ['profile_picture'],
+}
+
+
+def _file_name(instance, field_name: str):
+    # Read the raw attribute, since going through the descriptor for every
+    # row loaded would wrap each value in a FieldFile
+    value = instance.__dict__.get(field_name)
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=Food)
+@receiver(post_init, sender=CustomUser)
+def remember_stored_files(sender, instance, **kwargs):
+    # Deferred fields are left out, as saves won't touch them either
+    instance._stored_files = {name: _file_name(instance, name) for name in IMAGE_FIELDS[sender]
+                              if name in instance.__dict__}
+
+
+@receiver(pre_save, sender=Food)
+@receiver(pre_save, sender=CustomUser)
+def note_new_uploads(sender, instance, **kwargs):
+    # Files not yet committed to storage are the ones being uploaded by this save
+    instance._new_uploads = [name for name in IMAGE_FIELDS[sender]
+                             if getattr(instance, name) and not getattr(instance, name)._committed]
+
+
+@receiver(post_save, sender=Food)
+@receiver(post_save, sender=CustomUser)
+def update_stored_files(sender, instance, created, update_fields=None, **kwargs):
+    for name in getattr(instance, '_new_uploads', ()):
+        if generate_derivatives(getattr(instance, name)):
+            record_derivatives(instance, name)
+    instance._new_uploads = []
+
+    stored = instance._stored_files
+    for name in IMAGE_FIELDS[sender]:
+        if name not in stored or (update_fields is not None and name not in update_fields):
+            continue
+        # A new row's initial value is whatever it was constructed with
+        old, new = None if created else stored[name], _file_name(instance, name)
+        if old != new:
+            storage = sender._meta.get_field(name).storage
+            blobs.acquire(storage, new)
+            blobs.release(storage, old)
+            stored[name] = new
+
+
+@receiver(post_delete, sender=Food)
+@receiver(post_delete, sender=CustomUser)
+def release_stored_files(sender, instance, **kwargs):
+    for name, stored in instance._stored_files.items():
+        blobs.release(sender._meta.get_field(name).storage, stored)
@@ -0,0 +1,102 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under CONTENT_STORAGE_DIR by the SHA-256 of their bytes,
+e.g. 'content/3f/3fa2...c1.jpg', so the same image uploaded any number of
+times is written once, and a file's URL changes whenever its content does.
+Each stored file has a Blob row counting the model fields referencing it;
+see uploads.blobs for how references are taken and released.
+
+Names already inside the content tree (derivatives of stored files) and
+staged uploads are saved under the name given.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import LazyObject
+
+from .models import Blob
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def is_content_addressed(self, name: str) -> bool:
+        return name.replace('\\', '/').startswith(f'{settings.CONTENT_STORAGE_DIR}/')
+
+    def content_name(self, name: str, content) -> str:
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk.encode() if isinstance(chunk, str) else chunk)
+        content.seek(0)
+
+        hexdigest = digest.hexdigest()
+        _, extension = os.path.splitext(name)
+        return f'{settings.CONTENT_STORAGE_DIR}/{hexdigest[:2]}/{hexdigest}{extension.lower()}'
+
+    def _save(self, name, content):
+        if _is_staged(name):
+            return super()._save(name, content)
+        if self.is_content_addressed(name):
+            return self._write(name, content)
+
+        name = self.content_name(name, content)
+        if not self.exists(name):
+            self._write(name, content)
+        Blob.objects.get_or_create(name=name, defaults={'size': content.size})
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Content names are unique by construction, and saving one again
+        # replaces it with identical content
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _write(self, name: str, content) -> str:
+        """
+        Write through a temporary file renamed into place, so concurrent
+        writers of the same name never expose a partial file.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                content.seek(0)
+                for chunk in content.chunks():
+                    file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary_path, self.file_permissions_mode)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+
+def _is_staged(name: str) -> bool:
+    return name.replace('\\', '/').startswith(f'{settings.IMAGE_STAGING_DIR}/')
+
+
+class DefaultMediaStorage(LazyObject):
+    def _setup(self):
+        self._wrapped = ContentAddressedStorage()
+
+
+media_storage = DefaultMediaStorage()
+
+
+def get_media_storage():
+    """
+    Storage of uploaded images, referenced as a callable by model fields
+    so migrations don't serialize the storage itself.
+    """
+    return media_storage
@@ -0,0 +1,76 @@
+import logging
+import os
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import UnidentifiedImageError
+
+from jobs.queue import register
+from . import blobs
+from .derivatives import generate_derivatives, record_derivatives
+from .processing import encode_upload, staging_directory
+
+logger = logging.getLogger(__name__)
+
+
+def discard_upload(model: str, pk: int, field: str, staged: str):
+    """
+    Delete an upload that ran out of processing attempts. The row never
+    pointed at it, so it keeps its previous image.
+    """
+    _delete(apps.get_model(model)._meta.get_field(field).storage, staged)
+
+
+@register('uploads.process_image', on_failure=discard_upload)
+def process_image(model: str, pk: int, field: str, staged: str):
+    model_label = model
+    model = apps.get_model(model_label)
+    storage = model._meta.get_field(field).storage
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or _superseded(storage, model_label, pk, field, staged):
+        # Deleted or replaced before processing got to it
+        _delete(storage, staged)
+        return
+
+    try:
+        with storage.open(staged, 'rb') as original:
+            content, extension = encode_upload(original)
+    except (OSError, UnidentifiedImageError):
+        logger.warning('Discarding unreadable upload %s', staged)
+        _delete(storage, staged)
+        return
+
+    root, _ = os.path.splitext(os.path.basename(staged))
+    field_file = getattr(instance, field)
+    previous = field_file.name
+    final = storage.save(field_file.field.generate_filename(instance, f'{root}.{extension}'),
+                         ContentFile(content))
+
+    # Only swap if the row still has the image it had when processing started
+    if final == previous or not model.objects.filter(pk=pk, **{field: previous}).update(**{field: final}):
+        # Identical content may be stored for other rows
+        if final != previous:
+            blobs.discard_if_unreferenced(storage, final)
+        _delete(storage, staged)
+        return
+
+    blobs.acquire(storage, final)
+    blobs.release(storage, previous)
+    field_file.name = final
+    if generate_derivatives(field_file):
+        record_derivatives(instance, field)
+    _delete(storage, staged)
+
+
+def _superseded(storage, model: str, pk: int, field: str, staged: str) -> bool:
+    # Staged names sort by upload time within the field's directory
+    try:
+        _, names = storage.listdir(staging_directory(model, pk, field))
+    except FileNotFoundError:
+        return False
+    return any(name > os.path.basename(staged) for name in names)
+
+
+def _delete(storage, name: str):
+    if storage.exists(name):
+        storage.delete(name)
@@ -0,0 +1,28 @@
+from django import template
+
+from uploads.derivatives import derivative_url
+
+register = template.Library()
+
+
+@register.inclusion_tag('uploads/picture.html')
+def picture(field_file, size, alt='', css_class=''):
+    """
+    Render `field_file` at a derivative size, preferring WebP, falling back
+    to the original when derivatives haven't been generated.
+    """
+    jpeg_url = derivative_url(field_file, size)
+    return {
+        'webp_url': derivative_url(field_file, size, 'webp') if jpeg_url else None,
+        'src': jpeg_url or (field_file.url if field_file else ''),
+        'alt': alt,
+        'css_class': css_class,
+    }
+
+
+@register.filter
+def derivative(field_file, size):
+    """
+    URL of the WebP derivative of `field_file` at `size`, or '' if there's none.
+    """
+    return derivative_url(field_file, size, 'webp') or ''
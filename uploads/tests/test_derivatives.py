@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from access.models import CustomUser
+from jobs import queue
+from logs.models import Food
+from test_util import account_util, image_upload_util, log_util
+from uploads.derivatives import derivative_name, derivative_url, generate_derivatives
+
+MEDIA_ROOT = tempfile.mkdtemp() + "/media"
+MEDIA_URL = "/media/"
+
+
+def png_upload(name: str = 'photo.png', size=(2000, 1000), mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_URL=MEDIA_URL,
+                   IMAGE_DERIVATIVE_SIZES={'thumb': 100, 'large': 1200})
+class ImageDerivativeTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = account_util.create_random_valid_user()
+
+    def create_food(self, image):
+        food = log_util.create_food(self.user, 'food', 'desc', save=False)
+        food.image = image
+        food.save()
+        return food
+
+    def open_derivative(self, field_file, size, extension):
+        return Image.open(os.path.join(MEDIA_ROOT, derivative_name(field_file.name, size, extension)))
+
+    def test_upload_generates_each_size_and_format(self):
+        """
+        Saving an uploaded image should store resized JPEG and WebP copies next to it
+        """
+        food = self.create_food(png_upload())
+
+        thumb = self.open_derivative(food.image, 'thumb', 'jpg')
+        self.assertEqual(thumb.format, 'JPEG')
+        self.assertEqual(thumb.size, (100, 50))
+        large = self.open_derivative(food.image, 'large', 'webp')
+        self.assertEqual(large.format, 'WEBP')
+        self.assertEqual(large.size, (1200, 600))
+        self.assertEqual(os.path.dirname(derivative_name(food.image.name, 'thumb', 'jpg')),
+                         os.path.dirname(food.image.name))
+
+    def test_small_images_not_enlarged(self):
+        food = self.create_food(png_upload(size=(60, 40)))
+        self.assertEqual(self.open_derivative(food.image, 'large', 'jpg').size, (60, 40))
+
+    def test_transparent_images(self):
+        """
+        Transparency should be flattened for JPEG but kept for WebP
+        """
+        food = self.create_food(png_upload(mode='RGBA'))
+        self.assertEqual(self.open_derivative(food.image, 'thumb', 'jpg').mode, 'RGB')
+        self.assertEqual(self.open_derivative(food.image, 'thumb', 'webp').mode, 'RGBA')
+
+    def test_resaving_doesnt_regenerate(self):
+        food = self.create_food(png_upload())
+        path = os.path.join(MEDIA_ROOT, derivative_name(food.image.name, 'thumb', 'jpg'))
+        os.remove(path)
+        food.name = 'renamed'
+        food.save()
+        self.assertFalse(os.path.exists(path))
+
+        generate_derivatives(food.image)
+        self.assertTrue(os.path.exists(path))
+
+    def test_urls_built_without_storage_lookups(self):
+        """
+        Rendering derivative URLs shouldn't stat the filesystem
+        """
+        food = self.create_food(png_upload())
+        food = Food.objects.get(pk=food.pk)
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists_mock:
+            self.assertEqual(derivative_url(food.image, 'thumb'),
+                             MEDIA_URL + derivative_name(food.image.name, 'thumb', 'jpg'))
+            self.assertIsNone(derivative_url(food.image, 'unknown'))
+        exists_mock.assert_not_called()
+
+    def test_replacing_image_by_name_forgets_derivatives(self):
+        """
+        Derivatives recorded for an earlier image shouldn't be linked for a new one
+        """
+        food = self.create_food(png_upload())
+        food.image = 'logs/elsewhere.png'
+        food.save()
+        self.assertIsNone(derivative_url(food.image, 'thumb'))
+
+    def test_unreadable_images_skipped(self):
+        upload = SimpleUploadedFile('notes.png', b'not an image', content_type='image/png')
+        food = self.create_food(upload)
+        self.assertIsNone(derivative_url(food.image, 'thumb'))
+
+    def test_feed_renders_thumbnail_avatars(self):
+        """
+        The feed should link small avatars, with a WebP source, not the full upload
+        """
+        self.user.profile_picture = png_upload('avatar.png')
+        self.user.save()
+        food = log_util.create_food(self.user, 'food', 'desc', save=True)
+        log_util.create_log(self.user, food, timezone.now() - timedelta(minutes=1), save=True)
+
+        response = self.client.get(reverse('logs:index'))
+        picture = self.user.profile_picture
+        self.assertContains(response, derivative_url(picture, 'thumb', 'webp'))
+        self.assertContains(response, f'src="{derivative_url(picture, "thumb")}"')
+        self.assertNotContains(response, picture.url + '"')
+
+    def test_default_avatar_falls_back_to_original(self):
+        food = log_util.create_food(self.user, 'food', 'desc', save=True)
+        log_util.create_log(self.user, food, timezone.now() - timedelta(minutes=1), save=True)
+
+        response = self.client.get(reverse('logs:index'))
+        self.assertContains(response, f'src="{self.user.profile_picture.url}"')
+        self.assertNotContains(response, 'image/webp')
+
+    def test_detail_offers_webp_with_original_fallback(self):
+        food = self.create_food(png_upload())
+        log = log_util.create_log(self.user, food, timezone.now(), save=True)
+
+        response = self.client.get(reverse('logs:detail', args=[log.id]))
+        self.assertContains(response, derivative_url(food.image, 'large', 'webp'))
+        self.assertContains(response, f"src='{food.image.url}'")
+
+    @override_settings(JOBS_WORKER_THREADS=0)
+    def test_replaced_avatar_derivatives_deleted(self):
+        self.client.force_login(self.user)
+        profile_path = reverse('profiles:user', args=[self.user.id])
+        self.client.post(profile_path, {'profile_picture': png_upload('first.png')})
+        queue.run_pending()
+        first = CustomUser.objects.get(pk=self.user.id).profile_picture
+        first_thumb = os.path.join(MEDIA_ROOT, derivative_name(first.name, 'thumb', 'webp'))
+        self.assertTrue(os.path.exists(first_thumb))
+
+        image = image_upload_util.get_default_valid_image()
+        self.client.post(profile_path, {'profile_picture': SimpleUploadedFile('second.gif', image)})
+        queue.run_pending()
+        self.assertFalse(os.path.exists(first_thumb))
+        second = CustomUser.objects.get(pk=self.user.id).profile_picture
+        self.assertIsNotNone(derivative_url(second, 'thumb', 'webp'))
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from test_util import account_util, log_util
+from uploads import gc
+from uploads.derivatives import derivative_name
+from uploads.models import Blob
+
+MEDIA_ROOT = tempfile.mkdtemp() + "/media"
+
+
+def png_bytes(color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', (60, 40), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_DERIVATIVE_SIZES={'thumb': 100}, MEDIA_GC_MIN_AGE=0)
+class GarbageCollectMediaTests(TestCase):
+    def setUp(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        self.user = account_util.create_random_valid_user()
+        self.food = log_util.create_food(self.user, 'food', 'desc', save=False)
+        self.food.image = SimpleUploadedFile('lunch.png', png_bytes(), content_type='image/png')
+        self.food.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def path(self, name: str):
+        return os.path.join(MEDIA_ROOT, name)
+
+    def write(self, name: str, content: bytes = b'orphan'):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), 'wb') as file:
+            file.write(content)
+
+    def gc_media(self, *args):
+        out = StringIO()
+        call_command('gc_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_removes_orphans_only(self):
+        """
+        Unreferenced files should be removed, while referenced files and their
+        derivatives are kept
+        """
+        self.write('logs/old.png', b'12345')
+        self.write('content/ab/' + 'ab' * 32 + '.png', b'123')
+        thumb = derivative_name(self.food.image.name, 'thumb', 'jpg')
+
+        output = self.gc_media()
+
+        self.assertIn('2 orphaned', output)
+        self.assertIn('(8 bytes)', output)
+        self.assertFalse(os.path.exists(self.path('logs/old.png')))
+        self.assertTrue(os.path.exists(self.food.image.path))
+        self.assertTrue(os.path.exists(self.path(thumb)))
+
+    def test_dry_run(self):
+        self.write('logs/old.png')
+        output = self.gc_media('--dry-run')
+        self.assertIn('Would reclaim', output)
+        self.assertTrue(os.path.exists(self.path('logs/old.png')))
+
+    def test_quarantine(self):
+        """
+        Quarantined orphans should be moved, keeping their path, rather than deleted
+        """
+        self.write('logs/old.png')
+        self.gc_media('--quarantine')
+        self.assertFalse(os.path.exists(self.path('logs/old.png')))
+        moved = [os.path.join(root, name) for root, _, names in os.walk(self.path(gc.QUARANTINE_DIR))
+                 for name in names]
+        self.assertEqual(len(moved), 1)
+        self.assertTrue(moved[0].endswith('/logs/old.png'))
+
+        # Quarantined files aren't collected again
+        self.assertIn('0 orphaned', self.gc_media())
+
+    def test_recent_files_kept(self):
+        self.write('logs/new.png')
+        self.gc_media('--min-age', '3600')
+        self.assertTrue(os.path.exists(self.path('logs/new.png')))
+
+    def test_unreferenced_blob_rows_removed(self):
+        name = 'content/cd/' + 'cd' * 32 + '.png'
+        self.write(name)
+        Blob.objects.create(name=name, size=6, references=0)
+        self.gc_media()
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+
+    def test_incremental_runs(self):
+        """
+        A limited run should leave a checkpoint the next run continues from,
+        and finishing a pass should clear it
+        """
+        for letter in 'abcd':
+            self.write(f'logs/{letter}.png')
+        # The food's image and derivatives sort first
+        referenced = len([name for name, _ in gc.walk(MEDIA_ROOT) if name.startswith('content/')])
+
+        self.assertIn('Stopped at the limit', self.gc_media('--limit', str(referenced + 2)))
+        self.assertIsNotNone(gc.read_checkpoint())
+        remaining = sorted(os.listdir(self.path('logs')))
+        self.assertEqual(len(remaining), 2)
+
+        output = self.gc_media()
+        self.assertNotIn('Stopped at the limit', output)
+        self.assertIsNone(gc.read_checkpoint())
+        self.assertEqual(os.listdir(self.path('logs')), [])
+
+    def test_walk_resumes_after_name(self):
+        for name in ('a/1', 'a/2', 'b/1', 'c'):
+            self.write(name)
+        names = [name for name, _ in gc.walk(MEDIA_ROOT, after='a/2')]
+        self.assertEqual(names[:2], ['b/1', 'c'])
+        self.assertTrue(all(name.startswith('content/') for name in names[2:]))
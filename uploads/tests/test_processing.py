@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from access.models import CustomUser
+from jobs import queue
+from jobs.models import Job
+from logs.ingredient_cache import ingredient_cache
+from logs.models import Food
+from test_util import account_util
+from uploads.derivatives import derivative_url
+from uploads.processing import queue_processing, stage_upload
+
+MEDIA_ROOT = tempfile.mkdtemp() + "/media"
+
+
+def jpeg_upload(name: str = 'phone.jpg', size=(4000, 3000), orientation: int = None):
+    image = Image.new('RGB', size, (10, 120, 10))
+    exif = Image.Exif()
+    exif[0x010f] = 'PhoneMaker'
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def fake_parsed(ingredient: str):
+    return [{'food': {'label': ingredient, 'nutrients': {'ENERC_KCAL': 100}}}]
+
+
+@mock.patch('logs.ingredient_client.IngredientClient.fetch', side_effect=fake_parsed)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_WORKER_THREADS=0, IMAGE_MAX_DIMENSION=1000,
+                   IMAGE_DERIVATIVE_SIZES={'thumb': 100})
+class UploadProcessingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        ingredient_cache.memory.clear()
+        self.user = account_util.create_random_valid_user()
+        self.client.force_login(self.user)
+        self.profile_path = reverse('profiles:user', args=[self.user.id])
+
+    def post_log(self, image):
+        self.client.post(reverse('logs:create-log'),
+                         {'name': 'meal', 'desc': 'desc', 'ingredients': 'rice', 'image': image})
+        return Food.objects.get(creator=self.user, name='meal')
+
+    def avatar(self):
+        return CustomUser.objects.get(pk=self.user.id).profile_picture
+
+    def staged_files(self):
+        return [os.path.join(directory, name)
+                for directory, _, names in os.walk(os.path.join(MEDIA_ROOT, 'staging')) for name in names]
+
+    def test_upload_staged_and_queued(self, fetch_mock):
+        """
+        The request should only stage the upload and queue a job for it,
+        leaving the row without an image until it's processed
+        """
+        food = self.post_log(jpeg_upload())
+        self.assertFalse(food.image)
+        job = Job.objects.get(name='uploads.process_image')
+        staged = job.payload.pop('staged')
+        self.assertTrue(staged.startswith(f'staging/logs.food/{food.pk}/image/'))
+        self.assertTrue(os.path.exists(os.path.join(MEDIA_ROOT, staged)))
+        self.assertEqual(job.payload, {'model': 'logs.Food', 'pk': food.pk, 'field': 'image'})
+
+    def test_staged_upload_never_rendered(self, fetch_mock):
+        """
+        Pages shouldn't link unprocessed uploads, which still carry their EXIF data
+        """
+        previous = self.avatar().url
+        food = self.post_log(jpeg_upload())
+        self.client.post(self.profile_path, {'profile_picture': jpeg_upload('avatar.jpg')})
+        log = food.log
+
+        for path in [reverse('logs:index'), reverse('logs:detail', args=[log.id]), self.profile_path]:
+            response = self.client.get(path)
+            self.assertNotContains(response, 'staging/')
+        self.assertContains(response, previous)
+        self.assertEqual(self.avatar().url, previous)
+
+        queue.run_pending()
+        self.assertTrue(self.avatar().name.startswith('content/'))
+        self.assertEqual(self.staged_files(), [])
+
+    def test_processing_swaps_in_resized_image(self, fetch_mock):
+        """
+        The worker should resize, strip EXIF and move the image out of staging
+        """
+        self.post_log(jpeg_upload())
+        queue.run_pending()
+
+        food = Food.objects.get(creator=self.user)
+        self.assertTrue(food.image.name.startswith('content/'))
+        self.assertEqual(self.staged_files(), [])
+        with Image.open(food.image.path) as image:
+            self.assertEqual(image.size, (1000, 750))
+            self.assertEqual(len(image.getexif()), 0)
+        self.assertIsNotNone(derivative_url(food.image, 'thumb', 'webp'))
+
+    def test_exif_orientation_applied(self, fetch_mock):
+        self.post_log(jpeg_upload(size=(800, 400), orientation=6))
+        queue.run_pending()
+        with Image.open(Food.objects.get(creator=self.user).image.path) as image:
+            self.assertEqual(image.size, (400, 800))
+
+    def test_avatar_processed(self, fetch_mock):
+        self.client.post(self.profile_path, {'profile_picture': jpeg_upload()})
+        self.assertFalse(self.avatar().name.startswith('content/'))
+        queue.run_pending()
+        self.assertTrue(self.avatar().name.startswith('content/'))
+
+    def test_replaced_upload_discarded(self, fetch_mock):
+        """
+        An upload replaced before it was processed shouldn't overwrite its replacement
+        """
+        self.client.post(self.profile_path, {'profile_picture': jpeg_upload('first.jpg')})
+        self.client.post(self.profile_path,
+                         {'profile_picture': jpeg_upload('second.jpg', size=(3000, 4000))})
+
+        queue.run_pending()
+        avatar = self.avatar()
+        self.assertTrue(avatar.name.startswith('content/'))
+        self.assertEqual(self.staged_files(), [])
+        with Image.open(avatar.path) as image:
+            self.assertEqual(image.size, (750, 1000))
+
+    def test_deleted_row_discards_staged_file(self, fetch_mock):
+        food = self.post_log(jpeg_upload())
+        food.delete()
+        queue.run_pending()
+        self.assertEqual(self.staged_files(), [])
+
+    def test_unreadable_upload_discarded(self, fetch_mock):
+        """
+        Uploads that can't be decoded should be deleted, leaving the previous picture
+        """
+        previous = self.avatar().name
+        staged = stage_upload(self.user, 'profile_picture',
+                              SimpleUploadedFile('fake.jpg', b'not an image', content_type='image/jpeg'))
+        queue_processing(self.user, 'profile_picture', staged)
+        with self.assertLogs('uploads.tasks', 'WARNING'):
+            queue.run_pending()
+        self.assertEqual(self.avatar().name, previous)
+        self.assertEqual(self.staged_files(), [])
+
+    @override_settings(JOBS_MAX_ATTEMPTS=1)
+    def test_failed_processing_discards_upload(self, fetch_mock):
+        """
+        Uploads whose processing keeps failing should be deleted once the job gives up
+        """
+        previous = self.avatar().name
+        self.client.post(self.profile_path, {'profile_picture': jpeg_upload()})
+        with mock.patch('uploads.tasks.encode_upload', side_effect=MemoryError), \
+                self.assertLogs('jobs.queue', 'ERROR'):
+            queue.run_pending()
+        self.assertEqual(Job.objects.get(name='uploads.process_image').status, Job.FAILED)
+        self.assertEqual(self.avatar().name, previous)
+        self.assertEqual(self.staged_files(), [])
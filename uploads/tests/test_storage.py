@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from access.models import CustomUser
+from logs.models import Food
+from test_util import account_util, log_util
+from uploads.derivatives import derivative_name
+from uploads.models import Blob
+from uploads.storage import media_storage
+from uploads.views import serve_media
+
+MEDIA_ROOT = tempfile.mkdtemp() + "/media"
+
+
+def png_bytes(color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', (300, 200), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_DERIVATIVE_SIZES={'thumb': 100})
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = account_util.create_random_valid_user()
+
+    def create_food(self, content: bytes, name: str = 'lunch.png', user=None):
+        food = log_util.create_food(user or self.user, 'food', 'desc', save=False)
+        food.image = SimpleUploadedFile(name, content, content_type='image/png')
+        food.save()
+        return food
+
+    def path(self, name: str):
+        return os.path.join(MEDIA_ROOT, name)
+
+    def test_stored_by_content_hash(self):
+        food = self.create_food(png_bytes())
+        self.assertRegex(food.image.name, r'^content/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertTrue(os.path.exists(food.image.path))
+
+    def test_duplicates_stored_once(self):
+        """
+        Identical uploads should share one file, counted once per referencing row
+        """
+        content = png_bytes()
+        first = self.create_food(content, 'a.png')
+        second = self.create_food(content, 'b.png')
+        other = self.create_food(png_bytes((0, 0, 255)))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        blob = Blob.objects.get(name=first.image.name)
+        self.assertEqual(blob.references, 2)
+        self.assertEqual(blob.size, len(content))
+
+    def test_blob_deleted_with_last_reference(self):
+        """
+        Deleting a row should only remove the file once no other row uses it
+        """
+        content = png_bytes()
+        first = self.create_food(content)
+        second = self.create_food(content)
+        name = first.image.name
+        thumb = self.path(derivative_name(name, 'thumb', 'webp'))
+        self.assertTrue(os.path.exists(thumb))
+
+        first.delete()
+        self.assertTrue(os.path.exists(self.path(name)))
+        self.assertEqual(Blob.objects.get(name=name).references, 1)
+
+        Food.objects.get(pk=second.pk).delete()
+        self.assertFalse(os.path.exists(self.path(name)))
+        self.assertFalse(os.path.exists(thumb))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+
+    def test_replaced_file_released(self):
+        self.user.profile_picture = SimpleUploadedFile('a.png', png_bytes())
+        self.user.save()
+        old = self.user.profile_picture.name
+
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.profile_picture = SimpleUploadedFile('b.png', png_bytes((0, 255, 0)))
+        user.save()
+        self.assertFalse(os.path.exists(self.path(old)))
+        self.assertEqual(Blob.objects.get(name=user.profile_picture.name).references, 1)
+
+    def test_saves_without_the_field_keep_references(self):
+        food = self.create_food(png_bytes())
+        food = Food.objects.get(pk=food.pk)
+        food.name = 'renamed'
+        food.save()
+        Food.objects.only('id', 'name').get(pk=food.pk).save()
+        self.assertEqual(Blob.objects.get(name=food.image.name).references, 1)
+
+    def test_account_deletion_releases_media(self):
+        shared = png_bytes()
+        kept = self.create_food(shared, user=account_util.create_random_valid_user())
+        own = self.create_food(png_bytes((9, 9, 9)))
+        self.create_food(shared)
+
+        self.user.delete()
+        self.assertFalse(os.path.exists(own.image.path))
+        self.assertTrue(os.path.exists(kept.image.path))
+
+    def test_legacy_files_deleted_with_their_row(self):
+        # Written before uploads were content addressed
+        os.makedirs(self.path('logs'), exist_ok=True)
+        with open(self.path('logs/old.png'), 'wb') as file:
+            file.write(b'x')
+        food = log_util.create_food(self.user, 'food', 'desc', save=False)
+        food.image = 'logs/old.png'
+        food.save()
+
+        food.delete()
+        self.assertFalse(os.path.exists(self.path('logs/old.png')))
+
+    def test_default_avatar_untouched(self):
+        user = account_util.create_random_valid_user()
+        user.delete()
+        self.assertFalse(Blob.objects.exists())
+
+    def test_content_addressed_media_cached_forever(self):
+        food = self.create_food(png_bytes())
+        response = serve_media(RequestFactory().get('/'), food.image.name, document_root=MEDIA_ROOT)
+        self.assertIn('immutable', response['Cache-Control'])
+
+        os.makedirs(os.path.dirname(self.path('logs/old.png')), exist_ok=True)
+        with open(self.path('logs/old.png'), 'wb') as file:
+            file.write(b'x')
+        response = serve_media(RequestFactory().get('/'), 'logs/old.png', document_root=MEDIA_ROOT)
+        self.assertNotIn('Cache-Control', response)
+
+    def test_staged_uploads_not_served(self):
+        """
+        Unprocessed uploads still carry their metadata, so they shouldn't be served
+        """
+        media_storage.save('staging/upload.png', ContentFile(b'x'))
+        for path in ['staging/upload.png', 'logs/../staging/upload.png']:
+            with self.assertRaises(Http404):
+                serve_media(RequestFactory().get('/'), path, document_root=MEDIA_ROOT)
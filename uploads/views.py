@@ -0,0 +1,22 @@
+import posixpath
+
+from django.conf import settings
+from django.http import Http404
+from django.views.static import serve
+
+# A year, the longest lifetime caches are expected to honour
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """
+    Serve uploaded media in development. Content-addressed files never
+    change under the same URL, so they can be cached forever. Staged uploads
+    still carry their metadata, so they aren't served at all.
+    """
+    if posixpath.normpath(path).lstrip('/').startswith(f'{settings.IMAGE_STAGING_DIR}/'):
+        raise Http404('Uploads are only served once processed')
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if path.startswith(f'{settings.CONTENT_STORAGE_DIR}/') and response.status_code == 200:
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response